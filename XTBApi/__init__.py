@@ -1,41 +1,40 @@
-import logging.config
-import os.path
+import logging
 
 from XTBApi.__version__ import __version__
 
-logging.config.dictConfig({
-    'version': 1,
-    'disable_existing_loggers': False,
-    'formatters': {
-        'deafult': {
-            'format':
-                '%(asctime)s - %(levelname)s - %(name)s - %(message)s',
-            'datefmt': '%Y-%m-%d %H:%M:%S'
-        }
-    },
-    'handlers': {
-        'console': {
-            'class': 'logging.StreamHandler',
-            'formatter': 'deafult',
-        },
-        'rotating': {
+# importing the package configures nothing, see configure_logging
+logging.getLogger('XTBApi').addHandler(logging.NullHandler())
+
+
+def configure_logging(filename=None, level=logging.DEBUG):
+    """opt-in logging of the XTBApi loggers at ``level``, to the console
+    or, if ``filename`` is given, to a file rotated at midnight"""
+    import logging.config
+    if filename is None:
+        handler = {'class': 'logging.StreamHandler', 'formatter': 'default'}
+    else:
+        handler = {
             'class': 'logging.handlers.TimedRotatingFileHandler',
-            'formatter': 'deafult',
-            'filename': os.path.join(
-                os.path.dirname(__file__), 'logs/logfile.log'),
+            'formatter': 'default',
+            'filename': filename,
             'when': 'midnight',
             'backupCount': 3
         }
-    },
-    'loggers': {
-        '': {
-            'handlers': ['console'],
-            'level': 'CRITICAL',
-            'propagate': True
+    logging.config.dictConfig({
+        'version': 1,
+        'disable_existing_loggers': False,
+        'formatters': {
+            'default': {
+                'format':
+                    '%(asctime)s - %(levelname)s - %(name)s - %(message)s',
+                'datefmt': '%Y-%m-%d %H:%M:%S'
+            }
         },
-        'XTBApi': {
-            'handlers': ['rotating'],
-            'level': 'DEBUG'
+        'handlers': {'xtbapi': handler},
+        'loggers': {
+            'XTBApi': {
+                'handlers': ['xtbapi'],
+                'level': level
+            }
         }
-    }
-})
+    })
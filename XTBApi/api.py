@@ -8,20 +8,27 @@ Main module
 """
 
 import enum
-import inspect
-import json
 import logging
+import threading
 import time
-from datetime import datetime
-
-from websocket import create_connection
-from websocket._exceptions import WebSocketConnectionClosedException
+from collections import deque
 
+from XTBApi.cache import SymbolCache
+from XTBApi.codec import get_codec
 from XTBApi.exceptions import *
+from XTBApi.history import iter_trades_history
+from XTBApi.hours import TradingCalendar
+from XTBApi.limiter import RateLimiter
+from XTBApi.metrics import Metrics
+from XTBApi.trades import (ACCEPTED, STATUS_TIMEOUT, OrderTemplate,
+                            StatusTracker, TradeBook, Transaction)
 
 LOGGER = logging.getLogger('XTBApi.api')
 LOGIN_TIMEOUT = 120
 MAX_TIME_INTERVAL = 0.200
+LOG_TRUNCATE = 1000  # chars of the responses logged at debug level
+ORDER_LATENCIES = 1000  # fast orders whose latency breakdown is kept
+WS_URL = "wss://ws.xtb.com/{mode}"
 
 
 class STATUS(enum.Enum):
@@ -71,6 +78,70 @@ def _get_data(command, **parameters):
     return data
 
 
+def _create_connection(url):
+    # websocket-client makes up most of the import time, it is loaded
+    # when the first socket is opened
+    from websocket import create_connection
+    return create_connection(url)
+
+
+def _connection_closed():
+    """exception raised by websocket-client on a closed socket"""
+    from websocket import WebSocketConnectionClosedException
+    return WebSocketConnectionClosedException
+
+
+def _convert_trading_hours(response):
+    """convert trading hours from ms to seconds"""
+    for symbol in response:
+        for day in symbol['trading']:
+            day['fromT'] = int(day['fromT'] / 1000)
+            day['toT'] = int(day['toT'] / 1000)
+        for day in symbol['quotes']:
+            day['fromT'] = int(day['fromT'] / 1000)
+            day['toT'] = int(day['toT'] / 1000)
+    return response
+
+
+def _format_candles(res):
+    """convert chart response to list of candles with real prices"""
+    candle_history = []
+    for candle in res['rateInfos']:
+        _pr = candle['open']
+        op_pr = _pr / 10 ** res['digits']
+        cl_pr = (_pr + candle['close']) / 10 ** res['digits']
+        hg_pr = (_pr + candle['high']) / 10 ** res['digits']
+        lw_pr = (_pr + candle['low']) / 10 ** res['digits']
+        new_candle_entry = {'timestamp': candle['ctm'] / 1000, 'open':
+            op_pr, 'close': cl_pr, 'high': hg_pr, 'low': lw_pr,
+                            'volume': candle['vol']}
+        candle_history.append(new_candle_entry)
+    return candle_history
+
+
+def _merge_lastn(res, number):
+    """keep the last number candles of the getChartLastRequest res
+
+    while candles are missing the older range is yielded as
+    (start, ticks) and the rateInfos of its getChartRangeRequest must be
+    sent back, the candles are merged in res['rateInfos']"""
+    candles = res['rateInfos'][-number:]
+    while len(candles) < number:
+        first = candles[0]['ctm'] if candles else int(time.time() * 1000)
+        older = yield first // 1000, len(candles) - number
+        older = [x for x in older if x['ctm'] < first]
+        if not older:  # no more history on server
+            break
+        candles = older[len(candles) - number:] + candles
+    res['rateInfos'] = candles
+
+
+def _closed(error):
+    """True if error of a close means the order is not open anymore"""
+    return isinstance(error, KeyError) or \
+        getattr(error, 'err_code', None) == 'BE51'
+
+
 def _check_mode(mode):
     """check if mode acceptable"""
     modes = [x.value for x in MODES]
@@ -78,12 +149,31 @@ def _check_mode(mode):
         raise ValueError("mode must be in {}".format(modes))
 
 
+def _get_trade_mode(mode):
+    """convert buy/sell mode to MODES"""
+    if mode in [MODES.BUY.value, MODES.SELL.value]:
+        return [x for x in MODES if x.value == mode][0]
+    elif mode in ['buy', 'sell']:
+        modes = {'buy': MODES.BUY, 'sell': MODES.SELL}
+        return modes[mode]
+    else:
+        raise ValueError("mode can be buy or sell")
+
+
 def _check_period(period):
     """check if period is acceptable"""
     if period not in [x.value for x in PERIOD]:
         raise ValueError("Period: {} not acceptable".format(period))
 
 
+def _check_timeframe(timeframe_in_seconds):
+    """check if timeframe is acceptable"""
+    acc_tmf = [x.value * 60 for x in PERIOD]
+    if timeframe_in_seconds not in acc_tmf:
+        raise ValueError(f"timeframe not accepted, not in "
+                         f"{', '.join([str(x) for x in acc_tmf])}")
+
+
 def _check_volume(volume):
     """normalize volume"""
     if not isinstance(volume, float):
@@ -96,13 +186,41 @@ def _check_volume(volume):
 
 
 class BaseClient(object):
-    """main client class"""
-
-    def __init__(self):
+    """main client class
+
+    :param url: websocket url template, ``{mode}`` is replaced by the mode
+        passed to login
+    :param limiter: RateLimiter used before every command, defaults to one
+        command every MAX_TIME_INTERVAL, use RateLimiter.for_account to
+        share it between clients of the same account
+    :param codec: name of the json codec in XTBApi.codec, defaults to the
+        fastest installed
+    :param metrics: XTBApi.metrics.Metrics recording every command, pass
+        the same to many clients to aggregate them
+    :param transport: callable opening the socket of an url, websocket
+        by default, see XTBApi.transport to record and replay sessions
+    """
+
+    def __init__(self, url=WS_URL, limiter=None, codec=None, metrics=None,
+                 transport=None):
+        self.url = url
+        self.limiter = limiter or RateLimiter(1 / MAX_TIME_INTERVAL)
+        self.codec = get_codec(codec)
+        self.metrics = metrics if metrics is not None else Metrics()
+        self.transport = transport or _create_connection
         self.ws = None
         self._login_data = None
-        self._time_last_request = time.time() - MAX_TIME_INTERVAL
+        self.mode = None
+        self.stream_session_id = None
+        self.bytes_sent = 0
+        self.bytes_received = 0
         self.status = STATUS.NOT_LOGGED
+        self.last_command = None
+        self.connected_at = None
+        self.session_stats = {'refreshes': 0, 'refresh_time': 0.0,
+                              'last_refresh_time': None}
+        self._ws_lock = threading.RLock()
+        self._session_callbacks = []
         LOGGER.debug("BaseClient inited")
         self.LOGGER = logging.getLogger('XTBApi.api.BaseClient')
 
@@ -111,49 +229,127 @@ class BaseClient(object):
             raise NotLogged()
         try:
             return func(*args, **kwargs)
-        except SocketError as e:
+        except SocketError:
+            # CommandFailed is an answer of a live session, it is raised
             LOGGER.info("re-logging in due to LOGIN_TIMEOUT gone")
-            self.login(self._login_data[0], self._login_data[1])
-            return func(*args, **kwargs)
-        except Exception as e:
-            LOGGER.warning(e)
-            self.login(self._login_data[0], self._login_data[1])
+            self.login(*self._login_data, mode=self.mode)
             return func(*args, **kwargs)
 
     def _send_command(self, dict_data):
         """send command to api"""
-        time_interval = time.time() - self._time_last_request
-        self.LOGGER.debug("took {} s.".format(time_interval))
-        if time_interval < MAX_TIME_INTERVAL:
-            time.sleep(MAX_TIME_INTERVAL - time_interval)
+        with self._ws_lock:
+            return self._request(self.ws, dict_data)
+
+    def _request(self, ws, dict_data):
+        """send command on ws and read its response"""
+        command = dict_data['command']
+        throttle = self.limiter.acquire(command)
+        request = self.codec.dumps(dict_data)
+        start = time.perf_counter()
+        self.last_command = time.monotonic()
         try:
-            self.ws.send(json.dumps(dict_data))
-            response = self.ws.recv()
-        except WebSocketConnectionClosedException:
+            ws.send(request)
+            response = ws.recv()
+        except (_connection_closed(), OSError):
+            response = None
+        if not response:
+            # recv returns '' when the server closes the socket
+            self.metrics.record(command, throttle,
+                                time.perf_counter() - start,
+                                bytes_out=len(request), error='socket')
             raise SocketError()
-        self._time_last_request = time.time()
-        res = json.loads(response)
+        received = time.perf_counter()
+        self.bytes_sent += len(request)
+        self.bytes_received += len(response)
+        res = self.codec.loads(response)
+        self.metrics.record(command, throttle, received - start,
+                            time.perf_counter() - received, len(request),
+                            len(response),
+                            None if res['status'] else res.get('errorCode'))
         if res['status'] is False:
             raise CommandFailed(res)
         if 'returnData' in res.keys():
             self.LOGGER.info("CMD: done")
-            self.LOGGER.debug(res['returnData'])
+            # formatted only if emitted, and never whole
+            self.LOGGER.debug("response: %.*s", LOG_TRUNCATE, response)
             return res['returnData']
+        return res
 
     def _send_command_with_check(self, dict_data):
         """with check login"""
         return self._login_decorator(self._send_command, dict_data)
 
+    def _open_session(self, user_id, password, mode):
+        """new socket logged in, return (ws, login response)"""
+        data = _get_data("login", userId=user_id, password=password)
+        ws = self.transport(self.url.format(mode=mode))
+        try:
+            return ws, self._request(ws, data)
+        except Exception:
+            ws.close()
+            raise
+
+    def _swap_session(self, ws, response):
+        with self._ws_lock:
+            old, self.ws = self.ws, ws
+            self.stream_session_id = response['streamSessionId']
+            self.connected_at = time.monotonic()
+        if old is not None:
+            try:
+                old.close()
+            except Exception:
+                pass
+            self._session_swapped()
+
+    def _session_swapped(self):
+        for callback in list(self._session_callbacks):
+            try:
+                callback(self.stream_session_id)
+            except Exception:
+                LOGGER.exception("session callback failed")
+
+    def on_session_swap(self, callback):
+        """call callback(stream_session_id) when a new session replaces
+        the one in use, by refresh_session or a login again, streams
+        opened with StreamClient.from_client follow it by themselves"""
+        self._session_callbacks.append(callback)
+
+    def remove_session_callback(self, callback):
+        self._session_callbacks.remove(callback)
+
     def login(self, user_id, password, mode='demo'):
         """login command"""
-        data = _get_data("login", userId=user_id, password=password)
-        self.ws = create_connection(f"wss://ws.xtb.com/{mode}")
-        response = self._send_command(data)
+        ws, response = self._open_session(user_id, password, mode)
+        self._swap_session(ws, response)
         self._login_data = (user_id, password)
+        self.mode = mode
         self.status = STATUS.LOGGED
         self.LOGGER.info("CMD: login...")
         return response
 
+    def refresh_session(self):
+        """log in on a standby socket and swap it in, the command in
+        flight ends on the old socket and the next ones use the new one
+
+        the callbacks of on_session_swap get the new stream_session_id"""
+        if self.status == STATUS.NOT_LOGGED:
+            raise NotLogged()
+        start = time.perf_counter()
+        ws, response = self._open_session(*self._login_data, self.mode)
+        self._swap_session(ws, response)
+        elapsed = time.perf_counter() - start
+        self.session_stats['refreshes'] += 1
+        self.session_stats['refresh_time'] += elapsed
+        self.session_stats['last_refresh_time'] = elapsed
+        self.LOGGER.info("session refreshed in %.3f s", elapsed)
+        return response
+
+    def session_age(self):
+        """seconds since the socket in use was logged in"""
+        if self.connected_at is None:
+            return None
+        return time.monotonic() - self.connected_at
+
     def logout(self):
         """logout command"""
         data = _get_data("logout")
@@ -183,8 +379,8 @@ class BaseClient(object):
             "symbol": symbol
         }
         data = _get_data("getChartLastRequest", info=args)
-        self.LOGGER.info(f"CMD: get chart last request for {symbol} of period"
-                         f" {period} from {start}...")
+        self.LOGGER.info("CMD: get chart last request for %s of period %s "
+                         "from %s...", symbol, period, start)
 
         return self._send_command_with_check(data)
 
@@ -192,7 +388,6 @@ class BaseClient(object):
         """getChartRangeRequest command"""
         if not isinstance(ticks, int):
             raise ValueError(f"ticks value {ticks} must be int")
-        self._check_login()
         args = {
             "end": end * 1000,
             "period": period,
@@ -201,16 +396,16 @@ class BaseClient(object):
             "ticks": ticks
         }
         data = _get_data("getChartRangeRequest", info=args)
-        self.LOGGER.info(f"CMD: get chart range request for {symbol} of "
-                         f"{period} from {start} to {end} with ticks of "
-                         f"{ticks}...")
+        self.LOGGER.info("CMD: get chart range request for %s of %s from %s "
+                         "to %s with ticks of %s...", symbol, period, start,
+                         end, ticks)
         return self._send_command_with_check(data)
 
     def get_commission(self, symbol, volume):
         """getCommissionDef command"""
         volume = _check_volume(volume)
         data = _get_data("getCommissionDef", symbol=symbol, volume=volume)
-        self.LOGGER.info(f"CMD: get commission for {symbol} of {volume}...")
+        self.LOGGER.info("CMD: get commission for %s of %s...", symbol, volume)
         return self._send_command_with_check(data)
 
     def get_margin_level(self):
@@ -225,7 +420,8 @@ class BaseClient(object):
         get expected margin for volumes used symbol"""
         volume = _check_volume(volume)
         data = _get_data("getMarginTrade", symbol=symbol, volume=volume)
-        self.LOGGER.info(f"CMD: get margin trade for {symbol} of {volume}...")
+        self.LOGGER.info("CMD: get margin trade for %s of %s...",
+                         symbol, volume)
         return self._send_command_with_check(data)
 
     def get_profit_calculation(self, symbol, mode, volume, op_price, cl_price):
@@ -236,9 +432,9 @@ class BaseClient(object):
         data = _get_data("getProfitCalculation", closePrice=cl_price,
                          cmd=mode, openPrice=op_price, symbol=symbol,
                          volume=volume)
-        self.LOGGER.info(f"CMD: get profit calculation for {symbol} of "
-                         f"{volume} from {op_price} to {cl_price} in mode "
-                         f"{mode}...")
+        self.LOGGER.info("CMD: get profit calculation for %s of %s from %s "
+                         "to %s in mode %s...", symbol, volume, op_price,
+                         cl_price, mode)
         return self._send_command_with_check(data)
 
     def get_server_time(self):
@@ -250,23 +446,23 @@ class BaseClient(object):
     def get_symbol(self, symbol):
         """getSymbol command"""
         data = _get_data("getSymbol", symbol=symbol)
-        self.LOGGER.info(f"CMD: get symbol {symbol}...")
+        self.LOGGER.info("CMD: get symbol %s...", symbol)
         return self._send_command_with_check(data)
 
     def get_tick_prices(self, symbols, start, level=0):
         """getTickPrices command"""
         data = _get_data("getTickPrices", level=level, symbols=symbols,
                          timestamp=start)
-        self.LOGGER.info(f"CMD: get tick prices of {symbols} from {start} "
-                         f"with level {level}...")
+        self.LOGGER.info("CMD: get tick prices of %s from %s with level "
+                         "%s...", symbols, start, level)
         return self._send_command_with_check(data)
 
     def get_trade_records(self, trade_position_list):
         """getTradeRecords command
         takes a list of position id"""
         data = _get_data("getTradeRecords", orders=trade_position_list)
-        self.LOGGER.info(f"CMD: get trade records of len "
-                         f"{len(trade_position_list)}...")
+        self.LOGGER.info("CMD: get trade records of len %s...",
+                         len(trade_position_list))
         return self._send_command_with_check(data)
 
     def get_trades(self, opened_only=True):
@@ -279,24 +475,23 @@ class BaseClient(object):
         """getTradesHistory command
         can take 0 as actual time"""
         data = _get_data("getTradesHistory", end=end, start=start)
-        self.LOGGER.info(f"CMD: get trades history from {start} to {end}...")
+        self.LOGGER.info("CMD: get trades history from %s to %s...",
+                         start, end)
         return self._send_command_with_check(data)
 
+    def iter_trades_history(self, start, end=0, **kwargs):
+        """closed trades from start to end yielded window by window, see
+        XTBApi.history.iter_trades_history"""
+        return iter_trades_history(self, start, end, **kwargs)
+
     def get_trading_hours(self, trade_position_list):
         """getTradingHours command"""
         # EDITED IN ALPHA2
         data = _get_data("getTradingHours", symbols=trade_position_list)
-        self.LOGGER.info(f"CMD: get trading hours of len "
-                         f"{len(trade_position_list)}...")
+        self.LOGGER.info("CMD: get trading hours of len %s...",
+                         len(trade_position_list))
         response = self._send_command_with_check(data)
-        for symbol in response:
-            for day in symbol['trading']:
-                day['fromT'] = int(day['fromT'] / 1000)
-                day['toT'] = int(day['toT'] / 1000)
-            for day in symbol['quotes']:
-                day['fromT'] = int(day['fromT'] / 1000)
-                day['toT'] = int(day['toT'] / 1000)
-        return response
+        return _convert_trading_hours(response)
 
     def get_version(self):
         """getVersion command"""
@@ -338,15 +533,15 @@ class BaseClient(object):
         name_of_mode = [x.name for x in MODES if x.value == mode][0]
         name_of_type = [x.name for x in TRANS_TYPES if x.value ==
                         trans_type][0]
-        self.LOGGER.info(f"CMD: trade transaction of {symbol} of mode "
-                         f"{name_of_mode} with type {name_of_type} of "
-                         f"{volume}...")
+        self.LOGGER.info("CMD: trade transaction of %s of mode %s with type "
+                         "%s of %s...", symbol, name_of_mode, name_of_type,
+                         volume)
         return self._send_command_with_check(data)
 
     def trade_transaction_status(self, order_id):
         """tradeTransactionStatus command"""
         data = _get_data("tradeTransactionStatus", order=order_id)
-        self.LOGGER.info(f"CMD: trade transaction status for {order_id}...")
+        self.LOGGER.info("CMD: trade transaction status for %s...", order_id)
         return self._send_command_with_check(data)
 
     def get_user_data(self):
@@ -356,122 +551,191 @@ class BaseClient(object):
         return self._send_command_with_check(data)
 
 
-class Transaction(object):
-    def __init__(self, trans_dict):
-        self._trans_dict = trans_dict
-        self.mode = {0: 'buy', 1: 'sell'}[trans_dict['cmd']]
-        self.order_id = trans_dict['order']
-        self.symbol = trans_dict['symbol']
-        self.volume = trans_dict['volume']
-        self.price = trans_dict['close_price']
-        self.actual_profit = trans_dict['profit']
-        self.timestamp = trans_dict['open_time'] / 1000
-        LOGGER.debug(f"Transaction {self.order_id} inited")
-
-
 class Client(BaseClient):
-    """advanced class of client"""
-    def __init__(self):
-        super().__init__()
-        self.trade_rec = {}
+    """advanced class of client
+
+    symbol metadata is cached in ``symbol_cache``, which serves
+    get_symbol and get_all_symbols, attach it to a stream to get prices
+    without round trips, trading hours are cached in
+    ``trading_calendar``, open positions are kept in ``trade_book`` and
+    ``trade_rec`` is its dict of Transaction by order, attach
+    ``status_tracker`` to a stream to confirm bulk transactions from the
+    tradeStatus events"""
+    def __init__(self, url=WS_URL, limiter=None, codec=None, metrics=None,
+                 transport=None):
+        super().__init__(url, limiter, codec, metrics, transport)
+        self.trade_book = TradeBook(self)
+        self.trade_rec = self.trade_book.trades
+        self.status_tracker = StatusTracker()
+        self.order_latencies = deque(maxlen=ORDER_LATENCIES)
+        self._order_templates = {}
+        self.symbol_cache = SymbolCache(self)
+        self.trading_calendar = TradingCalendar(self)
+        self.history_stats = {'requests': 0, 'bytes': 0, 'candles': 0}
         self.LOGGER = logging.getLogger('XTBApi.api.Client')
         self.LOGGER.info("Client inited")
 
-    def check_if_market_open(self, list_of_symbols):
-        """check if market is open for symbol in symbols"""
-        _td = datetime.today()
-        actual_tmsp = _td.hour * 3600 + _td.minute * 60 + _td.second
-        response = self.get_trading_hours(list_of_symbols)
-        market_values = {}
-        for symbol in response:
-            today_values = [day for day in symbol['trading'] if day['day'] ==
-                _td.isoweekday()][0]
-            if today_values['fromT'] <= actual_tmsp <= today_values['toT']:
-                market_values[symbol['symbol']] = True
-            else:
-                market_values[symbol['symbol']] = False
-        return market_values
-
-    def get_lastn_candle_history(self, symbol, timeframe_in_seconds, number):
-        """get last n candles of timeframe"""
-        acc_tmf = [60, 300, 900, 1800, 3600, 14400, 86400, 604800, 2592000]
-        if timeframe_in_seconds not in acc_tmf:
-            raise ValueError(f"timeframe not accepted, not in "
-                             f"{', '.join([str(x) for x in acc_tmf])}")
-        sec_prior = timeframe_in_seconds * number
-        LOGGER.debug(f"sym: {symbol}, tmf: {timeframe_in_seconds},"
-                     f" {time.time() - sec_prior}")
-        res = {'rateInfos': []}
-        while len(res['rateInfos']) < number:
-            res = self.get_chart_last_request(symbol,
-                timeframe_in_seconds // 60, time.time() - sec_prior)
-            LOGGER.debug(res)
-            res['rateInfos'] = res['rateInfos'][-number:]
-            sec_prior *= 3
-        candle_history = []
-        for candle in res['rateInfos']:
-            _pr = candle['open']
-            op_pr = _pr / 10 ** res['digits']
-            cl_pr = (_pr + candle['close']) / 10 ** res['digits']
-            hg_pr = (_pr + candle['high']) / 10 ** res['digits']
-            lw_pr = (_pr + candle['low']) / 10 ** res['digits']
-            new_candle_entry = {'timestamp': candle['ctm'] / 1000, 'open':
-                op_pr, 'close': cl_pr, 'high': hg_pr, 'low': lw_pr,
-                                'volume': candle['vol']}
-            candle_history.append(new_candle_entry)
-        LOGGER.debug(candle_history)
-        return candle_history
+    def get_all_symbols(self, fresh=False, static=False):
+        """getAllSymbols command, served by symbol_cache when every symbol
+        has a fresh quote from a stream, or if fresh from the server
+
+        with static only the static fields of every symbol are returned,
+        from symbol_cache"""
+        if static:
+            return self.symbol_cache.get_all_symbols()
+        if fresh:
+            return super().get_all_symbols()
+        return self.symbol_cache.get_all_records()
+
+    def get_symbol(self, symbol, fresh=False):
+        """getSymbol command served by symbol_cache, with a round trip
+        only without a fresh quote from a stream, or if fresh"""
+        if fresh:
+            return super().get_symbol(symbol)
+        return self.symbol_cache.get_symbol(symbol)
+
+    def check_if_market_open(self, list_of_symbols, timestamp=None):
+        """check if market is open for symbol in symbols, at server time
+        of timestamp or now"""
+        return self.trading_calendar.is_open_many(list_of_symbols, timestamp)
+
+    def get_lastn_candle_history(self, symbol, timeframe_in_seconds, number,
+                                 as_array=False):
+        """get last n candles of timeframe
+
+        the window is computed from the trading hours, if candles are
+        still missing only the older range is fetched and merged.
+        With as_array the candles are decoded in a numpy array of
+        XTBApi.candles.CANDLE_DTYPE instead of a list of dicts"""
+        _check_timeframe(timeframe_in_seconds)
+        period = timeframe_in_seconds // 60
+        start = self.trading_calendar.window_start(
+            symbol, timeframe_in_seconds, number)
+        LOGGER.debug("sym: %s, tmf: %s, %s", symbol, timeframe_in_seconds,
+                     start)
+        bytes_received = self.bytes_received
+        res = self.get_chart_last_request(symbol, period, int(start))
+        requests = 1
+        merge = _merge_lastn(res, number)
+        older = None
+        try:
+            while True:
+                first, ticks = merge.send(older)
+                older = self.get_chart_range_request(
+                    symbol, period, first, first, ticks)['rateInfos']
+                requests += 1
+        except StopIteration:
+            pass
+        self.history_stats['requests'] += requests
+        self.history_stats['bytes'] += self.bytes_received - bytes_received
+        self.history_stats['candles'] += len(res['rateInfos'])
+        if as_array:
+            from XTBApi.candles import decode_rate_infos
+            return decode_rate_infos(res)
+        return _format_candles(res)
+
+    def bytes_per_candle(self):
+        """bytes fetched per candle returned by get_lastn_candle_history"""
+        candles = self.history_stats['candles']
+        return self.history_stats['bytes'] / candles if candles else 0.0
 
     def update_trades(self):
         """update trade list"""
-        trades = self.get_trades()
-        self.trade_rec.clear()
-        for trade in trades:
-            obj_trans = Transaction(trade)
-            self.trade_rec[obj_trans.order_id] = obj_trans
-        #values_to_del = [key for key, trad_not_listed in
-        #                 self.trade_rec.items() if trad_not_listed.order_id
-        #                 not in [x['order'] for x in trades]]
-        #for key in values_to_del:
-        #    del self.trade_rec[key]
-        self.LOGGER.info(f"updated {len(self.trade_rec)} trades")
+        self.trade_book.refresh()
+        self.LOGGER.info("updated %s trades", len(self.trade_rec))
         return self.trade_rec
 
     def get_trade_profit(self, trans_id):
-        """get profit of trade"""
-        self.update_trades()
-        profit = self.trade_rec[trans_id].actual_profit
-        self.LOGGER.info(f"got trade profit of {profit}")
+        """get profit of trade, asked to the server only if the trade book
+        is older than its max_age"""
+        profit = self.trade_book.get_trade(trans_id).actual_profit
+        self.LOGGER.info("got trade profit of %s", profit)
         return profit
 
     def open_trade(self, mode, symbol, volume):
         """open trade transaction"""
-        if mode in [MODES.BUY.value, MODES.SELL.value]:
-            mode = [x for x in MODES if x.value == mode][0]
-        elif mode in ['buy', 'sell']:
-            modes = {'buy': MODES.BUY, 'sell': MODES.SELL}
-            mode = modes[mode]
-        else:
-            raise ValueError("mode can be buy or sell")
+        mode = _get_trade_mode(mode)
         mode_name = mode.name
         mode = mode.value
-        self.LOGGER.debug(f"opening trade of {symbol} of {volume} with "
-                          f"{mode_name}")
+        self.LOGGER.debug("opening trade of %s of %s with %s", symbol, volume,
+                          mode_name)
         conversion_mode = {MODES.BUY.value: 'ask', MODES.SELL.value: 'bid'}
-        price = self.get_symbol(symbol)[conversion_mode[mode]]
+        price = self.symbol_cache.get_symbol(symbol)[conversion_mode[mode]]
         response = self.trade_transaction(symbol, mode, 0, volume, price=price)
-        self.update_trades()
+        self.trade_book.invalidate()
         status = self.trade_transaction_status(response['order'])[
             'requestStatus']
-        self.LOGGER.debug(f"open_trade completed with status of {status}")
+        self.LOGGER.debug("open_trade completed with status of %s", status)
         if status != 3:
             raise TransactionRejected(status)
         return response
 
+    def order_template(self, symbol):
+        """OrderTemplate of symbol, call it ahead to have it ready"""
+        template = self._order_templates.get(symbol)
+        if template is None:
+            template = OrderTemplate(self.symbol_cache.get_spec(symbol))
+            self._order_templates[symbol] = template
+        return template
+
+    def fast_open_trade(self, mode, symbol, volume, wait=True,
+                        timeout=STATUS_TIMEOUT, **kwargs):
+        """open a market order with a single round trip when possible
+
+        the price comes from the quotes of symbol_cache (attach it to a
+        tick stream), the command from order_template and the trade book
+        is only invalidated. If wait is False the order is returned before
+        its status, pass it to confirm_order later.
+
+        returns a dict with the transaction order, its price, status and
+        the latency in seconds of each step from the call"""
+        start = time.perf_counter()
+        mode = _get_trade_mode(mode).value
+        quote = self.symbol_cache.get_quote(symbol)
+        if quote is None:
+            quote = self.symbol_cache.get_symbol(symbol)
+        price = quote['ask' if mode == MODES.BUY.value else 'bid']
+        quoted = time.perf_counter()
+        data = self.order_template(symbol).build(mode, volume, price,
+                                                 **kwargs)
+        built = time.perf_counter()
+        response = self._send_command_with_check(data)
+        sent = time.perf_counter()
+        self.trade_book.invalidate()
+        order = {'order': response['order'], 'symbol': symbol,
+                 'price': price, 'status': None, 'started': start,
+                 'latency': {'quote': quoted - start, 'build': built - quoted,
+                             'send': sent - built}}
+        if wait:
+            self.confirm_order(order, timeout)
+        return order
+
+    def confirm_order(self, order, timeout=STATUS_TIMEOUT):
+        """wait the status of an order of fast_open_trade, from the
+        status_tracker if attached, raise TransactionRejected if refused"""
+        transaction = order['order']
+        status = None
+        if self.status_tracker.attached:
+            status = self.status_tracker.wait([transaction],
+                                              timeout).get(transaction)
+        if status is None:
+            status = self.trade_transaction_status(transaction)
+        order['status'] = status['requestStatus']
+        latency = order['latency']
+        latency['total'] = time.perf_counter() - order['started']
+        latency['confirm'] = latency['total'] - latency['quote'] - \
+            latency['build'] - latency['send']
+        self.order_latencies.append(latency)
+        self.LOGGER.debug("order %s confirmed in %.6f s", transaction,
+                          latency['total'])
+        if order['status'] != ACCEPTED:
+            raise TransactionRejected(order['status'])
+        return order
+
     def _close_trade_only(self, order_id):
         """faster but less secure"""
         trade = self.trade_rec[order_id]
-        self.LOGGER.debug(f"closing trade {order_id}")
+        self.LOGGER.debug("closing trade %s", order_id)
         try:
             response = self.trade_transaction(
                 trade.symbol, 0, 2, trade.volume, order=trade.order_id,
@@ -479,14 +743,16 @@ class Client(BaseClient):
         except CommandFailed as e:
             if e.err_code == 'BE51':  # order already closed
                 self.LOGGER.debug("BE51 error code noticed")
+                self.trade_book.remove(order_id)
                 return 'BE51'
             else:
                 raise
         status = self.trade_transaction_status(
             response['order'])['requestStatus']
-        self.LOGGER.debug(f"close_trade completed with status of {status}")
+        self.LOGGER.debug("close_trade completed with status of %s", status)
         if status != 3:
             raise TransactionRejected(status)
+        self.trade_book.remove(order_id)
         return response
 
     def close_trade(self, trans):
@@ -495,16 +761,103 @@ class Client(BaseClient):
             order_id = trans.order_id
         else:
             order_id = trans
-        self.update_trades()
+        self.trade_book.get_trade(order_id)
         return self._close_trade_only(order_id)
 
-    def close_all_trades(self):
-        """close all trades"""
-        self.update_trades()
-        self.LOGGER.debug(f"closing {len(self.trade_rec)} trades")
-        trade_ids = self.trade_rec.keys()
-        for trade_id in trade_ids:
-            self._close_trade_only(trade_id)
+    def _bulk_transactions(self, order_ids, send, timeout):
+        """send every transaction within the rate limit, then confirm
+        them all, from the tradeStatus stream if status_tracker is
+        attached or with tradeTransactionStatus
+
+        returns {order_id: result} where result has the transaction order,
+        its requestStatus, the CommandFailed error if refused, or KeyError
+        if the order is not open, and the seconds from the start when it
+        was sent and confirmed"""
+        start = time.monotonic()
+        results = {}
+        sent = {}
+        # one snapshot, the book must not be refreshed during the burst
+        trades = dict(self.trade_book.get())
+        for order_id in order_ids:
+            result = {'order': order_id, 'transaction': None,
+                      'status': None, 'error': None}
+            results[order_id] = result
+            try:
+                trade = trades.get(order_id)
+                if trade is None:
+                    raise KeyError(order_id)
+                result['transaction'] = send(trade)['order']
+                sent[result['transaction']] = result
+            except (CommandFailed, KeyError) as e:
+                result['error'] = e
+            result['sent'] = result['confirmed'] = time.monotonic() - start
+        statuses = {}
+        if sent and self.status_tracker.attached:
+            statuses = self.status_tracker.wait(list(sent), timeout)
+        for transaction, result in sent.items():
+            status = statuses.get(transaction)
+            if status is None:
+                status = self.trade_transaction_status(transaction)
+            result['status'] = status['requestStatus']
+            result['confirmed'] = time.monotonic() - start
+        return results
+
+    def close_trades(self, order_ids=None, timeout=STATUS_TIMEOUT):
+        """close orders, every open trade if None, sending all the closes
+        before confirming them; orders already closed (BE51) or unknown
+        (KeyError) are reported with their error and dropped from the
+        trade book
+
+        :param timeout: seconds to wait for the tradeStatus events before
+            asking the statuses left
+        """
+        trades = self.trade_book.get()
+        if order_ids is None:
+            order_ids = list(trades)
+        self.LOGGER.debug("closing %s trades", len(order_ids))
+
+        def send(trade):
+            return self.trade_transaction(
+                trade.symbol, 0, TRANS_TYPES.CLOSE.value, trade.volume,
+                order=trade.order_id, price=trade.price)
+        results = self._bulk_transactions(order_ids, send, timeout)
+        for order_id, result in results.items():
+            if result['status'] == ACCEPTED or _closed(result['error']):
+                self.trade_book.remove(order_id)
+        return results
+
+    def modify_trades(self, changes, timeout=STATUS_TIMEOUT):
+        """change stop loss and take profit of many orders, as
+        close_trades
+
+        :param changes: dict of order to dict with sl and/or tp, the one
+            not given is kept from the trade
+        """
+        def send(trade):
+            change = dict(changes[trade.order_id])
+            return self.trade_transaction(
+                trade.symbol, MODES[trade.mode.upper()].value,
+                TRANS_TYPES.MODIFY.value, trade.volume,
+                stop_loss=change.pop('sl', trade.sl),
+                take_profit=change.pop('tp', trade.tp),
+                order=trade.order_id, price=trade.price, **change)
+        results = self._bulk_transactions(list(changes), send, timeout)
+        self.trade_book.invalidate()
+        return results
+
+    def close_all_trades(self, timeout=STATUS_TIMEOUT):
+        """close all trades, see close_trades
+
+        raises the first error other than BE51 or KeyError, or
+        TransactionRejected, after every close has been sent"""
+        results = self.close_trades(timeout=timeout)
+        for result in results.values():
+            error = result['error']
+            if error is not None and not _closed(error):
+                raise error
+            if result['status'] not in (None, ACCEPTED):
+                raise TransactionRejected(result['status'])
+        return results
 
 
 # - next features -
@@ -0,0 +1,303 @@
+# -*- coding utf-8 -*-
+
+"""
+XTBApi.async_api
+~~~~~~~
+
+asyncio clients, requests are tagged with customTag and matched to their
+responses by a reader task so that many commands can be in flight on the
+same socket within the rate limit. Requires the ``websockets`` package.
+"""
+
+import asyncio
+import itertools
+import logging
+import time
+
+import websockets
+
+from XTBApi.api import (BaseClient, MODES, STATUS, Transaction, WS_URL,
+                        _check_timeframe, _convert_trading_hours,
+                        _format_candles, _get_data, _get_trade_mode,
+                        _merge_lastn)
+from XTBApi.exceptions import *
+from XTBApi.hours import TradingCalendar
+from XTBApi.trades import TradeBook
+
+LOGGER = logging.getLogger('XTBApi.async_api')
+
+
+class AsyncBaseClient(BaseClient):
+    """asyncio version of BaseClient
+
+    every command of BaseClient is available as a coroutine,
+    e.g. ``await client.get_symbol('EURUSD')``"""
+
+    def __init__(self, url=WS_URL, limiter=None, codec=None, metrics=None):
+        super().__init__(url, limiter, codec, metrics)
+        self._tags = itertools.count(1)
+        self._pending = {}
+        self._reader = None
+        self._login_lock = None
+        self._connection_id = 0
+        self.LOGGER = logging.getLogger('XTBApi.async_api.AsyncBaseClient')
+
+    async def _connect(self, mode):
+        if self._reader is not None:
+            await self._disconnect()
+        if self._login_lock is None:
+            self._login_lock = asyncio.Lock()
+        self.ws = await websockets.connect(self.url.format(mode=mode),
+                                           max_size=None)
+        self._connection_id += 1
+        self._reader = asyncio.ensure_future(self._read_loop(self.ws))
+
+    async def _disconnect(self):
+        self._reader.cancel()
+        try:
+            await self._reader
+        except asyncio.CancelledError:
+            pass
+        self._reader = None
+        await self.ws.close()
+
+    async def _read_loop(self, ws):
+        """dispatch every response to the command waiting for its tag"""
+        try:
+            async for message in ws:
+                received = time.perf_counter()
+                res = self.codec.loads(message)
+                future = self._pending.pop(res.get('customTag'), None)
+                if future is None:
+                    self.LOGGER.warning("response without request: %.200s",
+                                        message)
+                elif not future.done():
+                    future.set_result((res, received, len(message),
+                                       time.perf_counter() - received))
+        except websockets.ConnectionClosed:
+            self.LOGGER.debug("connection closed")
+        finally:
+            pending = list(self._pending.values())
+            self._pending.clear()
+            for future in pending:
+                if not future.done():
+                    future.set_exception(SocketError())
+
+    async def _send_command(self, dict_data):
+        """send command to api and wait for the tagged response"""
+        command = dict_data['command']
+        wait = self.limiter.reserve(command)
+        if wait > 0:
+            await asyncio.sleep(wait)
+        tag = str(next(self._tags))
+        future = asyncio.get_running_loop().create_future()
+        self._pending[tag] = future
+        request = self.codec.dumps(dict(dict_data, customTag=tag))
+        start = time.perf_counter()
+        try:
+            await self.ws.send(request, text=True)
+        except websockets.ConnectionClosed:
+            self._pending.pop(tag, None)
+            raise SocketError()
+        try:
+            res, received, size, decode = await future
+        except SocketError:
+            self.metrics.record(command, wait, time.perf_counter() - start,
+                                bytes_out=len(request), error='socket')
+            raise
+        self.metrics.record(command, wait, received - start, decode,
+                            len(request), size,
+                            None if res['status'] else res.get('errorCode'))
+        if res['status'] is False:
+            raise CommandFailed(res)
+        if 'returnData' in res.keys():
+            self.LOGGER.info("CMD: done")
+            return res['returnData']
+        return res
+
+    async def _relogin(self, connection_id):
+        # only the first failed command logs in again, the others reuse it
+        async with self._login_lock:
+            if connection_id == self._connection_id:
+                await self.login(*self._login_data, mode=self.mode)
+
+    async def _login_decorator(self, func, *args, **kwargs):
+        if self.status == STATUS.NOT_LOGGED:
+            raise NotLogged()
+        connection_id = self._connection_id
+        try:
+            return await func(*args, **kwargs)
+        except SocketError:
+            LOGGER.info("re-logging in due to LOGIN_TIMEOUT gone")
+            await self._relogin(connection_id)
+            return await func(*args, **kwargs)
+
+    def _send_command_with_check(self, dict_data):
+        """with check login, returns an awaitable"""
+        return self._login_decorator(self._send_command, dict_data)
+
+    async def login(self, user_id, password, mode='demo'):
+        """login command"""
+        data = _get_data("login", userId=user_id, password=password)
+        await self._connect(mode)
+        response = await self._send_command(data)
+        self._login_data = (user_id, password)
+        self.mode = mode
+        self.stream_session_id = response['streamSessionId']
+        self.status = STATUS.LOGGED
+        self.LOGGER.info("CMD: login...")
+        return response
+
+    async def logout(self):
+        """logout command"""
+        data = _get_data("logout")
+        response = await self._send_command(data)
+        self.status = STATUS.NOT_LOGGED
+        self.LOGGER.info("CMD: logout...")
+        await self._disconnect()
+        return response
+
+    def refresh_session(self):
+        """not available on the asyncio clients, the socket is opened
+        again by the next command after a SocketError"""
+        raise NotImplementedError(
+            "refresh_session is not available on the asyncio clients, "
+            "await login() to open a new session")
+
+    def iter_trades_history(self, start, end=0, **kwargs):
+        """not available on the asyncio clients"""
+        raise NotImplementedError(
+            "iter_trades_history is not available on the asyncio clients, "
+            "await get_trades_history(start, end) window by window")
+
+    async def get_trading_hours(self, trade_position_list):
+        """getTradingHours command"""
+        data = _get_data("getTradingHours", symbols=trade_position_list)
+        self.LOGGER.info("CMD: get trading hours of len %s...",
+                         len(trade_position_list))
+        response = await self._send_command_with_check(data)
+        return _convert_trading_hours(response)
+
+    async def ping(self):
+        """ping command"""
+        data = _get_data("ping")
+        self.LOGGER.info("CMD: get ping...")
+        await self._send_command_with_check(data)
+
+
+class AsyncClient(AsyncBaseClient):
+    """asyncio version of Client, trading hours are cached in
+    ``trading_calendar``"""
+    def __init__(self, url=WS_URL, limiter=None, codec=None, metrics=None):
+        super().__init__(url, limiter, codec, metrics)
+        self.trade_book = TradeBook(self)
+        self.trade_rec = self.trade_book.trades
+        self.trading_calendar = TradingCalendar(self)
+        self.LOGGER = logging.getLogger('XTBApi.async_api.AsyncClient')
+        self.LOGGER.info("AsyncClient inited")
+
+    async def _load_calendar(self, symbols):
+        """fetch the server time and the schedules trading_calendar
+        needs for symbols"""
+        calendar = self.trading_calendar
+        if calendar.needs_server_time():
+            calendar.set_server_time(await self.get_server_time())
+        missing = calendar.missing(symbols)
+        if missing:
+            calendar.set_trading_hours(await self.get_trading_hours(missing))
+
+    async def check_if_market_open(self, list_of_symbols, timestamp=None):
+        """check if market is open for symbol in symbols, at server time
+        of timestamp or now"""
+        await self._load_calendar(list_of_symbols)
+        return self.trading_calendar.is_open_many(list_of_symbols, timestamp)
+
+    async def get_lastn_candle_history(self, symbol, timeframe_in_seconds,
+                                       number, as_array=False):
+        """get last n candles of timeframe, as Client does"""
+        _check_timeframe(timeframe_in_seconds)
+        period = timeframe_in_seconds // 60
+        await self._load_calendar([symbol])
+        start = self.trading_calendar.window_start(
+            symbol, timeframe_in_seconds, number)
+        res = await self.get_chart_last_request(symbol, period, int(start))
+        merge = _merge_lastn(res, number)
+        older = None
+        try:
+            while True:
+                first, ticks = merge.send(older)
+                older = (await self.get_chart_range_request(
+                    symbol, period, first, first, ticks))['rateInfos']
+        except StopIteration:
+            pass
+        if as_array:
+            from XTBApi.candles import decode_rate_infos
+            return decode_rate_infos(res)
+        return _format_candles(res)
+
+    async def update_trades(self):
+        """update trade list"""
+        self.trade_book.apply(await self.get_trades())
+        self.LOGGER.info("updated %s trades", len(self.trade_rec))
+        return self.trade_rec
+
+    async def get_trade_profit(self, trans_id):
+        """get profit of trade"""
+        await self.update_trades()
+        profit = self.trade_rec[trans_id].actual_profit
+        self.LOGGER.info("got trade profit of %s", profit)
+        return profit
+
+    async def open_trade(self, mode, symbol, volume):
+        """open trade transaction"""
+        mode = _get_trade_mode(mode).value
+        conversion_mode = {MODES.BUY.value: 'ask', MODES.SELL.value: 'bid'}
+        price = (await self.get_symbol(symbol))[conversion_mode[mode]]
+        response = await self.trade_transaction(symbol, mode, 0, volume,
+                                                price=price)
+        trades, status = await asyncio.gather(
+            self.update_trades(),
+            self.trade_transaction_status(response['order']))
+        status = status['requestStatus']
+        self.LOGGER.debug("open_trade completed with status of %s", status)
+        if status != 3:
+            raise TransactionRejected(status)
+        return response
+
+    async def _close_trade_only(self, order_id):
+        trade = self.trade_rec[order_id]
+        self.LOGGER.debug("closing trade %s", order_id)
+        try:
+            response = await self.trade_transaction(
+                trade.symbol, 0, 2, trade.volume, order=trade.order_id,
+                price=trade.price)
+        except CommandFailed as e:
+            if e.err_code == 'BE51':  # order already closed
+                self.LOGGER.debug("BE51 error code noticed")
+                self.trade_book.remove(order_id)
+                return 'BE51'
+            else:
+                raise
+        status = (await self.trade_transaction_status(
+            response['order']))['requestStatus']
+        self.LOGGER.debug("close_trade completed with status of %s", status)
+        if status != 3:
+            raise TransactionRejected(status)
+        self.trade_book.remove(order_id)
+        return response
+
+    async def close_trade(self, trans):
+        """close trade transaction"""
+        if isinstance(trans, Transaction):
+            order_id = trans.order_id
+        else:
+            order_id = trans
+        await self.update_trades()
+        return await self._close_trade_only(order_id)
+
+    async def close_all_trades(self):
+        """close all trades, the closes are in flight together"""
+        await self.update_trades()
+        self.LOGGER.debug("closing %s trades", len(self.trade_rec))
+        return await asyncio.gather(*[self._close_trade_only(trade_id) for
+                                      trade_id in list(self.trade_rec)])
@@ -0,0 +1,221 @@
+# -*- coding utf-8 -*-
+
+"""
+XTBApi.backfill
+~~~~~~~
+
+Resumable download of the candle history of many symbols and periods,
+split in chunks that the server accepts and delivered in order to a sink
+such as CandleStore.append. Requires numpy.
+"""
+
+import concurrent.futures
+import json
+import logging
+import os
+import time
+
+from XTBApi.api import PERIOD
+from XTBApi.candles import decode_rate_infos
+from XTBApi.exceptions import *
+from XTBApi.pool import SessionPool
+
+LOGGER = logging.getLogger('XTBApi.backfill')
+CHUNK_CANDLES = 1000
+DAY = 86400
+# days of history the server keeps for periods up to the key, in minutes
+HISTORY_DAYS = ((PERIOD.ONE_MINUTE.value, 31),
+                (PERIOD.THIRTY_MINUTES.value, 7 * 31),
+                (PERIOD.FOUR_HOURS.value, 13 * 31))
+
+
+def history_start(period, now=None):
+    """oldest timestamp the server has candles of period for, None if
+    there is no limit"""
+    if now is None:
+        now = time.time()
+    for max_period, days in HISTORY_DAYS:
+        if period <= max_period:
+            return now - days * DAY
+    return None
+
+
+class _Chunk(object):
+    __slots__ = ('symbol', 'period', 'start', 'end', 'index')
+
+    def __init__(self, symbol, period, start, end, index):
+        self.symbol = symbol
+        self.period = period
+        self.start = start
+        self.end = end
+        self.index = index
+
+    @property
+    def key(self):
+        return "{}|{}".format(self.symbol, self.period)
+
+
+class BackfillJob(object):
+    """download the candles of symbols x periods from start to end, unix
+    timestamps, into ``sink(symbol, period, candles)``
+
+    every (symbol, period) is split in chunks of ``chunk_candles`` bars
+    within the history kept by the server. Chunks are delivered to the
+    sink in time order and the end of the last delivered one is saved in
+    the ``checkpoint`` json file, a new job with the same checkpoint
+    resumes from there::
+
+        store = CandleStore('history')
+        job = BackfillJob(['EURUSD', 'GBPUSD'], [PERIOD.ONE_HOUR], start,
+                          end, store.append, checkpoint='history/.backfill')
+        with SessionPool(user_id, password, size=4) as pool:
+            job.run(pool)
+
+    :param on_progress: called with progress() after every chunk
+    """
+
+    def __init__(self, symbols, periods, start, end, sink, checkpoint=None,
+                 chunk_candles=CHUNK_CANDLES, on_progress=None):
+        self.symbols = list(symbols)
+        self.periods = [getattr(period, 'value', period) for period in periods]
+        self.start = int(start)
+        self.end = int(end)
+        self.sink = sink
+        self.checkpoint = checkpoint
+        self.chunk_candles = chunk_candles
+        self.on_progress = on_progress
+        self.positions = self._load_checkpoint()
+        self.chunks = self._plan()
+        self.failed = []
+        self.skipped = 0
+        self.delivered = 0
+        self.candles = 0
+        self._started_at = None
+        self._next = {}
+        self._ready = {}
+        self._abandoned = set()  # keys with a failed chunk
+
+    def _load_checkpoint(self):
+        if self.checkpoint is None or not os.path.exists(self.checkpoint):
+            return {}
+        with open(self.checkpoint) as fileobj:
+            return json.load(fileobj)
+
+    def _save_checkpoint(self):
+        if self.checkpoint is None:
+            return
+        tmp = self.checkpoint + '.tmp'
+        with open(tmp, 'w') as fileobj:
+            json.dump(self.positions, fileobj)
+        os.replace(tmp, self.checkpoint)
+
+    def _plan(self):
+        chunks = []
+        for symbol in self.symbols:
+            for period in self.periods:
+                key = "{}|{}".format(symbol, period)
+                start = max(self.start, self.positions.get(key, self.start))
+                oldest = history_start(period)
+                if oldest is not None and start < oldest:
+                    LOGGER.warning("%s history starts at %d", key, oldest)
+                    start = int(oldest)
+                span = period * 60 * self.chunk_candles
+                index = 0
+                while start < self.end:
+                    end = min(start + span, self.end)
+                    chunks.append(_Chunk(symbol, period, start, end, index))
+                    start = end
+                    index += 1
+        return chunks
+
+    def _fetch(self, client, chunk):
+        return client.get_chart_range_request(
+            chunk.symbol, chunk.period, chunk.start, chunk.end, 0)
+
+    def _completed(self, chunk, res):
+        """deliver chunk and the following ones already fetched"""
+        if chunk.key in self._abandoned:
+            self.skipped += 1
+            return
+        ready = self._ready.setdefault(chunk.key, {})
+        ready[chunk.index] = (chunk, res)
+        position = self._next.get(chunk.key, 0)
+        while position in ready:
+            chunk, res = ready.pop(position)
+            candles = decode_rate_infos(res)
+            candles = candles[(candles['ctm'] >= chunk.start * 1000) &
+                              (candles['ctm'] < chunk.end * 1000)]
+            self.sink(chunk.symbol, chunk.period, candles)
+            self.positions[chunk.key] = chunk.end
+            self.delivered += 1
+            self.candles += len(candles)
+            position += 1
+        self._next[chunk.key] = position
+        self._save_checkpoint()
+        if self.on_progress is not None:
+            self.on_progress(self.progress())
+
+    def _failed(self, chunk, error):
+        LOGGER.warning("chunk %s from %d failed: %r", chunk.key, chunk.start,
+                       error)
+        self.failed.append((chunk.key, chunk.start, error))
+        # the later chunks could not be delivered before this one
+        self._abandoned.add(chunk.key)
+        self.skipped += len(self._ready.pop(chunk.key, {}))
+
+    def run(self, executor):
+        """download with a logged client, or in parallel with a started
+        SessionPool whose sessions should share a RateLimiter.for_account
+
+        chunks that fail are reported in ``failed``, the later chunks of
+        the same symbol and period are not fetched, or dropped if already
+        fetched, and counted in ``skipped``; they are all left to a
+        resumed job"""
+        self._started_at = time.monotonic()
+        if isinstance(executor, SessionPool):
+            futures = {executor.submit(
+                'get_chart_range_request', chunk.symbol, chunk.period,
+                chunk.start, chunk.end, 0): chunk for chunk in self.chunks}
+            by_key = {}
+            for future, chunk in futures.items():
+                by_key.setdefault(chunk.key, []).append(future)
+            for future in concurrent.futures.as_completed(futures):
+                chunk = futures[future]
+                if future.cancelled():
+                    self.skipped += 1
+                    continue
+                try:
+                    res = future.result()
+                except (CommandFailed, SocketError, OSError) as e:
+                    self._failed(chunk, e)
+                    for other in by_key[chunk.key]:
+                        other.cancel()
+                else:
+                    self._completed(chunk, res)
+        else:
+            for chunk in self.chunks:
+                if chunk.key in self._abandoned:
+                    self.skipped += 1
+                    continue
+                try:
+                    res = self._fetch(executor, chunk)
+                except (CommandFailed, SocketError, OSError) as e:
+                    self._failed(chunk, e)
+                else:
+                    self._completed(chunk, res)
+        return self.progress()
+
+    def progress(self):
+        """chunks done, candles per second and seconds left estimated"""
+        elapsed = time.monotonic() - self._started_at \
+            if self._started_at else 0.0
+        left = len(self.chunks) - self.delivered
+        return {
+            'chunks': len(self.chunks), 'delivered': self.delivered,
+            'failed': len(self.failed), 'skipped': self.skipped,
+            'candles': self.candles,
+            'elapsed': elapsed,
+            'candles_per_sec': self.candles / elapsed if elapsed else 0.0,
+            'eta': elapsed / self.delivered * left if self.delivered
+            else None,
+        }
@@ -0,0 +1,286 @@
+# -*- coding utf-8 -*-
+
+"""
+XTBApi.backtest
+~~~~~~~
+
+Simulated Client driven by stored candles or ticks, so that a strategy
+written against Client runs unchanged on history, and a vectorized
+simulation of position series for parameter sweeps. Requires numpy.
+"""
+
+import logging
+
+import numpy as np
+
+from XTBApi.api import MODES, PERIOD, _check_timeframe, _get_trade_mode
+from XTBApi.candles import CANDLE_DTYPE, to_dicts
+from XTBApi.resample import resample
+from XTBApi.trades import OrderTemplate, Transaction
+
+LOGGER = logging.getLogger('XTBApi.backtest')
+BALANCE = 10000.0
+
+
+def simulate(bids, positions, contract_size, spread=0.0, commission=0.0,
+             balance=0.0):
+    """equity after every price of a series of lots held, vectorized
+
+    ``positions[i]`` are the signed lots held from the fill at
+    ``bids[i]`` to the next price, buys filled at bid + spread and sells
+    at bid as in BacktestClient. ``spread`` may be an array, e.g. ask -
+    bid of ticks, and ``commission`` is paid per lot on every fill.
+    Profits are in the profit currency of the symbol.
+
+    returns a dict of the equity array, the lots traded and the costs"""
+    bids = np.asarray(bids, 'f8')
+    positions = np.asarray(positions, 'f8')
+    if bids.shape != positions.shape:
+        raise ValueError("a position is needed for every price")
+    changes = np.diff(positions, prepend=0.0)
+    held = np.concatenate(([0.0], positions[:-1]))
+    pnl = held * np.diff(bids, prepend=bids[:1]) * contract_size
+    costs = np.maximum(changes, 0.0) * spread * contract_size + \
+        np.abs(changes) * commission
+    equity = balance + np.cumsum(pnl - costs)
+    # a short position is valued at the ask it can be closed at
+    last = positions[-1] if len(positions) else 0.0
+    if last < 0:
+        equity[-1] += last * np.broadcast_to(spread, bids.shape)[-1] * \
+            contract_size
+    return {'equity': equity, 'lots_traded': float(np.abs(changes).sum()),
+            'costs': float(costs.sum())}
+
+
+class BacktestClient(object):
+    """the trading surface of Client on stored history
+
+    :param data: dict of symbol to the CANDLE_DTYPE array of ``period``,
+        candles are closed in turn and trades filled at their close, or
+        to a TICK_DTYPE array of XTBApi.ticks filled at its bid and ask
+    :param specs: dict of symbol to getSymbol record, contractSize,
+        spreadRaw, used as the spread of candles, and the lot limits are
+        used
+    :param commission: paid per lot on every fill
+
+    ``step`` closes the next candle or tick of every symbol, ``run`` calls
+    a strategy after each one::
+
+        store = CandleStore('history')
+        client = BacktestClient({'EURUSD': store.read('EURUSD', 1)},
+                                {'EURUSD': live_client.get_symbol('EURUSD')})
+        client.run(strategy)  # strategy(client) uses the Client methods
+    """
+
+    def __init__(self, data, specs, period=PERIOD.ONE_MINUTE,
+                 balance=BALANCE, commission=0.0):
+        self.period = getattr(period, 'value', period)
+        self.specs = specs
+        self.start_balance = self.balance = balance
+        self.commission = commission
+        self.data = {}
+        self.trade_rec = {}
+        self.history = []
+        self.steps = 0
+        self._templates = {symbol: OrderTemplate(specs[symbol])
+                           for symbol in data}
+        self._next_order = 1
+        timestamps = []
+        for symbol, records in data.items():
+            records = np.asarray(records)
+            if 'ctm' in records.dtype.names:
+                times = records['ctm'] + self.period * 60000
+                bids = records['close']
+                asks = bids + specs[symbol]['spreadRaw']
+            else:
+                times, bids, asks = records['timestamp'], records['bid'], \
+                    records['ask']
+            self.data[symbol] = (records, times, bids, asks)
+            timestamps.append(times)
+        # ms at which something closes, and per symbol the index of its
+        # last record closed at every one of them
+        self.timeline = np.unique(np.concatenate(timestamps)) \
+            if timestamps else np.empty(0, 'i8')
+        self._indexes = {
+            symbol: np.searchsorted(times, self.timeline, 'right') - 1
+            for symbol, (records, times, bids, asks) in self.data.items()}
+        self.index = -1
+
+    # - time -
+    @property
+    def now(self):
+        """server time in seconds of the last step"""
+        if self.index < 0:
+            return None
+        return int(self.timeline[self.index]) / 1000
+
+    def step(self):
+        """close the next candles or ticks, False at the end of the data"""
+        if self.index + 1 >= len(self.timeline):
+            return False
+        self.index += 1
+        self.steps += 1
+        return True
+
+    def run(self, strategy, steps=None):
+        """call strategy(client) after every step, return the steps done"""
+        done = 0
+        while (steps is None or done < steps) and self.step():
+            strategy(self)
+            done += 1
+        return done
+
+    def _position(self, symbol):
+        position = int(self._indexes[symbol][self.index]) \
+            if self.index >= 0 else -1
+        if position < 0:
+            raise ValueError("no price of {} yet".format(symbol))
+        return position
+
+    def bid(self, symbol):
+        return float(self.data[symbol][2][self._position(symbol)])
+
+    def ask(self, symbol):
+        return float(self.data[symbol][3][self._position(symbol)])
+
+    # - Client surface -
+    def login(self, user_id=None, password=None, mode='demo'):
+        return {'streamSessionId': 'backtest'}
+
+    def logout(self):
+        return {}
+
+    def ping(self):
+        return {}
+
+    def get_server_time(self):
+        return {'time': int(self.timeline[max(self.index, 0)])}
+
+    def get_symbol(self, symbol):
+        return dict(self.specs[symbol], bid=self.bid(symbol),
+                    ask=self.ask(symbol))
+
+    def check_if_market_open(self, list_of_symbols, timestamp=None):
+        """True for the symbols with a candle or tick closed at the last
+        step"""
+        status = {}
+        for symbol in list_of_symbols:
+            position = self._indexes[symbol][self.index] \
+                if self.index >= 0 else -1
+            status[symbol] = bool(
+                position >= 0 and self.data[symbol][1][position] ==
+                self.timeline[self.index])
+        return status
+
+    def get_lastn_candle_history(self, symbol, timeframe_in_seconds, number,
+                                 as_array=False):
+        """last n closed candles of timeframe, built from the candles of
+        period, the last one is still open if its period is not over"""
+        _check_timeframe(timeframe_in_seconds)
+        records = self.data[symbol][0]
+        if 'ctm' not in records.dtype.names:
+            raise ValueError("candles are not available from ticks")
+        period = timeframe_in_seconds // 60
+        if period < self.period:
+            raise ValueError("candles of {} can't be built from {}".format(
+                period, self.period))
+        end = self._position(symbol) + 1
+        if period == self.period:
+            candles = records[max(0, end - number):end]
+        else:
+            # the first bar built from a slice may be partial
+            size = number * period // self.period
+            while True:
+                candles = resample(records[max(0, end - size):end], period)
+                if len(candles) > number or size >= end:
+                    break
+                size *= 2
+        candles = np.asarray(candles[-number:], CANDLE_DTYPE)
+        return candles if as_array else to_dicts(candles)
+
+    def _profit(self, transaction, bid, ask):
+        record = transaction._trans_dict
+        if transaction.mode == 'buy':
+            close, diff = bid, bid - record['open_price']
+        else:
+            close, diff = ask, record['open_price'] - ask
+        return close, diff * transaction.volume * \
+            self.specs[transaction.symbol]['contractSize']
+
+    def open_trade(self, mode, symbol, volume):
+        """market order filled at the ask, or at the bid if selling"""
+        mode = _get_trade_mode(mode).value
+        volume = self._templates[symbol].check_volume(volume)
+        bid, ask = self.bid(symbol), self.ask(symbol)
+        price = ask if mode == MODES.BUY.value else bid
+        order = self._next_order
+        self._next_order += 1
+        commission = -volume * self.commission
+        self.balance += commission
+        self.trade_rec[order] = Transaction({
+            'order': order, 'position': order, 'cmd': mode,
+            'symbol': symbol, 'volume': volume, 'open_price': price,
+            'close_price': bid if mode == MODES.BUY.value else ask,
+            'open_time': int(self.timeline[self.index]), 'profit': 0.0,
+            'commission': commission})
+        LOGGER.debug("opened %d: %s %s %s at %s", order, mode, volume,
+                     symbol, price)
+        return {'order': order}
+
+    def close_trade(self, trans):
+        """close at the bid, or at the ask if sold"""
+        order_id = trans.order_id if isinstance(trans, Transaction) \
+            else trans
+        transaction = self.trade_rec.pop(order_id)
+        close, profit = self._profit(transaction,
+                                     self.bid(transaction.symbol),
+                                     self.ask(transaction.symbol))
+        commission = -transaction.volume * self.commission
+        self.balance += profit + commission
+        record = transaction._trans_dict
+        self.history.append(dict(
+            record, close_price=close,
+            close_time=int(self.timeline[self.index]), closed=True,
+            profit=profit, commission=record['commission'] + commission))
+        return {'order': order_id}
+
+    def close_all_trades(self):
+        return {order_id: self.close_trade(order_id)
+                for order_id in list(self.trade_rec)}
+
+    def update_trades(self):
+        """mark the open trades to the last prices"""
+        for transaction in self.trade_rec.values():
+            transaction.price, transaction.actual_profit = self._profit(
+                transaction, self.bid(transaction.symbol),
+                self.ask(transaction.symbol))
+        return self.trade_rec
+
+    def get_trade_profit(self, trans_id):
+        transaction = self.trade_rec[trans_id]
+        return self._profit(transaction, self.bid(transaction.symbol),
+                            self.ask(transaction.symbol))[1]
+
+    def get_trades_history(self, start, end):
+        """records of the trades closed from start to end, in ms, 0 as
+        end for the last step"""
+        if not end:
+            end = int(self.timeline[max(self.index, 0)])
+        return [dict(record) for record in self.history
+                if start <= record['close_time'] <= end]
+
+    def get_margin_level(self):
+        """balance and equity, profits are taken in the account currency"""
+        profit = sum(self.get_trade_profit(order_id)
+                     for order_id in self.trade_rec)
+        return {'balance': self.balance, 'equity': self.balance + profit,
+                'currency': None}
+
+    # - vectorized -
+    def simulate(self, symbol, positions):
+        """simulate() of the lots held after every candle or tick of
+        symbol, from the starting balance and without stepping"""
+        records, times, bids, asks = self.data[symbol]
+        return simulate(bids, positions,
+                        self.specs[symbol]['contractSize'], asks - bids,
+                        self.commission, self.start_balance)
@@ -0,0 +1,450 @@
+# -*- coding utf-8 -*-
+
+"""
+XTBApi.benchmark
+~~~~~~~
+
+Benchmark of the BaseClient commands against the local mock server
+
+    $ python -m XTBApi.benchmark --iterations 200 --latency 0.001
+"""
+
+import argparse
+import logging
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+
+from XTBApi import api
+from XTBApi.codec import available_codecs
+from XTBApi.exceptions import CommandFailed
+from XTBApi.limiter import RateLimiter
+from XTBApi.mock import MockServer
+
+LOGGER = logging.getLogger('XTBApi.benchmark')
+DEFAULT_CURRENCY = 'EURUSD'
+_IMPORT_SCRIPT = """
+import sys, time
+before = set(sys.modules)
+start = time.perf_counter()
+import {module}
+print(time.perf_counter() - start, len(set(sys.modules) - before))
+"""
+
+
+def _cases(client):
+    """(name, function, args) for every BaseClient command"""
+    now = int(time.time())
+    order = client.trade_transaction(DEFAULT_CURRENCY, 0, 0, 0.1,
+                                     price=1.0)['order']
+    return [
+        ('get_all_symbols', client.get_all_symbols, ()),
+        ('get_calendar', client.get_calendar, ()),
+        ('get_chart_last_request', client.get_chart_last_request,
+         (DEFAULT_CURRENCY, 1, now - 3600 * 24)),
+        ('get_chart_range_request', client.get_chart_range_request,
+         (DEFAULT_CURRENCY, 1, now - 3600 * 24, now, 0)),
+        ('get_commission', client.get_commission, (DEFAULT_CURRENCY, 1.0)),
+        ('get_margin_level', client.get_margin_level, ()),
+        ('get_margin_trade', client.get_margin_trade,
+         (DEFAULT_CURRENCY, 1.0)),
+        ('get_profit_calculation', client.get_profit_calculation,
+         (DEFAULT_CURRENCY, 0, 1.0, 1.2233, 1.3000)),
+        ('get_server_time', client.get_server_time, ()),
+        ('get_symbol', client.get_symbol, (DEFAULT_CURRENCY,)),
+        ('get_tick_prices', client.get_tick_prices,
+         ([DEFAULT_CURRENCY], now * 1000, 0)),
+        ('get_trade_records', client.get_trade_records, ([order],)),
+        ('get_trades', client.get_trades, ()),
+        ('get_trades_history', client.get_trades_history, (0, 0)),
+        ('get_trading_hours', client.get_trading_hours,
+         ([DEFAULT_CURRENCY],)),
+        ('get_version', client.get_version, ()),
+        ('ping', client.ping, ()),
+        ('trade_transaction', client.trade_transaction,
+         (DEFAULT_CURRENCY, 0, 0, 0.1), {'price': 1.0}),
+        ('trade_transaction_status', client.trade_transaction_status,
+         (order,)),
+        ('get_user_data', client.get_user_data, ()),
+    ]
+
+
+def _percentile(sorted_values, pct):
+    index = min(len(sorted_values) - 1,
+                int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def bench_command(func, args=(), kwargs=None, iterations=100):
+    """time func, return a dict of stats"""
+    kwargs = kwargs or {}
+    latencies = []
+    errors = 0
+    cpu_start = time.process_time()
+    start = time.perf_counter()
+    for _ in range(iterations):
+        t0 = time.perf_counter()
+        try:
+            func(*args, **kwargs)
+        except CommandFailed:
+            errors += 1
+        latencies.append(time.perf_counter() - t0)
+    elapsed = time.perf_counter() - start
+    # includes the mock server threads, compare runs rather than read alone
+    cpu = time.process_time() - cpu_start
+    latencies.sort()
+    # second pass with tracemalloc on, it slows down calls
+    tracemalloc.start()
+    alloc_runs = max(1, iterations // 10)
+    peak = 0
+    blocks = 0
+    for _ in range(alloc_runs):
+        tracemalloc.reset_peak()
+        before = tracemalloc.take_snapshot()
+        try:
+            func(*args, **kwargs)
+        except CommandFailed:
+            pass
+        after = tracemalloc.take_snapshot()
+        peak += tracemalloc.get_traced_memory()[1]
+        blocks += sum(stat.count_diff for stat in
+                      after.compare_to(before, 'filename')
+                      if stat.count_diff > 0)
+    tracemalloc.stop()
+    return {
+        'iterations': iterations,
+        'errors': errors,
+        'cmds_per_sec': iterations / elapsed,
+        'p50': _percentile(latencies, 50),
+        'p99': _percentile(latencies, 99),
+        'cpu_per_cmd': cpu / iterations,
+        'alloc_bytes': peak / alloc_runs,
+        'alloc_blocks': blocks / alloc_runs,
+    }
+
+
+def run_benchmark(iterations=100, rate=None, burst=1, methods=None,
+                  codec=None, transport=None, **server_kw):
+    """run every command against a fresh mock server
+
+    :param rate: commands per second of the client limiter, None to measure
+        the bare client overhead
+    :param codec: json codec of the client, see XTBApi.codec
+    :param transport: transport of the client, e.g. a RecordingTransport
+    :param server_kw: forwarded to MockServer
+    """
+    results = {}
+    with MockServer(**server_kw) as server:
+        client = api.BaseClient(server.url, RateLimiter(rate, burst), codec,
+                                transport=transport)
+        client.login('bench', 'bench')
+        for case in _cases(client):
+            name, func, args = case[:3]
+            kwargs = case[3] if len(case) > 3 else {}
+            if methods and name not in methods:
+                continue
+            throttled = client.limiter.throttled_time
+            results[name] = bench_command(func, args, kwargs, iterations)
+            results[name]['throttled_time'] = \
+                client.limiter.throttled_time - throttled
+            LOGGER.debug("%s done", name)
+        client.logout()
+    return results
+
+
+def run_codec_benchmark(iterations=100, methods=None, **server_kw):
+    """run_benchmark with every installed codec, return {codec: results}"""
+    return {codec: run_benchmark(iterations, methods=methods, codec=codec,
+                                 **server_kw)
+            for codec in available_codecs()}
+
+
+def run_replay_benchmark(path, speed=None, codec=None):
+    """send again the commands of a recording to a ReplayTransport, as
+    fast as possible or at the recorded latencies divided by speed, and
+    return the throughput and the metrics of every command"""
+    from XTBApi.transport import ReplayTransport
+    transport = ReplayTransport(path, speed)
+    client = api.BaseClient(limiter=RateLimiter(None), codec=codec,
+                            transport=transport)
+    commands = errors = 0
+    start = time.perf_counter()
+    for url in transport.urls:
+        ws = transport(url)
+        for request in transport.requests(transport.opened - 1):
+            try:
+                client._request(ws, client.codec.loads(request))
+            except CommandFailed:
+                errors += 1
+            commands += 1
+    elapsed = time.perf_counter() - start
+    return {'commands': commands, 'errors': errors, 'elapsed': elapsed,
+            'cmds_per_sec': commands / elapsed if elapsed else 0.0,
+            'mib_per_sec': client.bytes_received / 2 ** 20 / elapsed
+            if elapsed else 0.0,
+            'metrics': client.metrics.summary()}
+
+
+def run_backtest_benchmark(bars=1000000):
+    """bars per second of BacktestClient stepping with a strategy reading
+    a price, and of the vectorized simulate on the same candles"""
+    import numpy as np
+    from XTBApi.backtest import BacktestClient, simulate
+    from XTBApi.candles import CANDLE_DTYPE
+    from XTBApi.mock import _symbol_record
+    spec = _symbol_record(DEFAULT_CURRENCY)
+    candles = np.zeros(bars, CANDLE_DTYPE)
+    candles['ctm'] = np.arange(bars) * 60000
+    candles['close'] = 1.1 + np.cumsum(
+        np.random.default_rng(0).normal(0, 0.0002, bars))
+    client = BacktestClient({DEFAULT_CURRENCY: candles},
+                            {DEFAULT_CURRENCY: spec})
+    start = time.perf_counter()
+    client.run(lambda client: client.bid(DEFAULT_CURRENCY))
+    event = time.perf_counter() - start
+    positions = np.sign(np.diff(candles['close'], prepend=1.1)) * 0.1
+    start = time.perf_counter()
+    simulate(candles['close'], positions, spec['contractSize'],
+             spec['spreadRaw'])
+    vectorized = time.perf_counter() - start
+    return {'bars': bars, 'event_bars_per_sec': bars / event,
+            'vectorized_bars_per_sec': bars / vectorized}
+
+
+def run_calculator_benchmark(n=200, rate=None, burst=1, **server_kw):
+    """seconds to price n scenarios with getMarginTrade,
+    getProfitCalculation and getCommissionDef against one evaluation of
+    the local TradeCalculator"""
+    import numpy as np
+    from XTBApi.calculator import TradeCalculator
+    volumes = np.round(np.linspace(0.01, 5, n), 2)
+    opens = np.full(n, 1.1)
+    closes = opens + np.linspace(-0.01, 0.01, n)
+    with MockServer(**server_kw) as server:
+        client = api.Client(server.url, RateLimiter(rate, burst))
+        client.login('bench', 'bench')
+        start = time.perf_counter()
+        for volume, op, cl in zip(volumes.tolist(), opens.tolist(),
+                                  closes.tolist()):
+            client.get_margin_trade(DEFAULT_CURRENCY, volume)
+            client.get_profit_calculation(DEFAULT_CURRENCY, 0, volume, op,
+                                          cl)
+            client.get_commission(DEFAULT_CURRENCY, volume)
+        remote = time.perf_counter() - start
+        calculator = TradeCalculator(client)
+        calculator.evaluate(DEFAULT_CURRENCY, 0, volumes, opens, closes)
+        start = time.perf_counter()
+        calculator.evaluate(DEFAULT_CURRENCY, 0, volumes, opens, closes)
+        local = time.perf_counter() - start
+        client.logout()
+    return {'scenarios': n, 'remote': remote, 'local': local,
+            'speedup': remote / local}
+
+
+def bench_import(module='XTBApi.api', runs=5):
+    """time the import of module in fresh interpreters, as paid by every
+    new worker process"""
+    times = []
+    for _ in range(runs):
+        output = subprocess.check_output(
+            [sys.executable, '-c', _IMPORT_SCRIPT.format(module=module)])
+        elapsed, modules = output.split()
+        times.append(float(elapsed))
+    return {'module': module, 'runs': runs,
+            'median': statistics.median(times), 'min': min(times),
+            'modules': int(modules)}
+
+
+def run_close_all_benchmark(n_trades=50, rate=None, burst=1, stream=False,
+                            **server_kw):
+    """time Client.close_all_trades with n_trades open positions
+
+    :param stream: confirm the closes from the tradeStatus stream
+    """
+    from XTBApi.stream import StreamClient
+    with MockServer(n_trades=n_trades, **server_kw) as server:
+        client = api.Client(server.url, RateLimiter(rate, burst))
+        client.login('bench', 'bench')
+        status_stream = None
+        if stream:
+            status_stream = StreamClient.from_client(client).connect()
+            client.status_tracker.attach(status_stream)
+            status_stream.subscribe_trade_status()
+        start = time.perf_counter()
+        results = client.close_all_trades()
+        elapsed = time.perf_counter() - start
+        if status_stream is not None:
+            status_stream.close()
+        client.logout()
+        commands = dict(server.commands)
+    confirmed = sorted(res['confirmed'] for res in results.values())
+    return {'trades': n_trades, 'elapsed': elapsed,
+            'throttled_time': client.limiter.throttled_time,
+            'status_commands': commands.get('tradeTransactionStatus', 0),
+            'p50_confirmed': _percentile(confirmed, 50) if confirmed else 0}
+
+
+def run_open_trade_benchmark(iterations=20, **server_kw):
+    """median seconds of open_trade against fast_open_trade fed by the
+    tick and tradeStatus streams, with the steps of the fast path"""
+    from XTBApi.stream import StreamClient
+    with MockServer(stream_interval=0.01, **server_kw) as server:
+        client = api.Client(server.url, RateLimiter(None))
+        client.login('bench', 'bench')
+        stream = StreamClient.from_client(client).connect()
+        client.symbol_cache.attach(stream)
+        client.status_tracker.attach(stream)
+        stream.subscribe_ticks(DEFAULT_CURRENCY)
+        stream.subscribe_trade_status()
+        client.order_template(DEFAULT_CURRENCY)
+        slow = []
+        for _ in range(iterations):
+            t0 = time.perf_counter()
+            client.open_trade('buy', DEFAULT_CURRENCY, 0.1)
+            slow.append(time.perf_counter() - t0)
+        while client.symbol_cache.get_quote(DEFAULT_CURRENCY) is None:
+            time.sleep(0.01)
+        for _ in range(iterations):
+            client.fast_open_trade('buy', DEFAULT_CURRENCY, 0.1)
+        stream.close()
+        client.logout()
+    latencies = list(client.order_latencies)
+    res = {'open_trade': _percentile(sorted(slow), 50)}
+    for step in ('quote', 'build', 'send', 'confirm', 'total'):
+        res['fast_' + step] = _percentile(
+            sorted(x[step] for x in latencies), 50)
+    return res
+
+
+def format_results(results):
+    lines = ["{:<26}{:>10}{:>10}{:>10}{:>10}{:>12}{:>10}{:>12}".format(
+        'command', 'cmd/s', 'p50 ms', 'p99 ms', 'cpu ms', 'KiB/cmd',
+        'blk/cmd', 'throttle s')]
+    for name, res in results.items():
+        lines.append("{:<26}{:>10.1f}{:>10.3f}{:>10.3f}{:>10.3f}{:>12.1f}"
+                     "{:>10.0f}{:>12.3f}".format(
+                         name, res['cmds_per_sec'], res['p50'] * 1000,
+                         res['p99'] * 1000, res['cpu_per_cmd'] * 1000,
+                         res['alloc_bytes'] / 1024, res['alloc_blocks'],
+                         res['throttled_time']))
+    return '\n'.join(lines)
+
+
+def format_codec_results(results, baseline='json'):
+    """cpu ms per command of every codec and the time saved on baseline"""
+    codecs = [codec for codec in results if codec != baseline]
+    lines = ["{:<26}{:>10}".format('command', baseline) + ''.join(
+        "{:>10}{:>10}".format(codec, 'saved') for codec in codecs)]
+    for name, base in results[baseline].items():
+        line = "{:<26}{:>10.3f}".format(name, base['cpu_per_cmd'] * 1000)
+        for codec in codecs:
+            cpu = results[codec][name]['cpu_per_cmd']
+            line += "{:>10.3f}{:>10.3f}".format(
+                cpu * 1000, (base['cpu_per_cmd'] - cpu) * 1000)
+        lines.append(line)
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="benchmark BaseClient against the mock server")
+    parser.add_argument('--iterations', type=int, default=100)
+    parser.add_argument('--rate', type=float, default=None,
+                        help="commands per second allowed by the limiter, "
+                             "5 on the real server")
+    parser.add_argument('--burst', type=int, default=1,
+                        help="burst allowed by the limiter")
+    parser.add_argument('--close-all', type=int, default=0, metavar='N',
+                        help="also time close_all_trades with N trades")
+    parser.add_argument('--open-trade', type=int, default=0, metavar='N',
+                        help="also compare N open_trade and "
+                             "fast_open_trade")
+    parser.add_argument('--status-stream', action='store_true',
+                        help="confirm the closes of --close-all from the "
+                             "tradeStatus stream")
+    parser.add_argument('--latency', type=float, default=0.0,
+                        help="mock server latency in seconds")
+    parser.add_argument('--symbols', type=int, default=50,
+                        help="symbols returned by getAllSymbols")
+    parser.add_argument('--candles', type=int, default=1000,
+                        help="max candles returned by chart commands")
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--codec', choices=available_codecs(), default=None,
+                        help="json codec, the fastest installed by default")
+    parser.add_argument('--import-time', action='store_true',
+                        help="only time the import of XTBApi.api")
+    parser.add_argument('--compare-codecs', action='store_true',
+                        help="report the cpu time per command of every "
+                             "installed codec instead")
+    parser.add_argument('--backtest', type=int, default=0, metavar='N',
+                        help="only time the backtest of N candles")
+    parser.add_argument('--calculator', type=int, default=0, metavar='N',
+                        help="also compare N scenarios priced by the "
+                             "server and by TradeCalculator")
+    parser.add_argument('--record', metavar='PATH',
+                        help="record the frames of the command benchmark")
+    parser.add_argument('--replay', metavar='PATH',
+                        help="only replay the commands of a recording")
+    parser.add_argument('--replay-speed', type=float, default=None,
+                        help="replay at the recorded latencies divided by "
+                             "this, as fast as possible by default")
+    parser.add_argument('methods', nargs='*',
+                        help="only run these methods")
+    args = parser.parse_args(argv)
+    server_kw = dict(latency=args.latency, n_symbols=args.symbols,
+                     n_candles=args.candles, error_rate=args.error_rate)
+    if args.import_time:
+        print("import {module}: median {median:.4f} s, min {min:.4f} s, "
+              "{modules} modules loaded".format(**bench_import()))
+        return
+    if args.compare_codecs:
+        print(format_codec_results(run_codec_benchmark(
+            args.iterations, args.methods, **server_kw)))
+        return
+    if args.backtest:
+        print("backtest of {bars} candles: {event_bars_per_sec:.0f} bars/s "
+              "stepped, {vectorized_bars_per_sec:.0f} bars/s "
+              "vectorized".format(**run_backtest_benchmark(args.backtest)))
+        return
+    if args.replay:
+        res = run_replay_benchmark(args.replay, args.replay_speed,
+                                   args.codec)
+        print("replayed {commands} commands in {elapsed:.3f} s: "
+              "{cmds_per_sec:.1f} cmd/s, {mib_per_sec:.1f} MiB/s received, "
+              "{errors} errors".format(**res))
+        for name, metrics in sorted(res['metrics'].items()):
+            print("{:<26}{:>8} decode p50 {:.3f} ms".format(
+                name, metrics['count'], metrics['decode']['p50'] * 1000))
+        return
+    transport = None
+    if args.record:
+        from XTBApi.transport import RecordingTransport
+        transport = RecordingTransport(args.record)
+    results = run_benchmark(args.iterations, args.rate, args.burst,
+                            args.methods, args.codec, transport, **server_kw)
+    if transport is not None:
+        transport.close()
+    print(format_results(results))
+    if args.close_all:
+        res = run_close_all_benchmark(args.close_all, args.rate, args.burst,
+                                      args.status_stream,
+                                      latency=args.latency)
+        print("close_all_trades of {trades} trades: {elapsed:.3f} s, "
+              "throttled {throttled_time:.3f} s, median confirmation "
+              "{p50_confirmed:.3f} s, {status_commands} status "
+              "commands".format(**res))
+    if args.calculator:
+        res = run_calculator_benchmark(args.calculator, args.rate,
+                                       args.burst, latency=args.latency)
+        print("{scenarios} scenarios: server {remote:.3f} s, local "
+              "{local:.6f} s, {speedup:.0f}x".format(**res))
+    if args.open_trade:
+        res = run_open_trade_benchmark(args.open_trade, latency=args.latency)
+        print("median ms: " + ", ".join("{} {:.3f}".format(
+            name, value * 1000) for name, value in res.items()))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,185 @@
+# -*- coding utf-8 -*-
+
+"""
+XTBApi.cache
+~~~~~~~
+
+Caches of data that rarely change on the server
+"""
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+LOGGER = logging.getLogger('XTBApi.cache')
+SYMBOL_TTL = 3600
+QUOTE_MAX_AGE = 1.0
+VOLATILE_FIELDS = frozenset(['bid', 'ask', 'high', 'low', 'time',
+                             'timeString', 'spreadRaw', 'spreadTable'])
+_MISSING = object()
+
+
+class TTLCache(object):
+    """LRU cache with at most ``maxsize`` entries that expire after
+    ``ttl`` seconds"""
+
+    def __init__(self, ttl, maxsize=None):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return self.get(key, _MISSING, count=False) is not _MISSING
+
+    def get(self, key, default=None, count=True):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and entry[0] <= time.monotonic():
+                del self._data[key]
+                entry = None
+            if entry is None:
+                if count:
+                    self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            if count:
+                self.hits += 1
+            return entry[1]
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while self.maxsize is not None and len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, key=None):
+        """remove key, or everything if key is None"""
+        with self._lock:
+            if key is None:
+                self._data.clear()
+            else:
+                self._data.pop(key, None)
+
+    def stats(self):
+        return {'size': len(self._data), 'hits': self.hits,
+                'misses': self.misses, 'evictions': self.evictions}
+
+
+class SymbolCache(object):
+    """symbol metadata of a client served locally
+
+    static fields (contractSize, precision, leverage, ...) are kept for
+    ``ttl`` seconds, volatile fields (bid, ask, ...) come from the quotes
+    fed by a stream when fresher than ``max_quote_age``, otherwise from
+    the server, asked with the ``fresh`` commands of Client"""
+
+    def __init__(self, client, ttl=SYMBOL_TTL, maxsize=None,
+                 max_quote_age=QUOTE_MAX_AGE):
+        self.client = client
+        self.max_quote_age = max_quote_age
+        self.specs = TTLCache(ttl, maxsize)
+        self.quotes = {}
+        self.round_trips = 0
+        self._all_symbols = TTLCache(ttl, 1)
+
+    def _store(self, record):
+        spec = {key: value for key, value in record.items()
+                if key not in VOLATILE_FIELDS}
+        self.specs.set(record['symbol'], spec)
+        return spec
+
+    def _fetch(self, symbol):
+        self.round_trips += 1
+        record = self.client.get_symbol(symbol, fresh=True)
+        self._store(record)
+        return record
+
+    def get_quote(self, symbol):
+        """last quote received from the stream if fresh enough"""
+        quote = self.quotes.get(symbol)
+        if quote is None or \
+                time.monotonic() - quote[0] > self.max_quote_age:
+            return None
+        return quote[1]
+
+    def get_spec(self, symbol):
+        """static fields of symbol"""
+        spec = self.specs.get(symbol)
+        if spec is None:
+            self._fetch(symbol)
+            spec = self.specs.get(symbol, count=False)
+        return spec
+
+    def get_symbol(self, symbol):
+        """same as getSymbol, with a round trip only if there is no fresh
+        quote or the static fields are expired"""
+        quote = self.get_quote(symbol)
+        if quote is not None:
+            spec = self.specs.get(symbol)
+            if spec is not None:
+                return dict(spec, **quote)
+        return self._fetch(symbol)
+
+    def get_all_symbols(self):
+        """static fields of every symbol, fetched once per ttl"""
+        symbols = self._all_symbols.get('all')
+        if symbols is None:
+            self.round_trips += 1
+            records = self.client.get_all_symbols(fresh=True)
+            symbols = [self._store(record) for record in records]
+            self._all_symbols.set('all', symbols)
+        return symbols
+
+    def get_all_records(self):
+        """same as getAllSymbols, with a round trip unless every symbol
+        has a fresh quote"""
+        symbols = self._all_symbols.get('all')
+        if symbols is not None:
+            quotes = [self.get_quote(spec['symbol']) for spec in symbols]
+            if all(quote is not None for quote in quotes):
+                return [dict(spec, **quote)
+                        for spec, quote in zip(symbols, quotes)]
+        self.round_trips += 1
+        records = self.client.get_all_symbols(fresh=True)
+        self._all_symbols.set('all', [self._store(x) for x in records])
+        return records
+
+    def feed_tick(self, data):
+        """update quotes from a tickPrices stream event"""
+        if data.get('level', 0) != 0:
+            return
+        self.quotes[data['symbol']] = (time.monotonic(), {
+            'bid': data['bid'], 'ask': data['ask'], 'high': data['high'],
+            'low': data['low'], 'spreadRaw': data['spreadRaw'],
+            'spreadTable': data['spreadTable'], 'time': data['timestamp']})
+
+    def attach(self, stream):
+        """keep quotes updated from the tickPrices events of stream"""
+        stream.on('tickPrices', self.feed_tick)
+
+    def invalidate(self, symbol=None):
+        """drop cached data of symbol, or of every symbol"""
+        self.specs.invalidate(symbol)
+        self._all_symbols.invalidate()
+        if symbol is None:
+            self.quotes.clear()
+        else:
+            self.quotes.pop(symbol, None)
+
+    def stats(self):
+        stats = self.specs.stats()
+        all_stats = self._all_symbols.stats()
+        stats['all_symbols_hits'] = all_stats['hits']
+        stats['all_symbols_misses'] = all_stats['misses']
+        stats['round_trips'] = self.round_trips
+        return stats
@@ -0,0 +1,213 @@
+# -*- coding utf-8 -*-
+
+"""
+XTBApi.calculator
+~~~~~~~
+
+Margin, profit and commission of trades computed from the cached symbol
+specs instead of getMarginTrade, getProfitCalculation and
+getCommissionDef, on numpy arrays of scenarios. Requires numpy.
+"""
+
+import logging
+import random
+import time
+
+import numpy as np
+
+from XTBApi.api import MODES
+
+LOGGER = logging.getLogger('XTBApi.calculator')
+# marginMode of getSymbol
+FOREX = 101
+CFD_LEVERAGED = 102
+CFD = 103
+SPECIAL = 104
+# profitMode of getSymbol
+PROFIT_FOREX = 5
+PROFIT_CFD = 6
+TOLERANCE = 0.01
+RATE_TTL = 60.0
+
+
+def _signs(modes):
+    """1 for buys and -1 for sells of MODES values or 'buy'/'sell'"""
+    modes = np.asarray(modes)
+    if modes.dtype.kind in 'US':
+        return np.where(modes == 'sell', -1.0, 1.0)
+    return np.where(modes % 2 == MODES.SELL.value, -1.0, 1.0)
+
+
+def margin(spec, volumes, prices=None, rate=1.0):
+    """margin of volumes, in the account currency
+
+    forex margins are in the base currency, ``rate`` is then its price in
+    the account currency, CFD margins are in the profit currency and need
+    the open prices"""
+    volumes = np.asarray(volumes, 'f8')
+    mode = spec['marginMode']
+    nominal = volumes * spec['contractSize']
+    if mode == FOREX:
+        return nominal * spec['leverage'] / 100 * rate
+    if prices is None:
+        raise ValueError("prices are needed by margin mode {}".format(mode))
+    nominal = nominal * np.asarray(prices, 'f8')
+    if mode == CFD:
+        return nominal * rate
+    if mode in (CFD_LEVERAGED, SPECIAL):
+        return nominal * spec['leverage'] / 100 * rate
+    raise ValueError("unknown margin mode {}".format(mode))
+
+
+def profit(spec, modes, volumes, open_prices, close_prices, rate=1.0):
+    """profit of closing at close_prices, in the account currency with
+    ``rate`` the price of the profit currency
+
+    both profit modes value a price move at contractSize units per lot"""
+    if spec['profitMode'] not in (PROFIT_FOREX, PROFIT_CFD):
+        raise ValueError("unknown profit mode {}".format(spec['profitMode']))
+    moves = np.asarray(close_prices, 'f8') - np.asarray(open_prices, 'f8')
+    return _signs(modes) * moves * np.asarray(volumes, 'f8') * \
+        spec['contractSize'] * rate
+
+
+class TradeCalculator(object):
+    """margin, profit and commission of the symbols of client
+
+    specs and quotes come from ``client.symbol_cache``, the currency
+    conversions from the pairs of the account currency and the commission
+    of a lot from one getCommissionDef per symbol::
+
+        calculator = TradeCalculator(client)
+        volumes = np.linspace(0.01, 2, 200)
+        margins = calculator.margin('EURUSD', volumes)
+
+    :param account_currency: by default asked with getCurrentUserData
+    :param rates: dict of currency to its price in the account currency,
+        used instead of the quotes
+    :param rate_ttl: seconds a conversion rate from the quotes is reused
+    """
+
+    def __init__(self, client, account_currency=None, rates=None,
+                 rate_ttl=RATE_TTL):
+        self.client = client
+        self.account_currency = account_currency
+        self.rates = dict(rates or {})
+        self.rate_ttl = rate_ttl
+        self._quoted_rates = {}
+        self._commissions = {}
+        self._symbols = None
+
+    def _account(self):
+        if self.account_currency is None:
+            self.account_currency = self.client.get_user_data()['currency']
+        return self.account_currency
+
+    def _listed(self, symbol):
+        if self._symbols is None:
+            self._symbols = {x['symbol'] for x in
+                             self.client.symbol_cache.get_all_symbols()}
+        return symbol in self._symbols
+
+    def rate(self, currency):
+        """price of currency in the account currency"""
+        account = self._account()
+        if currency == account:
+            return 1.0
+        if currency in self.rates:
+            return self.rates[currency]
+        quoted = self._quoted_rates.get(currency)
+        if quoted is not None and quoted[0] > time.monotonic():
+            return quoted[1]
+        cache = self.client.symbol_cache
+        if self._listed(currency + account):
+            rate = cache.get_symbol(currency + account)['bid']
+        elif self._listed(account + currency):
+            rate = 1 / cache.get_symbol(account + currency)['ask']
+        else:
+            raise ValueError("no rate of {} in {}".format(currency, account))
+        self._quoted_rates[currency] = (time.monotonic() + self.rate_ttl,
+                                        rate)
+        return rate
+
+    def invalidate(self):
+        """ask the rates and commissions again"""
+        self._quoted_rates.clear()
+        self._commissions.clear()
+
+    def spec(self, symbol):
+        return self.client.symbol_cache.get_spec(symbol)
+
+    def margin(self, symbol, volumes, prices=None):
+        """margin of volumes, CFDs at prices or at the current ask"""
+        spec = self.spec(symbol)
+        if spec['marginMode'] == FOREX:
+            return margin(spec, volumes, rate=self.rate(spec['currency']))
+        if prices is None:
+            prices = self.client.symbol_cache.get_symbol(symbol)['ask']
+        return margin(spec, volumes, prices,
+                      self.rate(spec['currencyProfit']))
+
+    def profit(self, symbol, modes, volumes, open_prices, close_prices):
+        spec = self.spec(symbol)
+        return profit(spec, modes, volumes, open_prices, close_prices,
+                      self.rate(spec['currencyProfit']))
+
+    def commission(self, symbol, volumes):
+        """commission of volumes, from the commission of one lot"""
+        per_lot = self._commissions.get(symbol)
+        if per_lot is None:
+            per_lot = self.client.get_commission(symbol, 1.0)['commission']
+            self._commissions[symbol] = per_lot
+        return np.asarray(volumes, 'f8') * per_lot
+
+    def evaluate(self, symbol, modes, volumes, open_prices, close_prices):
+        """dict of the margin, profit, commission and net profit arrays of
+        the scenarios, margins at the open prices"""
+        volumes = np.asarray(volumes, 'f8')
+        margins = self.margin(symbol, volumes, open_prices)
+        profits = self.profit(symbol, modes, volumes, open_prices,
+                              close_prices)
+        commissions = self.commission(symbol, volumes)
+        return {'margin': margins, 'profit': profits,
+                'commission': commissions, 'net': profits - commissions}
+
+    def cross_check(self, symbol, modes, volumes, open_prices, close_prices,
+                    sample=5, tolerance=TOLERANCE, seed=None):
+        """compare ``sample`` scenarios with the server, return the
+        differences above tolerance, in account currency, as a list of
+        (index, field, local, server)"""
+        modes, volumes, open_prices, close_prices = np.broadcast_arrays(
+            np.asarray(modes), np.asarray(volumes, 'f8'),
+            np.asarray(open_prices, 'f8'), np.asarray(close_prices, 'f8'))
+        results = self.evaluate(symbol, modes, volumes, open_prices,
+                                close_prices)
+        indexes = random.Random(seed).sample(range(volumes.size),
+                                             min(sample, volumes.size))
+        mismatches = []
+        for index in indexes:
+            mode = modes.flat[index]
+            if isinstance(mode, str):
+                mode = MODES[mode.upper()].value
+            volume = float(volumes.flat[index])
+            # the server margin is at the current price
+            local = {'margin': float(self.margin(symbol, volume)),
+                     'profit': float(results['profit'].flat[index]),
+                     'commission': float(results['commission'].flat[index])}
+            server = {
+                'margin': self.client.get_margin_trade(
+                    symbol, volume)['margin'],
+                'profit': self.client.get_profit_calculation(
+                    symbol, int(mode), volume,
+                    float(open_prices.flat[index]),
+                    float(close_prices.flat[index]))['profit'],
+                'commission': self.client.get_commission(
+                    symbol, volume)['commission']}
+            for field in local:
+                if abs(local[field] - server[field]) > tolerance:
+                    mismatches.append((index, field, local[field],
+                                       server[field]))
+        if mismatches:
+            LOGGER.warning("%d differences with the server for %s",
+                           len(mismatches), symbol)
+        return mismatches
@@ -0,0 +1,53 @@
+# -*- coding utf-8 -*-
+
+"""
+XTBApi.candles
+~~~~~~~
+
+Columnar decoding of chart responses, requires numpy
+"""
+
+import logging
+from itertools import chain
+from operator import itemgetter
+
+import numpy as np
+
+LOGGER = logging.getLogger('XTBApi.candles')
+CANDLE_DTYPE = np.dtype([('ctm', 'i8'), ('open', 'f8'), ('high', 'f8'),
+                         ('low', 'f8'), ('close', 'f8'), ('vol', 'f8')])
+_RAW_FIELDS = itemgetter('ctm', 'open', 'high', 'low', 'close', 'vol')
+
+
+def decode_rate_infos(res):
+    """decode the rateInfos of getChartLastRequest/getChartRangeRequest
+    into a CANDLE_DTYPE array, with ctm in ms and real prices"""
+    infos = res['rateInfos']
+    raw = np.fromiter(chain.from_iterable(map(_RAW_FIELDS, infos)), 'f8',
+                      count=len(infos) * 6).reshape(-1, 6)
+    candles = np.empty(len(infos), CANDLE_DTYPE)
+    divisor = 10 ** res['digits']
+    opens = raw[:, 1]
+    candles['ctm'] = raw[:, 0]
+    candles['open'] = opens / divisor
+    candles['high'] = (opens + raw[:, 2]) / divisor
+    candles['low'] = (opens + raw[:, 3]) / divisor
+    candles['close'] = (opens + raw[:, 4]) / divisor
+    candles['vol'] = raw[:, 5]
+    return candles
+
+
+def to_columns(candles):
+    """dict of column arrays, views on candles"""
+    return {name: candles[name] for name in CANDLE_DTYPE.names}
+
+
+def to_dicts(candles):
+    """list of candle dicts, as returned by
+    Client.get_lastn_candle_history"""
+    timestamps = (candles['ctm'] / 1000).tolist()
+    return [{'timestamp': timestamp, 'open': op, 'close': cl, 'high': hg,
+             'low': lw, 'volume': vol} for timestamp, op, cl, hg, lw, vol in
+            zip(timestamps, candles['open'].tolist(),
+                candles['close'].tolist(), candles['high'].tolist(),
+                candles['low'].tolist(), candles['vol'].tolist())]
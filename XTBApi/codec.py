@@ -0,0 +1,62 @@
+# -*- coding utf-8 -*-
+
+"""
+XTBApi.codec
+~~~~~~~
+
+json codecs of the messages, orjson or ujson are used when installed
+"""
+
+import json
+import logging
+
+LOGGER = logging.getLogger('XTBApi.codec')
+PREFERRED_CODECS = ('orjson', 'ujson', 'json')
+_default_codec = None
+
+
+class Codec(object):
+    """dumps returns str or bytes, loads accepts both"""
+
+    def __init__(self, name, dumps, loads):
+        self.name = name
+        self.dumps = dumps
+        self.loads = loads
+
+    def __repr__(self):
+        return "Codec({})".format(self.name)
+
+
+def _load_codec(name):
+    if name == 'json':
+        return Codec('json', json.dumps, json.loads)
+    elif name == 'orjson':
+        import orjson
+        return Codec('orjson', orjson.dumps, orjson.loads)
+    elif name == 'ujson':
+        import ujson
+        return Codec('ujson', ujson.dumps, ujson.loads)
+    raise ValueError("codec must be in {}".format(PREFERRED_CODECS))
+
+
+def available_codecs():
+    """names of the codecs that can be loaded"""
+    names = []
+    for name in PREFERRED_CODECS:
+        try:
+            _load_codec(name)
+        except ImportError:
+            continue
+        names.append(name)
+    return names
+
+
+def get_codec(name=None):
+    """codec called name, or the fastest installed one if None"""
+    global _default_codec
+    if name is not None:
+        return _load_codec(name)
+    if _default_codec is None:
+        _default_codec = _load_codec(available_codecs()[0])
+        LOGGER.debug("using %s codec", _default_codec.name)
+    return _default_codec
@@ -28,6 +28,16 @@ class NotLogged(Exception):
         super().__init__(self.msg)
 
 
+class ResponseTimeout(Exception):
+    """when the response of a command is late, the command may have
+    been executed and is not sent again"""
+    def __init__(self, command):
+        self.command = command
+        self.msg = "no response to {} in time".format(command)
+        LOGGER.error(self.msg)
+        super().__init__(self.msg)
+
+
 class SocketError(Exception):
     """when socket is already closed
     may be the case of server internal error"""
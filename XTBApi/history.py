@@ -0,0 +1,140 @@
+# -*- coding utf-8 -*-
+
+"""
+XTBApi.history
+~~~~~~~
+
+Closed trades of getTradesHistory walked in time windows and yielded as
+they arrive, so that years of fills are never held in memory at once
+"""
+
+import json
+import logging
+import os
+import time
+
+LOGGER = logging.getLogger('XTBApi.history')
+HOUR_MS = 3600 * 1000
+WINDOW = 24 * HOUR_MS
+MIN_WINDOW = 60 * 1000
+MAX_WINDOW = 31 * 24 * HOUR_MS
+BATCH_SIZE = 500
+SYNC_START = 31 * 24 * HOUR_MS  # history of a first sync, in ms
+
+
+class ClosedTrade(object):
+    """closed position of a getTradesHistory record"""
+    __slots__ = ('order', 'position', 'symbol', 'mode', 'volume',
+                 'open_price', 'close_price', 'open_time', 'close_time',
+                 'profit', 'commission', 'storage')
+
+    def __init__(self, record):
+        self.order = record['order']
+        self.position = record.get('position', self.order)
+        self.symbol = record['symbol']
+        self.mode = {0: 'buy', 1: 'sell'}.get(record['cmd'], record['cmd'])
+        self.volume = record['volume']
+        self.open_price = record['open_price']
+        self.close_price = record['close_price']
+        self.open_time = record['open_time']
+        self.close_time = record['close_time']
+        self.profit = record['profit']
+        self.commission = record.get('commission') or 0.0
+        self.storage = record.get('storage') or 0.0
+
+    def __repr__(self):
+        return "ClosedTrade({}, {} {} {}, {})".format(
+            self.order, self.mode, self.volume, self.symbol, self.profit)
+
+
+def iter_trades_history(client, start, end=0, window=WINDOW,
+                        batch_size=BATCH_SIZE, batches=False):
+    """closed trades with start <= close_time <= end, in ms, 0 as end
+    for now, in close time order
+
+    the range is fetched in windows of ``window`` ms, halved when a
+    window holds more than twice ``batch_size`` trades and doubled when
+    it holds less than half. Trades closed on a window boundary, returned
+    by both windows, are yielded once. With ``batches`` a list of
+    ClosedTrade is yielded per window"""
+    if not end:
+        end = int(time.time() * 1000)
+    previous = set()
+    while start <= end:
+        window_end = min(start + window, end)
+        records = client.get_trades_history(start, window_end)
+        records.sort(key=lambda x: (x['close_time'], x['order']))
+        trades = [ClosedTrade(x) for x in records
+                  if x['order'] not in previous]
+        LOGGER.debug("%d trades from %d to %d", len(trades), start,
+                     window_end)
+        # only the trades closed at window_end can be returned again
+        previous = {x.order for x in trades if x.close_time >= window_end}
+        if trades:
+            if batches:
+                yield trades
+            else:
+                yield from trades
+        if window_end == end:
+            break
+        if len(records) > 2 * batch_size:
+            window = max(window // 2, MIN_WINDOW)
+        elif len(records) < batch_size // 2:
+            window = min(window * 2, MAX_WINDOW)
+        start = window_end
+
+
+class HistorySync(object):
+    """incremental download of the trades closed since the last sync
+
+    the close time of the last trade yielded, and the orders closed at
+    that time, are kept and saved in the ``checkpoint`` json file after
+    every batch, so that a reconciliation job only fetches what is new::
+
+        sync = HistorySync(client, 'reconciliation.json')
+        for batch in sync.sync():
+            book(batch)
+
+    :param start: close time in ms of the first sync, by default a month
+        ago
+    """
+
+    def __init__(self, client, checkpoint=None, start=None, **kwargs):
+        self.client = client
+        self.checkpoint = checkpoint
+        self.kwargs = kwargs
+        self.since = start
+        self.orders = set()  # orders closed at since, already yielded
+        if checkpoint is not None and os.path.exists(checkpoint):
+            with open(checkpoint) as fileobj:
+                state = json.load(fileobj)
+            self.since = state['since']
+            self.orders = set(state['orders'])
+
+    def _save(self):
+        if self.checkpoint is None:
+            return
+        tmp = self.checkpoint + '.tmp'
+        with open(tmp, 'w') as fileobj:
+            json.dump({'since': self.since, 'orders': sorted(self.orders)},
+                      fileobj)
+        os.replace(tmp, self.checkpoint)
+
+    def sync(self, end=0):
+        """yield the batches of trades closed since the last sync"""
+        since = self.since
+        if since is None:
+            since = int(time.time() * 1000) - SYNC_START
+        for batch in iter_trades_history(self.client, since, end,
+                                         batches=True, **self.kwargs):
+            batch = [x for x in batch if x.order not in self.orders]
+            if not batch:
+                continue
+            yield batch
+            last = batch[-1].close_time
+            if last != self.since:
+                self.since = last
+                self.orders = set()
+            self.orders.update(x.order for x in batch
+                               if x.close_time == last)
+            self._save()
@@ -0,0 +1,208 @@
+# -*- coding utf-8 -*-
+
+"""
+XTBApi.hours
+~~~~~~~
+
+Trading hours compiled into weekly interval indexes, to check if markets
+are open without asking the server every time
+"""
+
+import logging
+import time
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timezone
+
+LOGGER = logging.getLogger('XTBApi.hours')
+DAY = 86400
+WEEK = 7 * DAY
+SCHEDULE_TTL = 3600
+SERVER_TIME_FORMAT = "%b %d, %Y %I:%M:%S %p"
+
+
+def week_seconds(local_timestamp):
+    """seconds since monday 00:00 of a timestamp in server local time"""
+    # 01/01/1970 was a thursday
+    return (local_timestamp + 3 * DAY) % WEEK
+
+
+class TradingSchedule(object):
+    """weekly trading sessions of a symbol, as sorted and merged
+    [start, end) intervals in seconds from monday 00:00"""
+
+    def __init__(self, sessions):
+        intervals = sorted(((day['day'] - 1) * DAY + day['fromT'],
+                            (day['day'] - 1) * DAY + day['toT'])
+                           for day in sessions)
+        merged = []
+        for start, end in intervals:
+            if merged and start <= merged[-1][1]:
+                merged[-1][1] = max(merged[-1][1], end)
+            else:
+                merged.append([start, end])
+        # repeat next week so that lookups never wrap
+        merged += [[start + WEEK, end + WEEK] for start, end in merged]
+        half = len(merged) // 2
+        if half and merged[half - 1][1] == merged[half][0]:
+            merged[half - 1][1] = merged[half][1]
+            del merged[half]
+        self.starts = [x[0] for x in merged]
+        self.ends = [x[1] for x in merged]
+
+    def _index(self, seconds):
+        return bisect_right(self.starts, seconds) - 1
+
+    def is_open(self, seconds):
+        index = self._index(seconds)
+        return index >= 0 and seconds < self.ends[index]
+
+    def overlaps(self, start, end):
+        """True if [start, end) overlaps a session"""
+        index = bisect_left(self.starts, end) - 1
+        return index >= 0 and self.ends[index] > start
+
+    def next_open(self, seconds):
+        """seconds until the next session opens, 0 if open now, None if
+        the symbol never trades"""
+        index = self._index(seconds)
+        if index >= 0 and seconds < self.ends[index]:
+            return 0
+        if index + 1 < len(self.starts):
+            return self.starts[index + 1] - seconds
+        return None
+
+    def next_close(self, seconds):
+        """seconds until the current, or the next, session closes"""
+        index = self._index(seconds)
+        if index < 0 or seconds >= self.ends[index]:
+            index += 1
+        if index < len(self.ends):
+            return self.ends[index] - seconds
+        return None
+
+
+class TradingCalendar(object):
+    """trading schedules of the symbols asked to a client, refreshed
+    every ``ttl`` seconds
+
+    times are unix timestamps, converted to the server local time with
+    the offset measured from getServerTime. Clients that can't be called
+    synchronously fetch what ``needs_server_time`` and ``missing`` tell
+    and pass the responses to ``set_server_time`` and
+    ``set_trading_hours`` before the lookups"""
+
+    def __init__(self, client, ttl=SCHEDULE_TTL):
+        self.client = client
+        self.ttl = ttl
+        self.utc_offset = None
+        self.round_trips = 0
+        self._schedules = {}
+        self._offset_expires = 0
+
+    def sync_server_time(self):
+        """measure the server utc offset, rounded to quarter hours"""
+        return self.set_server_time(self.client.get_server_time())
+
+    def set_server_time(self, res):
+        """utc offset of a getServerTime response"""
+        self.round_trips += 1
+        local = datetime.strptime(res['timeString'], SERVER_TIME_FORMAT)
+        local = local.replace(tzinfo=timezone.utc).timestamp()
+        self.utc_offset = int(round((local - res['time'] / 1000) / 900)
+                              * 900)
+        self._offset_expires = time.monotonic() + self.ttl
+        LOGGER.debug("server utc offset %d s", self.utc_offset)
+        return self.utc_offset
+
+    def needs_server_time(self):
+        return self.utc_offset is None or \
+            self._offset_expires <= time.monotonic()
+
+    def _server_offset(self):
+        if self.needs_server_time():
+            self.sync_server_time()
+        return self.utc_offset
+
+    def _week_seconds(self, timestamp):
+        if timestamp is None:
+            timestamp = time.time()
+        return week_seconds(timestamp + self._server_offset())
+
+    def missing(self, symbols):
+        """symbols whose schedule is missing or expired"""
+        now = time.monotonic()
+        return [symbol for symbol in symbols if symbol not in
+                self._schedules or self._schedules[symbol][0] <= now]
+
+    def set_trading_hours(self, response):
+        """schedules of a getTradingHours response"""
+        self.round_trips += 1
+        expires = time.monotonic() + self.ttl
+        for symbol in response:
+            self._schedules[symbol['symbol']] = (
+                expires, TradingSchedule(symbol['trading']))
+
+    def load(self, symbols):
+        """fetch in one command the schedules missing or expired"""
+        missing = self.missing(symbols)
+        if missing:
+            self.set_trading_hours(self.client.get_trading_hours(missing))
+        return {symbol: self._schedules[symbol][1] for symbol in symbols}
+
+    def schedule(self, symbol):
+        return self.load([symbol])[symbol]
+
+    def invalidate(self, symbol=None):
+        if symbol is None:
+            self._schedules.clear()
+            self.utc_offset = None
+        else:
+            self._schedules.pop(symbol, None)
+
+    def is_open(self, symbol, timestamp=None):
+        return self.schedule(symbol).is_open(self._week_seconds(timestamp))
+
+    def is_open_many(self, symbols, timestamp=None):
+        """status of every symbol at the same instant"""
+        schedules = self.load(symbols)
+        seconds = self._week_seconds(timestamp)
+        return {symbol: schedule.is_open(seconds)
+                for symbol, schedule in schedules.items()}
+
+    def next_open(self, symbol, timestamp=None):
+        """timestamp of the next opening, timestamp itself if open"""
+        if timestamp is None:
+            timestamp = time.time()
+        delta = self.schedule(symbol).next_open(
+            self._week_seconds(timestamp))
+        return None if delta is None else timestamp + delta
+
+    def next_close(self, symbol, timestamp=None):
+        """timestamp of the next closing"""
+        if timestamp is None:
+            timestamp = time.time()
+        delta = self.schedule(symbol).next_close(
+            self._week_seconds(timestamp))
+        return None if delta is None else timestamp + delta
+
+    def window_start(self, symbol, period, number, timestamp=None):
+        """open time of the oldest of the last ``number`` bars of
+        ``period`` seconds, skipping the bars with no trading session"""
+        if timestamp is None:
+            timestamp = time.time()
+        schedule = self.schedule(symbol)
+        offset = self._server_offset()
+        if period > DAY or not schedule.starts:
+            return timestamp - timestamp % period - period * (number - 1)
+        if period == DAY:
+            bar = timestamp - (timestamp + offset) % period
+        else:
+            bar = timestamp - timestamp % period
+        found = 0
+        while True:
+            seconds = week_seconds(bar + offset)
+            if schedule.overlaps(seconds, seconds + period):
+                found += 1
+                if found == number:
+                    return bar
+            bar -= period
@@ -0,0 +1,109 @@
+# -*- coding utf-8 -*-
+
+"""
+XTBApi.keepalive
+~~~~~~~
+
+Background keep alive of a client session, idle sockets are pinged and
+dead or old sessions are replaced by a standby one before a command needs
+them
+"""
+
+import logging
+import threading
+import time
+
+from XTBApi.api import LOGIN_TIMEOUT, STATUS, _get_data
+from XTBApi.exceptions import *
+
+LOGGER = logging.getLogger('XTBApi.keepalive')
+PING_INTERVAL = LOGIN_TIMEOUT / 4
+
+
+class KeepAlive(object):
+    """thread pinging ``client`` when idle for ``interval`` seconds
+
+    if a ping fails, or the session is older than ``max_age`` seconds, a
+    new session is logged in on a standby socket and swapped in with
+    client.refresh_session, so that commands never wait for a reconnection
+    and the streams of the client move to the new session
+    """
+
+    def __init__(self, client, interval=PING_INTERVAL, max_age=None):
+        if interval <= 0:
+            raise ValueError("interval must be positive")
+        self.client = client
+        self.interval = interval
+        self.max_age = max_age
+        self.pings = 0
+        self.failed_pings = 0
+        self.failed_refreshes = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args):
+        self.stop()
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(self.interval)
+            self._thread = None
+
+    def _run(self):
+        # wake often enough to ping right when the interval is reached
+        while not self._stop.wait(min(self.interval, 1.0) / 4):
+            try:
+                done = self.check()
+            except Exception:
+                # an unexpected error must not stop the keep alive
+                LOGGER.exception("keep alive check failed")
+                done = 'failed'
+            if done == 'failed':
+                self._stop.wait(self.interval)
+
+    def check(self):
+        """ping or refresh the session if due, return what was done"""
+        client = self.client
+        if client.status != STATUS.LOGGED:
+            return None
+        age = client.session_age()
+        if self.max_age is not None and age is not None and \
+                age >= self.max_age:
+            return 'refresh' if self._refresh() else 'failed'
+        last = client.last_command
+        if last is not None and time.monotonic() - last < self.interval:
+            return None
+        self.pings += 1
+        try:
+            client._send_command(_get_data("ping"))
+            return 'ping'
+        except (SocketError, ResponseTimeout, CommandFailed,
+                OSError) as e:
+            self.failed_pings += 1
+            LOGGER.info("ping failed: %r, refreshing the session", e)
+        return 'refresh' if self._refresh() else 'failed'
+
+    def _refresh(self):
+        try:
+            self.client.refresh_session()
+            return True
+        except Exception:
+            self.failed_refreshes += 1
+            LOGGER.exception("session refresh failed")
+            return False
+
+    def stats(self):
+        stats = dict(self.client.session_stats)
+        stats.update({'pings': self.pings, 'failed_pings': self.failed_pings,
+                      'failed_refreshes': self.failed_refreshes})
+        return stats
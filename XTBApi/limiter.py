@@ -0,0 +1,130 @@
+# -*- coding utf-8 -*-
+
+"""
+XTBApi.limiter
+~~~~~~~
+
+Rate limiting of the commands sent to the server
+"""
+
+import logging
+import threading
+import time
+
+LOGGER = logging.getLogger('XTBApi.limiter')
+DEFAULT_RATE = 5.0  # one command every 200 ms
+DEFAULT_BURST = 1
+
+COMMAND_CLASSES = {
+    'tradeTransaction': 'trade',
+    'tradeTransactionStatus': 'trade',
+    'getChartLastRequest': 'chart',
+    'getChartRangeRequest': 'chart',
+    'getTickPrices': 'chart',
+    'getTrades': 'account',
+    'getTradeRecords': 'account',
+    'getTradesHistory': 'account',
+    'getMarginLevel': 'account',
+    'getCurrentUserData': 'account',
+}
+
+
+class TokenBucket(object):
+    """token bucket refilled by ``rate`` tokens per second, holds at most
+    ``burst`` tokens"""
+
+    def __init__(self, rate, burst=1):
+        if rate <= 0 or burst < 1:
+            raise ValueError("rate must be positive and burst at least 1")
+        self.rate = float(rate)
+        self.burst = burst
+        self._tokens = float(burst)
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, tokens=1):
+        """take tokens, return the seconds to wait before using them
+
+        tokens can go negative so that waiting callers are served in
+        order of reservation"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst,
+                               self._tokens + (now - self._last) * self.rate)
+            self._last = now
+            self._tokens -= tokens
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+
+class RateLimiter(object):
+    """limit commands with a global bucket and optional per class budgets
+
+    :param rate: commands per second, None to disable the limit
+    :param burst: commands that can be sent back to back
+    :param budgets: dict of class name to (rate, burst), commands of that
+        class must get a token from their class bucket too
+    :param classes: dict of command name to class name, extends
+        COMMAND_CLASSES
+    """
+    _accounts = {}
+    _accounts_lock = threading.Lock()
+
+    def __init__(self, rate=DEFAULT_RATE, burst=DEFAULT_BURST, budgets=None,
+                 classes=None):
+        self.bucket = TokenBucket(rate, burst) if rate is not None else None
+        self.budgets = {name: TokenBucket(*budget) for name, budget in
+                        (budgets or {}).items()}
+        self.classes = dict(COMMAND_CLASSES, **(classes or {}))
+        self.commands = 0
+        self.throttled_commands = 0
+        self.throttled_time = 0.0
+        self.throttled_by_class = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def for_account(cls, user_id, **kwargs):
+        """limiter shared by every client logged in with user_id,
+        kwargs are used only when it is created"""
+        with cls._accounts_lock:
+            if user_id not in cls._accounts:
+                cls._accounts[user_id] = cls(**kwargs)
+            return cls._accounts[user_id]
+
+    def command_class(self, command):
+        return self.classes.get(command, 'default')
+
+    def reserve(self, command):
+        """reserve a slot for command, return seconds to wait"""
+        wait = 0.0
+        if self.bucket is not None:
+            wait = self.bucket.reserve()
+        cmd_class = self.command_class(command)
+        if cmd_class in self.budgets:
+            wait = max(wait, self.budgets[cmd_class].reserve())
+        with self._lock:
+            self.commands += 1
+            if wait > 0:
+                self.throttled_commands += 1
+                self.throttled_time += wait
+                self.throttled_by_class[cmd_class] = \
+                    self.throttled_by_class.get(cmd_class, 0.0) + wait
+        return wait
+
+    def acquire(self, command):
+        """block until command can be sent, return seconds waited"""
+        wait = self.reserve(command)
+        if wait > 0:
+            LOGGER.debug("throttling %s for %.3f s", command, wait)
+            time.sleep(wait)
+        return wait
+
+    def stats(self):
+        with self._lock:
+            return {
+                'commands': self.commands,
+                'throttled_commands': self.throttled_commands,
+                'throttled_time': self.throttled_time,
+                'throttled_by_class': dict(self.throttled_by_class),
+            }
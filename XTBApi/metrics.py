@@ -0,0 +1,234 @@
+# -*- coding utf-8 -*-
+
+"""
+XTBApi.metrics
+~~~~~~~
+
+Per command instrumentation of the clients: counts, errors, bytes and
+latency histograms of the throttle wait, the network round trip and the
+decoding, exported with hooks or in the Prometheus text format
+"""
+
+import logging
+import threading
+
+LOGGER = logging.getLogger('XTBApi.metrics')
+SUB_BUCKET_BITS = 4  # 16 linear buckets per power of two, ~6% error
+_SUB_BUCKETS = 1 << SUB_BUCKET_BITS
+PHASES = ('throttle', 'network', 'decode')
+# upper bounds in seconds of the exported histogram buckets
+EXPORT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+                  0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _bucket_index(micros):
+    if micros < _SUB_BUCKETS:
+        return micros
+    shift = micros.bit_length() - 1 - SUB_BUCKET_BITS
+    return (shift + 1) * _SUB_BUCKETS + (micros >> shift) - _SUB_BUCKETS
+
+
+def _bucket_bounds(index):
+    """[lower, upper) in microseconds of the values of bucket index"""
+    if index < _SUB_BUCKETS:
+        return index, index + 1
+    shift = index // _SUB_BUCKETS - 1
+    sub = index % _SUB_BUCKETS + _SUB_BUCKETS
+    return sub << shift, (sub + 1) << shift
+
+
+class Histogram(object):
+    """HDR style histogram of durations in seconds, log-linear buckets
+    of microseconds so that every value is kept within ~6%"""
+    __slots__ = ('counts', 'count', 'sum', 'min', 'max')
+
+    def __init__(self):
+        self.counts = []
+        self.count = 0
+        self.sum = 0.0
+        self.min = None
+        self.max = None
+
+    def record(self, seconds):
+        index = _bucket_index(max(0, int(round(seconds * 1e6))))
+        if index >= len(self.counts):
+            self.counts.extend([0] * (index + 1 - len(self.counts)))
+        self.counts[index] += 1
+        self.count += 1
+        self.sum += seconds
+        if self.min is None or seconds < self.min:
+            self.min = seconds
+        if self.max is None or seconds > self.max:
+            self.max = seconds
+
+    def merge(self, other):
+        if len(other.counts) > len(self.counts):
+            self.counts.extend([0] * (len(other.counts) - len(self.counts)))
+        for index, count in enumerate(other.counts):
+            self.counts[index] += count
+        self.count += other.count
+        self.sum += other.sum
+        for value in (other.min, other.max):
+            if value is not None:
+                self.min = value if self.min is None else min(self.min, value)
+                self.max = value if self.max is None else max(self.max, value)
+
+    def percentile(self, pct):
+        """upper bound in seconds of the pct percentile, None if empty"""
+        if not self.count:
+            return None
+        target = max(1, pct / 100 * self.count)
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= target:
+                return min(_bucket_bounds(index)[1] / 1e6, self.max)
+        return self.max
+
+    def cumulative(self, bounds=EXPORT_BUCKETS):
+        """counts of values <= each bound, in seconds"""
+        result = []
+        index = seen = 0
+        for bound in bounds:
+            while index < len(self.counts) and \
+                    _bucket_bounds(index)[1] / 1e6 <= bound:
+                seen += self.counts[index]
+                index += 1
+            result.append(seen)
+        return result
+
+    def summary(self):
+        return {'count': self.count, 'sum': self.sum, 'min': self.min,
+                'max': self.max, 'p50': self.percentile(50),
+                'p99': self.percentile(99)}
+
+
+class CommandMetrics(object):
+    """counters and histograms of one command"""
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.bytes_out = 0
+        self.bytes_in = 0
+        self.histograms = {phase: Histogram() for phase in PHASES}
+
+    def summary(self):
+        summary = {'count': self.count, 'errors': self.errors,
+                   'bytes_out': self.bytes_out, 'bytes_in': self.bytes_in}
+        for phase, histogram in self.histograms.items():
+            summary[phase] = histogram.summary()
+        return summary
+
+
+class Metrics(object):
+    """metrics of the commands sent by one or more clients
+
+    every sample is also passed to the hooks added with add_hook, as
+    ``hook(command, sample)`` with sample a dict of the phase durations,
+    bytes_out, bytes_in and error"""
+
+    def __init__(self):
+        self.commands = {}
+        self._hooks = []
+        self._lock = threading.Lock()
+
+    def add_hook(self, hook):
+        self._hooks.append(hook)
+
+    def remove_hook(self, hook):
+        self._hooks.remove(hook)
+
+    def record(self, command, throttle=0.0, network=0.0, decode=0.0,
+               bytes_out=0, bytes_in=0, error=None):
+        """add a sample of command, error is the error code if it failed"""
+        with self._lock:
+            metrics = self.commands.get(command)
+            if metrics is None:
+                metrics = self.commands[command] = CommandMetrics()
+            metrics.count += 1
+            if error is not None:
+                metrics.errors += 1
+            metrics.bytes_out += bytes_out
+            metrics.bytes_in += bytes_in
+            histograms = metrics.histograms
+            histograms['throttle'].record(throttle)
+            histograms['network'].record(network)
+            histograms['decode'].record(decode)
+        if self._hooks:
+            sample = {'throttle': throttle, 'network': network,
+                      'decode': decode, 'bytes_out': bytes_out,
+                      'bytes_in': bytes_in, 'error': error}
+            for hook in list(self._hooks):
+                try:
+                    hook(command, sample)
+                except Exception:
+                    LOGGER.exception("metrics hook failed")
+
+    def summary(self):
+        """dict of command to counters and percentiles"""
+        with self._lock:
+            return {command: metrics.summary()
+                    for command, metrics in self.commands.items()}
+
+    def reset(self):
+        with self._lock:
+            self.commands.clear()
+
+    def to_prometheus(self, prefix='xtbapi'):
+        """metrics in the Prometheus text exposition format"""
+        lines = []
+        with self._lock:
+            items = sorted(self.commands.items())
+            for name, kind, attr in (
+                    ('commands_total', 'counter', 'count'),
+                    ('command_errors_total', 'counter', 'errors'),
+                    ('command_bytes_out_total', 'counter', 'bytes_out'),
+                    ('command_bytes_in_total', 'counter', 'bytes_in')):
+                lines.append("# TYPE {}_{} {}".format(prefix, name, kind))
+                for command, metrics in items:
+                    lines.append('{}_{}{{command="{}"}} {}'.format(
+                        prefix, name, command, getattr(metrics, attr)))
+            for phase in PHASES:
+                name = "{}_command_{}_seconds".format(prefix, phase)
+                lines.append("# TYPE {} histogram".format(name))
+                for command, metrics in items:
+                    histogram = metrics.histograms[phase]
+                    for bound, count in zip(EXPORT_BUCKETS,
+                                            histogram.cumulative()):
+                        lines.append('{}_bucket{{command="{}",le="{}"}} {}'
+                                     .format(name, command, bound, count))
+                    lines.append('{}_bucket{{command="{}",le="+Inf"}} {}'
+                                 .format(name, command, histogram.count))
+                    lines.append('{}_sum{{command="{}"}} {!r}'.format(
+                        name, command, histogram.sum))
+                    lines.append('{}_count{{command="{}"}} {}'.format(
+                        name, command, histogram.count))
+        return '\n'.join(lines) + '\n'
+
+
+def start_http_server(metrics, port=9100, host='127.0.0.1'):
+    """serve metrics.to_prometheus() on http://host:port/metrics in a
+    daemon thread, return the server, shutdown() to stop it"""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split('?')[0] != '/metrics':
+                self.send_error(404)
+                return
+            body = metrics.to_prometheus().encode()
+            self.send_response(200)
+            self.send_header('Content-Type',
+                             'text/plain; version=0.0.4; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            LOGGER.debug(format, *args)
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    LOGGER.debug("metrics served on %s:%d", *server.server_address)
+    return server
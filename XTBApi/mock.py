@@ -0,0 +1,778 @@
+# -*- coding utf-8 -*-
+
+"""
+XTBApi.mock
+~~~~~~~
+
+Local stand-in for the XTB websocket server, speaks the same json protocol
+of the real one so that clients can be tested and benchmarked offline.
+Urls ending with ``Stream`` serve the streaming protocol.
+"""
+
+import base64
+import hashlib
+import json
+import logging
+import random
+import socket
+import socketserver
+import struct
+import threading
+import time
+from datetime import datetime, timezone
+
+LOGGER = logging.getLogger('XTBApi.mock')
+
+_WS_MAGIC = b"258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+_OP_CONT = 0x0
+_OP_TEXT = 0x1
+_OP_CLOSE = 0x8
+_OP_PING = 0x9
+_OP_PONG = 0xA
+
+DAY_MS = 86400 * 1000
+DIGITS = 5
+ACCOUNT_CURRENCY = 'USD'
+
+
+# - websocket framing -
+def _recv_exactly(sock, size):
+    buf = b''
+    while len(buf) < size:
+        chunk = sock.recv(size - len(buf))
+        if not chunk:
+            raise ConnectionError("connection closed by peer")
+        buf += chunk
+    return buf
+
+
+def _read_frame(sock):
+    """read a single frame, return (fin, opcode, payload)"""
+    head = _recv_exactly(sock, 2)
+    fin = head[0] & 0x80
+    opcode = head[0] & 0x0F
+    masked = head[1] & 0x80
+    length = head[1] & 0x7F
+    if length == 126:
+        length = struct.unpack('>H', _recv_exactly(sock, 2))[0]
+    elif length == 127:
+        length = struct.unpack('>Q', _recv_exactly(sock, 8))[0]
+    mask = _recv_exactly(sock, 4) if masked else None
+    payload = _recv_exactly(sock, length)
+    if mask:
+        payload = bytes(b ^ mask[i % 4] for i, b in enumerate(payload))
+    return fin, opcode, payload
+
+
+def _write_frame(sock, payload, opcode=_OP_TEXT):
+    head = bytes([0x80 | opcode])
+    length = len(payload)
+    if length < 126:
+        head += bytes([length])
+    elif length < 1 << 16:
+        head += bytes([126]) + struct.pack('>H', length)
+    else:
+        head += bytes([127]) + struct.pack('>Q', length)
+    sock.sendall(head + payload)
+
+
+def _handshake(sock):
+    request = b''
+    while b'\r\n\r\n' not in request:
+        chunk = sock.recv(4096)
+        if not chunk:
+            raise ConnectionError("connection closed during handshake")
+        request += chunk
+    lines = request.split(b'\r\n')
+    path = lines[0].split(b' ')[1].decode()
+    headers = {}
+    for line in lines[1:]:
+        if b':' in line:
+            key, value = line.split(b':', 1)
+            headers[key.strip().lower()] = value.strip()
+    accept = base64.b64encode(hashlib.sha1(
+        headers[b'sec-websocket-key'] + _WS_MAGIC).digest())
+    sock.sendall(b"HTTP/1.1 101 Switching Protocols\r\n"
+                 b"Upgrade: websocket\r\n"
+                 b"Connection: Upgrade\r\n"
+                 b"Sec-WebSocket-Accept: " + accept + b"\r\n\r\n")
+    return path
+
+
+# - fake market data -
+def _symbol_names(n_symbols):
+    base = ['EURUSD', 'GBPUSD', 'USDJPY', 'DE30', 'US500', 'GOLD']
+    names = base[:n_symbols]
+    names += ["SYM{:04d}".format(x) for x in range(n_symbols - len(names))]
+    return names
+
+
+def _base_points(symbol):
+    """deterministic base price in points for symbol"""
+    seed = int(hashlib.md5(symbol.encode()).hexdigest()[:6], 16)
+    return 50000 + seed % 150000
+
+
+def _candle(symbol, ctm):
+    """deterministic candle at ctm (ms) in xtb format"""
+    rnd = random.Random("{}{}".format(symbol, ctm))
+    op = _base_points(symbol) + rnd.randint(-500, 500)
+    close = rnd.randint(-50, 50)
+    high = max(0, close) + rnd.randint(0, 30)
+    low = min(0, close) - rnd.randint(0, 30)
+    ctm_string = datetime.fromtimestamp(ctm / 1000, timezone.utc).strftime(
+        "%b %d, %Y, %I:%M:%S %p")
+    return {
+        'ctm': ctm,
+        'ctmString': ctm_string,
+        'open': op,
+        'close': close,
+        'high': high,
+        'low': low,
+        'vol': float(rnd.randint(1, 1000))
+    }
+
+
+def _is_trading(ctm):
+    """market is closed on saturday and sunday"""
+    return datetime.fromtimestamp(ctm / 1000, timezone.utc).isoweekday() < 6
+
+
+def _symbol_record(symbol):
+    points = _base_points(symbol)
+    bid = points / 10 ** DIGITS
+    return {
+        'symbol': symbol,
+        'currency': symbol[:3],
+        'currencyProfit': symbol[3:6] or 'USD',
+        'categoryName': 'FX',
+        'groupName': 'Major',
+        'description': "mock {}".format(symbol),
+        'marginMode': 101,
+        'profitMode': 5,
+        'precision': DIGITS,
+        'pipsPrecision': DIGITS - 1,
+        'contractSize': 100000,
+        'leverage': 3.33,
+        'lotMin': 0.01,
+        'lotMax': 100.0,
+        'lotStep': 0.01,
+        'tickSize': 10 ** -DIGITS,
+        'tickValue': 1.0,
+        'swapLong': -0.5,
+        'swapShort': 0.1,
+        'swapEnable': True,
+        'stopsLevel': 0,
+        'spreadRaw': 0.0001,
+        'spreadTable': 1.0,
+        'bid': bid,
+        'ask': round(bid + 0.0001, DIGITS),
+        'high': round(bid * 1.01, DIGITS),
+        'low': round(bid * 0.99, DIGITS),
+        'time': int(time.time() * 1000),
+        'timeString': time.ctime(),
+        'quoteId': 1,
+        'type': 1,
+        'instantMaxVolume': 1000,
+        'trailingEnabled': True,
+        'longOnly': False,
+        'shortSelling': True,
+        'currencyPair': True,
+        'marginHedged': 0,
+        'marginHedgedStrong': False,
+        'marginMaintenance': 0,
+        'initialMargin': 0,
+        'percentage': 100.0,
+        'starting': None,
+        'expiration': None,
+        'exemode': 1,
+        'swapType': 2,
+        'swap_rollover3days': 3,
+        'stepRuleId': 1
+    }
+
+
+class _Handler(socketserver.BaseRequestHandler):
+    def handle(self):
+        server = self.server.mock
+        sock = self.request
+        try:
+            path = _handshake(sock)
+        except (ConnectionError, OSError, KeyError, IndexError):
+            return
+        session = _Session(server, sock, path)
+        server._register(session)
+        try:
+            session.run()
+        finally:
+            server._unregister(session)
+
+
+class _Session(object):
+    """a single client connection"""
+
+    def __init__(self, server, sock, path):
+        self.server = server
+        self.sock = sock
+        self.path = path
+        self.logged = False
+        self.n_commands = 0
+        self.stream = path.rstrip('/').endswith('Stream')
+        self.subscriptions = {}
+        self.closed = False
+        self._pusher = None
+        self._send_lock = threading.Lock()
+
+    def send(self, data):
+        payload = json.dumps(data).encode()
+        with self._send_lock:
+            _write_frame(self.sock, payload)
+
+    def close(self):
+        self.closed = True
+        try:
+            with self._send_lock:
+                _write_frame(self.sock, b'', _OP_CLOSE)
+        except OSError:
+            pass
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+
+    def _messages(self):
+        fragments = []
+        while True:
+            fin, opcode, payload = _read_frame(self.sock)
+            if opcode == _OP_CLOSE:
+                return
+            elif opcode == _OP_PING:
+                with self._send_lock:
+                    _write_frame(self.sock, payload, _OP_PONG)
+                continue
+            elif opcode == _OP_PONG:
+                continue
+            fragments.append(payload)
+            if fin:
+                yield b''.join(fragments).decode()
+                fragments = []
+
+    def run(self):
+        try:
+            for message in self._messages():
+                self.n_commands += 1
+                disconnect = self.server.disconnect_after
+                if disconnect and self.n_commands > disconnect:
+                    self.close()
+                    return
+                if self.server.concurrent:
+                    threading.Thread(target=self._reply, args=(message,),
+                                     daemon=True).start()
+                else:
+                    self._reply(message)
+        except (ConnectionError, OSError):
+            pass
+
+    def start_pusher(self):
+        if self._pusher is None:
+            self._pusher = threading.Thread(target=self._push_loop,
+                                            daemon=True)
+            self._pusher.start()
+
+    def _push_loop(self):
+        try:
+            while not self.closed:
+                time.sleep(self.server.stream_interval)
+                for message in self.server.stream_data(self):
+                    self.send(message)
+        except OSError:
+            pass
+
+    def _reply(self, message):
+        request = json.loads(message)
+        command = request.get('command')
+        if self.stream:
+            self.server.stream_dispatch(self, request)
+            return
+        self.server._delay(command)
+        response = self.server.dispatch(self, request)
+        if response is None:
+            return
+        if 'customTag' in request:
+            response['customTag'] = request['customTag']
+        try:
+            self.send(response)
+        except OSError:
+            pass
+
+
+class MockServer(object):
+    """local xtb server, use the ``url`` attribute to point the clients
+
+    :param latency: seconds to wait before replying, can be a dict of
+        command name to seconds
+    :param errors: dict of command name to error code always returned
+    :param error_rate: probability of a random ``EX000`` failure
+    :param disconnect_after: drop every connection after n commands
+    :param concurrent: reply to requests of the same connection in parallel
+    :param stream_interval: seconds between streaming pushes
+    """
+
+    def __init__(self, host='127.0.0.1', port=0, latency=0.0, n_symbols=50,
+                 n_candles=1000, n_trades=0, n_history=0, errors=None,
+                 error_rate=0.0, disconnect_after=None, concurrent=False,
+                 credentials=None, stream_interval=0.05, seed=0):
+        self.latency = latency
+        self.stream_interval = stream_interval
+        self.n_candles = n_candles
+        self.errors = dict(errors or {})
+        self.error_rate = error_rate
+        self.disconnect_after = disconnect_after
+        self.concurrent = concurrent
+        self.credentials = credentials
+        self.symbols = {name: _symbol_record(name) for name in
+                        _symbol_names(n_symbols)}
+        self.commands = {}
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._sessions = set()
+        self._stream_ids = set()
+        self._next_order = 1000
+        self._trades = {}
+        self._history = []
+        self._statuses = {}
+        now = int(time.time() * 1000)
+        for x in range(n_trades):
+            self._open(self._random.choice(list(self.symbols)), x % 2, 0.1)
+        for x in range(n_history):
+            trade = self._new_trade(
+                self._random.choice(list(self.symbols)), x % 2, 0.1,
+                now - (n_history - x) * 3600 * 1000)
+            trade['closed'] = True
+            trade['close_time'] = trade['open_time'] + 1800 * 1000
+            self._history.append(trade)
+        self._tcp = socketserver.ThreadingTCPServer((host, port), _Handler,
+                                                    bind_and_activate=False)
+        self._tcp.daemon_threads = True
+        self._tcp.allow_reuse_address = True
+        self._tcp.mock = self
+        self._thread = None
+
+    @property
+    def address(self):
+        return self._tcp.server_address
+
+    @property
+    def url(self):
+        """url template accepted by BaseClient"""
+        host, port = self.address[:2]
+        return "ws://{}:{}/{{mode}}".format(host, port)
+
+    def start(self):
+        self._tcp.server_bind()
+        self._tcp.server_activate()
+        self._thread = threading.Thread(target=self._tcp.serve_forever,
+                                        daemon=True)
+        self._thread.start()
+        LOGGER.debug("mock server listening on %s:%s", *self.address[:2])
+        return self
+
+    def stop(self):
+        self._tcp.shutdown()
+        for session in list(self._sessions):
+            session.close()
+        self._tcp.server_close()
+        LOGGER.debug("mock server stopped")
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args):
+        self.stop()
+
+    def drop_connections(self):
+        """close every open connection, as the real server does on timeout"""
+        for session in list(self._sessions):
+            session.close()
+
+    def _register(self, session):
+        with self._lock:
+            self._sessions.add(session)
+
+    def _unregister(self, session):
+        with self._lock:
+            self._sessions.discard(session)
+
+    def _delay(self, command):
+        if isinstance(self.latency, dict):
+            delay = self.latency.get(command, 0.0)
+        else:
+            delay = self.latency
+        if delay:
+            time.sleep(delay)
+
+    # - protocol -
+    def dispatch(self, session, request):
+        """build the response for request"""
+        command = request.get('command')
+        args = request.get('arguments', {})
+        with self._lock:
+            self.commands[command] = self.commands.get(command, 0) + 1
+        if command in self.errors:
+            return _error(self.errors[command])
+        if self.error_rate and self._random.random() < self.error_rate:
+            return _error('EX000')
+        if command == 'login':
+            return self._login(session, args)
+        if not session.logged:
+            return _error('BE103', "User is not logged")
+        method = getattr(self, '_cmd_' + str(command), None)
+        if method is None:
+            return _error('EX007', "Unknown command")
+        try:
+            with self._lock:
+                return method(args)
+        except _CommandError as e:
+            return _error(e.code, e.description)
+
+    def _login(self, session, args):
+        if self.credentials is not None and \
+                (args.get('userId'), args.get('password')) != \
+                self.credentials:
+            return _error('BE005', "userPasswordCheck: Invalid login or "
+                                   "password")
+        session.logged = True
+        stream_id = "mock-{}".format(id(session))
+        self._stream_ids.add(stream_id)
+        return {'status': True, 'streamSessionId': stream_id}
+
+    def _cmd_logout(self, args):
+        return {'status': True}
+
+    def _cmd_ping(self, args):
+        return {'status': True}
+
+    def _cmd_getAllSymbols(self, args):
+        return _ok(list(self.symbols.values()))
+
+    def _cmd_getSymbol(self, args):
+        return _ok(self._get_symbol(args['symbol']))
+
+    def _cmd_getCalendar(self, args):
+        now = int(time.time() * 1000)
+        return _ok([{'country': 'US', 'current': '', 'forecast': '',
+                     'impact': '1', 'period': '', 'previous': '',
+                     'time': now + x * 3600 * 1000,
+                     'title': "event {}".format(x)} for x in range(10)])
+
+    def _chart(self, symbol, period, start, end, limit=None):
+        self._get_symbol(symbol)
+        step = period * 60 * 1000
+        if limit is not None:
+            start = max(int(start), int(end) - limit * step * 2)
+        first = -(-int(start) // step) * step
+        infos = []
+        for ctm in range(first, int(end), step):
+            if _is_trading(ctm):
+                infos.append(_candle(symbol, ctm))
+        if limit is not None:
+            infos = infos[-limit:]
+        return _ok({'digits': DIGITS, 'rateInfos': infos})
+
+    def _cmd_getChartLastRequest(self, args):
+        info = args['info']
+        end = int(time.time() * 1000)
+        return self._chart(info['symbol'], info['period'], info['start'], end,
+                           self.n_candles)
+
+    def _cmd_getChartRangeRequest(self, args):
+        info = args['info']
+        ticks = info.get('ticks', 0)
+        if not ticks:
+            response = self._chart(info['symbol'], info['period'],
+                                   info['start'], info['end'])
+            infos = response['returnData']['rateInfos']
+            infos[:] = infos[-self.n_candles:]
+            return response
+        # ticks candles from start, or before start if negative
+        self._get_symbol(info['symbol'])
+        step = info['period'] * 60 * 1000
+        direction = 1 if ticks > 0 else -1
+        ctm = -(-int(info['start']) // step) * step
+        if direction < 0:
+            ctm -= step
+        now = int(time.time() * 1000)
+        infos = []
+        while len(infos) < min(abs(ticks), self.n_candles) and 0 <= ctm < now:
+            if _is_trading(ctm):
+                infos.append(_candle(info['symbol'], ctm))
+            ctm += direction * step
+        if direction < 0:
+            infos.reverse()
+        return _ok({'digits': DIGITS, 'rateInfos': infos})
+
+    def _cmd_getCommissionDef(self, args):
+        self._get_symbol(args['symbol'])
+        return _ok({'commission': 0.0, 'rateOfExchange': 1.0})
+
+    def _cmd_getCurrentUserData(self, args):
+        return _ok({'companyUnit': 8, 'currency': ACCOUNT_CURRENCY,
+                    'group': 'demo' + ACCOUNT_CURRENCY,
+                    'ibAccount': False, 'leverage': 1,
+                    'leverageMultiplier': 0.25, 'spreadType': 'FLOAT',
+                    'trailingStop': False})
+
+    def _cmd_getMarginLevel(self, args):
+        margin = sum(self._margin(t['symbol'], t['volume'])
+                     for t in self._trades.values())
+        return _ok({'balance': 10000.0, 'credit': 0.0,
+                    'currency': ACCOUNT_CURRENCY,
+                    'equity': 10000.0, 'margin': margin,
+                    'margin_free': 10000.0 - margin,
+                    'margin_level': 0.0 if not margin else
+                    10000.0 / margin * 100})
+
+    def _rate(self, currency):
+        """price of currency in the account currency, from the pair of
+        both if listed"""
+        if currency == ACCOUNT_CURRENCY:
+            return 1.0
+        direct = self.symbols.get(currency + ACCOUNT_CURRENCY)
+        if direct is not None:
+            return direct['bid']
+        inverse = self.symbols.get(ACCOUNT_CURRENCY + currency)
+        if inverse is not None:
+            return 1 / inverse['ask']
+        return 1.0
+
+    def _margin(self, symbol, volume):
+        """forex margin, in the base currency converted to the account's"""
+        spec = self._get_symbol(symbol)
+        return round(volume * spec['contractSize'] * spec['leverage'] / 100 *
+                     self._rate(spec['currency']), 2)
+
+    def _cmd_getMarginTrade(self, args):
+        return _ok({'margin': self._margin(args['symbol'], args['volume'])})
+
+    def _cmd_getProfitCalculation(self, args):
+        spec = self._get_symbol(args['symbol'])
+        sign = 1 if args['cmd'] == 0 else -1
+        profit = sign * (args['closePrice'] - args['openPrice']) * \
+            args['volume'] * spec['contractSize'] * \
+            self._rate(spec['currencyProfit'])
+        return _ok({'profit': round(profit, 2)})
+
+    def _cmd_getServerTime(self, args):
+        now = time.time()
+        return _ok({'time': int(now * 1000),
+                    'timeString': datetime.fromtimestamp(
+                        now, timezone.utc).strftime("%b %d, %Y %I:%M:%S %p")})
+
+    def _cmd_getTickPrices(self, args):
+        quotations = []
+        for symbol in args['symbols']:
+            spec = self._get_symbol(symbol)
+            quotations.append({
+                'symbol': symbol, 'ask': spec['ask'], 'bid': spec['bid'],
+                'askVolume': 1000, 'bidVolume': 1000, 'high': spec['high'],
+                'low': spec['low'], 'level': args.get('level', 0),
+                'spreadRaw': spec['spreadRaw'],
+                'spreadTable': spec['spreadTable'],
+                'timestamp': int(time.time() * 1000)})
+        return _ok({'quotations': quotations})
+
+    def _cmd_getTradeRecords(self, args):
+        return _ok([self._trades[order] for order in args['orders']
+                    if order in self._trades])
+
+    def _cmd_getTrades(self, args):
+        trades = list(self._trades.values())
+        if not args.get('openedOnly', True):
+            trades = self._history + trades
+        return _ok(trades)
+
+    def _cmd_getTradesHistory(self, args):
+        end = args.get('end') or int(time.time() * 1000)
+        start = args.get('start') or end - 30 * DAY_MS
+        return _ok([t for t in self._history
+                    if start <= t['close_time'] <= end])
+
+    def _cmd_getTradingHours(self, args):
+        hours = []
+        for symbol in args['symbols']:
+            self._get_symbol(symbol)
+            days = [{'day': day, 'fromT': 0, 'toT': DAY_MS}
+                    for day in range(1, 6)]
+            hours.append({'symbol': symbol, 'quotes': days,
+                          'trading': [dict(x) for x in days]})
+        return _ok(hours)
+
+    def _cmd_getVersion(self, args):
+        return _ok({'version': '2.5.0'})
+
+    def _cmd_tradeTransaction(self, args):
+        info = args['tradeTransInfo']
+        if info['type'] == 0:
+            trade = self._open(info['symbol'], info['cmd'], info['volume'],
+                               info.get('price'))
+            order = trade['order']
+            self._publish('Trades', 'trade', dict(trade, state='Modified'))
+        elif info['type'] == 2:
+            if info.get('order') not in self._trades:
+                raise _CommandError('BE51', "Order already closed")
+            trade = self._trades.pop(info['order'])
+            trade['closed'] = True
+            trade['close_time'] = int(time.time() * 1000)
+            self._history.append(trade)
+            order = self._new_order()
+            self._publish('Trades', 'trade', dict(trade, state='Deleted'))
+        elif info['type'] == 3:
+            if info.get('order') not in self._trades:
+                raise _CommandError('BE9', "Order not found")
+            trade = self._trades[info['order']]
+            trade['sl'] = info.get('sl', trade['sl'])
+            trade['tp'] = info.get('tp', trade['tp'])
+            order = self._new_order()
+        else:
+            order = self._new_order()
+        self._statuses[order] = {'ask': 0.0, 'bid': 0.0,
+                                 'customComment': info.get('customComment'),
+                                 'message': None, 'order': order,
+                                 'requestStatus': 3}
+        self._publish('TradeStatus', 'tradeStatus', {
+            'customComment': info.get('customComment'), 'message': None,
+            'order': order, 'price': info.get('price'), 'requestStatus': 3})
+        return _ok({'order': order})
+
+    def _cmd_tradeTransactionStatus(self, args):
+        if args['order'] not in self._statuses:
+            raise _CommandError('BE9', "Order not found")
+        return _ok(self._statuses[args['order']])
+
+    # - streaming -
+    def stream_dispatch(self, session, request):
+        """handle a subscription, the data is pushed by the session"""
+        command = request.get('command', '')
+        with self._lock:
+            self.commands['stream.' + command] = \
+                self.commands.get('stream.' + command, 0) + 1
+            if request.get('streamSessionId') not in self._stream_ids:
+                session.close()
+                return
+            subs = session.subscriptions
+            if command.startswith('get'):
+                topic = subs.setdefault(command[3:], set())
+                if 'symbol' in request:
+                    topic.add(request['symbol'])
+            elif command.startswith('stop'):
+                topic = command[4:]
+                if 'symbol' in request:
+                    subs.get(topic, set()).discard(request['symbol'])
+                    if not subs.get(topic, True):
+                        del subs[topic]
+                else:
+                    subs.pop(topic, None)
+        if command.startswith('get'):
+            session.start_pusher()
+
+    def stream_data(self, session):
+        """messages pushed periodically to session"""
+        messages = []
+        now = int(time.time() * 1000)
+        with self._lock:
+            subs = {key: set(value) for key, value in
+                    session.subscriptions.items()}
+            for symbol in sorted(subs.get('TickPrices', ())):
+                spec = self.symbols.get(symbol)
+                if spec is None:
+                    continue
+                move = self._random.randint(-5, 5) / 10 ** DIGITS
+                spec['bid'] = round(spec['bid'] + move, DIGITS)
+                spec['ask'] = round(spec['bid'] + spec['spreadRaw'], DIGITS)
+                messages.append({'command': 'tickPrices', 'data': {
+                    'symbol': symbol, 'ask': spec['ask'], 'bid': spec['bid'],
+                    'askVolume': 1000, 'bidVolume': 1000,
+                    'high': spec['high'], 'low': spec['low'], 'level': 0,
+                    'quoteId': 1, 'spreadRaw': spec['spreadRaw'],
+                    'spreadTable': spec['spreadTable'], 'timestamp': now}})
+            for symbol in sorted(subs.get('Candles', ())):
+                candle = _candle(symbol, now - now % 60000)
+                digits = 10 ** DIGITS
+                messages.append({'command': 'candle', 'data': {
+                    'symbol': symbol, 'ctm': candle['ctm'],
+                    'ctmString': candle['ctmString'],
+                    'open': candle['open'] / digits,
+                    'close': (candle['open'] + candle['close']) / digits,
+                    'high': (candle['open'] + candle['high']) / digits,
+                    'low': (candle['open'] + candle['low']) / digits,
+                    'vol': candle['vol'], 'quoteId': 1}})
+            if 'Balance' in subs:
+                level = self._cmd_getMarginLevel({})['returnData']
+                messages.append({'command': 'balance', 'data': {
+                    'balance': level['balance'], 'credit': level['credit'],
+                    'equity': level['equity'], 'margin': level['margin'],
+                    'marginFree': level['margin_free'],
+                    'marginLevel': level['margin_level']}})
+            if 'Profits' in subs:
+                for trade in self._trades.values():
+                    messages.append({'command': 'profit', 'data': {
+                        'order': trade['order'], 'order2': trade['order2'],
+                        'position': trade['position'],
+                        'profit': trade['profit']}})
+            if 'KeepAlive' in subs:
+                messages.append({'command': 'keepAlive',
+                                 'data': {'timestamp': now}})
+        return messages
+
+    def _publish(self, topic, command, data):
+        for session in list(self._sessions):
+            if session.stream and topic in session.subscriptions:
+                try:
+                    session.send({'command': command, 'data': data})
+                except OSError:
+                    pass
+
+    # - trades -
+    def _get_symbol(self, symbol):
+        if symbol not in self.symbols:
+            raise _CommandError('BE115', "Symbol does not exist")
+        return self.symbols[symbol]
+
+    def _new_order(self):
+        self._next_order += 1
+        return self._next_order
+
+    def _new_trade(self, symbol, cmd, volume, open_time=None, price=None):
+        spec = self._get_symbol(symbol)
+        if price is None:
+            price = spec['ask'] if cmd == 0 else spec['bid']
+        order = self._new_order()
+        return {
+            'cmd': cmd, 'order': order, 'order2': order, 'position': order,
+            'symbol': symbol, 'volume': volume, 'open_price': price,
+            'close_price': spec['bid'] if cmd == 0 else spec['ask'],
+            'open_time': open_time or int(time.time() * 1000),
+            'close_time': None, 'closed': False, 'profit': 0.0,
+            'commission': 0.0, 'storage': 0.0, 'sl': 0.0, 'tp': 0.0,
+            'digits': DIGITS, 'comment': '', 'customComment': None,
+            'margin_rate': 0.0, 'expiration': None}
+
+    def _open(self, symbol, cmd, volume, price=None):
+        trade = self._new_trade(symbol, cmd, volume, price=price)
+        self._trades[trade['order']] = trade
+        return trade
+
+
+class _CommandError(Exception):
+    def __init__(self, code, description=""):
+        self.code = code
+        self.description = description
+        super().__init__(code)
+
+
+def _ok(return_data):
+    return {'status': True, 'returnData': return_data}
+
+
+def _error(code, description="mock error"):
+    return {'status': False, 'errorCode': code, 'errorDescr': description}
@@ -0,0 +1,210 @@
+# -*- coding utf-8 -*-
+
+"""
+XTBApi.multiplex
+~~~~~~~
+
+Thread safe clients sharing one session between threads: a reader thread
+owns the receiving side of the socket, requests are tagged with
+customTag and the calling threads wait on futures, so that many commands
+can be in flight at once.
+"""
+
+import concurrent.futures
+import itertools
+import logging
+import threading
+import time
+
+from XTBApi.api import (STATUS, BaseClient, Client, WS_URL,
+                        _connection_closed)
+from XTBApi.exceptions import *
+
+LOGGER = logging.getLogger('XTBApi.multiplex')
+RESPONSE_TIMEOUT = 30.0
+DRAIN_TIMEOUT = 5.0
+
+
+class _Connection(object):
+    """a logged socket, its reader thread and the requests waiting"""
+
+    def __init__(self, client, ws, connection_id):
+        self.client = client
+        self.ws = ws
+        self.id = connection_id
+        self.pending = {}
+        self.closed = False
+        self._send_lock = threading.Lock()
+        self._idle = threading.Condition()
+        self._reader = threading.Thread(
+            target=self._read_loop, daemon=True,
+            name="XTBApi-reader-{}".format(connection_id))
+        self._reader.start()
+
+    def send(self, tag, request):
+        future = concurrent.futures.Future()
+        with self._idle:
+            if self.closed:
+                raise SocketError()
+            self.pending[tag] = future
+        try:
+            with self._send_lock:
+                self.ws.send(request)
+        except (_connection_closed(), OSError):
+            self._done(tag)
+            raise SocketError()
+        return future
+
+    def _done(self, tag):
+        with self._idle:
+            future = self.pending.pop(tag, None)
+            if not self.pending:
+                self._idle.notify_all()
+        return future
+
+    def _read_loop(self):
+        """dispatch every response to the future of its tag"""
+        client = self.client
+        try:
+            while True:
+                message = self.ws.recv()
+                received = time.perf_counter()
+                res = client.codec.loads(message)
+                with client._stats_lock:
+                    client.bytes_received += len(message)
+                future = self._done(res.get('customTag'))
+                if future is None:
+                    LOGGER.warning("response without request: %.200s",
+                                   message)
+                else:
+                    future.set_result((res, received, len(message),
+                                       time.perf_counter() - received))
+        except (_connection_closed(), OSError, ValueError) as e:
+            LOGGER.debug("reader %d stopped: %r", self.id, e)
+        finally:
+            with self._idle:
+                self.closed = True
+                pending = list(self.pending.values())
+                self.pending.clear()
+                self._idle.notify_all()
+            for future in pending:
+                future.set_exception(SocketError())
+
+    def close(self, drain=0.0):
+        """close the socket, after the requests in flight are answered or
+        drain seconds"""
+        with self._idle:
+            self._idle.wait_for(lambda: not self.pending, drain)
+        try:
+            self.ws.close()
+        except Exception:
+            pass
+
+
+class MultiplexedBaseClient(BaseClient):
+    """BaseClient whose commands can be called from many threads at once
+
+    :param timeout: seconds to wait for a response before raising
+        ResponseTimeout, the command is not retried
+    """
+
+    def __init__(self, url=WS_URL, limiter=None, codec=None, metrics=None,
+                 transport=None, timeout=RESPONSE_TIMEOUT):
+        super().__init__(url, limiter, codec, metrics, transport)
+        self.timeout = timeout
+        self.connection = None
+        self._tags = itertools.count(1)
+        self._connection_ids = itertools.count(1)
+        self._login_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self.LOGGER = logging.getLogger(
+            'XTBApi.multiplex.MultiplexedBaseClient')
+
+    def _send_command(self, dict_data):
+        """send a tagged command and wait for its response"""
+        connection = self.connection
+        if connection is None:
+            raise SocketError()
+        command = dict_data['command']
+        throttle = self.limiter.acquire(command)
+        tag = str(next(self._tags))
+        request = self.codec.dumps(dict(dict_data, customTag=tag))
+        start = time.perf_counter()
+        self.last_command = time.monotonic()
+        try:
+            future = connection.send(tag, request)
+            res, received, size, decode = future.result(self.timeout)
+        except SocketError:
+            self.metrics.record(command, throttle,
+                                time.perf_counter() - start,
+                                bytes_out=len(request), error='socket')
+            raise
+        except concurrent.futures.TimeoutError:
+            # the server may still execute it, it is not sent again
+            connection._done(tag)
+            self.metrics.record(command, throttle,
+                                time.perf_counter() - start,
+                                bytes_out=len(request), error='timeout')
+            raise ResponseTimeout(command)
+        with self._stats_lock:
+            self.bytes_sent += len(request)
+        self.metrics.record(command, throttle, received - start, decode,
+                            len(request), size,
+                            None if res['status'] else res.get('errorCode'))
+        if res['status'] is False:
+            raise CommandFailed(res)
+        if 'returnData' in res:
+            self.LOGGER.info("CMD: done")
+            return res['returnData']
+        return res
+
+    def _swap_session(self, ws, response):
+        connection = _Connection(self, ws, next(self._connection_ids))
+        with self._ws_lock:
+            old, self.connection = self.connection, connection
+            self.ws = ws
+            self.stream_session_id = response['streamSessionId']
+            self.connected_at = time.monotonic()
+        if old is not None:
+            # the commands in flight end on the old socket
+            old.close(DRAIN_TIMEOUT)
+            self._session_swapped()
+
+    def _relogin(self, connection):
+        # only the first failed command logs in again, the others reuse it
+        with self._login_lock:
+            if self.connection is connection:
+                self.login(*self._login_data, mode=self.mode)
+
+    def _login_decorator(self, func, *args, **kwargs):
+        if self.status == STATUS.NOT_LOGGED:
+            raise NotLogged()
+        connection = self.connection
+        try:
+            return func(*args, **kwargs)
+        except SocketError:
+            LOGGER.info("re-logging in due to LOGIN_TIMEOUT gone")
+            self._relogin(connection)
+            return func(*args, **kwargs)
+
+    def logout(self):
+        response = super().logout()
+        connection, self.connection = self.connection, None
+        if connection is not None:
+            connection.close()
+        return response
+
+    def in_flight(self):
+        """commands waiting for their response"""
+        connection = self.connection
+        return len(connection.pending) if connection is not None else 0
+
+
+class MultiplexedClient(MultiplexedBaseClient, Client):
+    """Client whose methods can be called from many threads at once,
+    sharing one logged session"""
+
+    def __init__(self, url=WS_URL, limiter=None, codec=None, metrics=None,
+                 transport=None, timeout=RESPONSE_TIMEOUT):
+        super().__init__(url, limiter, codec, metrics, transport, timeout)
+        self.LOGGER = logging.getLogger('XTBApi.multiplex.MultiplexedClient')
@@ -0,0 +1,189 @@
+# -*- coding utf-8 -*-
+
+"""
+XTBApi.pool
+~~~~~~~
+
+Pool of logged sessions to run independent read-only commands in parallel
+"""
+
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from XTBApi.api import BaseClient
+from XTBApi.exceptions import *
+
+LOGGER = logging.getLogger('XTBApi.pool')
+READ_ONLY_COMMANDS = frozenset([
+    'get_all_symbols', 'get_calendar', 'get_chart_last_request',
+    'get_chart_range_request', 'get_commission', 'get_margin_level',
+    'get_margin_trade', 'get_profit_calculation', 'get_server_time',
+    'get_symbol', 'get_tick_prices', 'get_trade_records', 'get_trades',
+    'get_trades_history', 'get_trading_hours', 'get_version', 'ping',
+    'get_user_data'])
+
+
+class _Session(object):
+    def __init__(self, index, client):
+        self.index = index
+        self.client = client
+        self.commands = 0
+        self.errors = 0
+        self.busy_time = 0.0
+
+
+class SessionPool(object):
+    """run read-only BaseClient commands over ``size`` logged connections
+
+    every connection has its worker thread and the workers take the
+    commands from one FIFO queue, so commands are served in order of
+    submission and spread over the idle connections::
+
+        with SessionPool(user_id, password, size=4) as pool:
+            charts = pool.map('get_chart_range_request',
+                              [(sym, 1, start, end, 0) for sym in symbols])
+
+    :param client_factory: callable returning a not logged BaseClient
+    :param login_attempts: login tries of every connection
+    """
+
+    def __init__(self, user_id, password, size=4, mode='demo',
+                 client_factory=BaseClient, login_attempts=3,
+                 retry_delay=1.0):
+        if size < 1:
+            raise ValueError("size must be at least 1")
+        self.user_id = user_id
+        self.password = password
+        self.size = size
+        self.mode = mode
+        self.client_factory = client_factory
+        self.login_attempts = login_attempts
+        self.retry_delay = retry_delay
+        self.sessions = []
+        self.submitted = 0
+        self._tasks = queue.Queue()
+        self._workers = []
+        self._started_at = None
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args):
+        self.close()
+
+    def _login(self, index):
+        for attempt in range(1, self.login_attempts + 1):
+            client = self.client_factory()
+            try:
+                client.login(self.user_id, self.password, self.mode)
+                return _Session(index, client)
+            except (CommandFailed, SocketError, OSError) as e:
+                LOGGER.warning("login of session %d failed (%d/%d): %s",
+                               index, attempt, self.login_attempts, e)
+                if attempt == self.login_attempts:
+                    raise
+                time.sleep(self.retry_delay * attempt)
+
+    def start(self):
+        """log in every connection in parallel and start the workers"""
+        results = [None] * self.size
+
+        def login(index):
+            try:
+                results[index] = self._login(index)
+            except Exception as e:
+                results[index] = e
+
+        threads = [threading.Thread(target=login, args=(x,))
+                   for x in range(self.size)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.sessions = [x for x in results if isinstance(x, _Session)]
+        if not self.sessions:
+            raise results[0]
+        if len(self.sessions) < self.size:
+            LOGGER.warning("pool started with %d of %d sessions",
+                           len(self.sessions), self.size)
+        self._started_at = time.monotonic()
+        for session in self.sessions:
+            worker = threading.Thread(target=self._worker, args=(session,),
+                                      daemon=True)
+            worker.start()
+            self._workers.append(worker)
+        LOGGER.info("pool started with %d sessions", len(self.sessions))
+        return self
+
+    def close(self):
+        """stop the workers once the queued commands are done and log out"""
+        for _ in self._workers:
+            self._tasks.put(None)
+        for worker in self._workers:
+            worker.join()
+        self._workers = []
+        for session in self.sessions:
+            try:
+                session.client.logout()
+            except Exception as e:
+                LOGGER.debug("logout of session %d failed: %s",
+                             session.index, e)
+        LOGGER.info("pool closed")
+
+    def _worker(self, session):
+        while True:
+            task = self._tasks.get()
+            if task is None:
+                return
+            future, method, args, kwargs = task
+            if not future.set_running_or_notify_cancel():
+                continue
+            start = time.monotonic()
+            try:
+                result = getattr(session.client, method)(*args, **kwargs)
+            except Exception as e:
+                session.errors += 1
+                future.set_exception(e)
+            else:
+                future.set_result(result)
+            session.commands += 1
+            session.busy_time += time.monotonic() - start
+
+    def submit(self, method, *args, **kwargs):
+        """queue the BaseClient command ``method``, return a Future"""
+        if method not in READ_ONLY_COMMANDS:
+            raise ValueError("{} is not a read-only command".format(method))
+        if not self._workers:
+            raise NotLogged()
+        future = Future()
+        with self._lock:
+            self.submitted += 1
+        self._tasks.put((future, method, args, kwargs))
+        return future
+
+    def map(self, method, args_list):
+        """run method for every tuple of args, return results in order"""
+        futures = [self.submit(method, *args) for args in args_list]
+        return [future.result() for future in futures]
+
+    def stats(self):
+        """pool utilization, busy time over available session time"""
+        elapsed = time.monotonic() - self._started_at \
+            if self._started_at else 0.0
+        busy = sum(x.busy_time for x in self.sessions)
+        return {
+            'sessions': len(self.sessions),
+            'submitted': self.submitted,
+            'completed': sum(x.commands for x in self.sessions),
+            'errors': sum(x.errors for x in self.sessions),
+            'queued': self._tasks.qsize(),
+            'utilization': busy / (elapsed * len(self.sessions))
+            if elapsed and self.sessions else 0.0,
+            'per_session': [{'commands': x.commands, 'errors': x.errors,
+                             'busy_time': x.busy_time}
+                            for x in self.sessions],
+        }
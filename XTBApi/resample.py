@@ -0,0 +1,182 @@
+# -*- coding utf-8 -*-
+
+"""
+XTBApi.resample
+~~~~~~~
+
+Candles of coarser periods built from finer ones, on whole arrays or bar
+by bar as the base candles close, so that one period per symbol needs to
+be fetched. Requires numpy.
+"""
+
+import logging
+
+import numpy as np
+
+from XTBApi.candles import CANDLE_DTYPE
+from XTBApi.hours import DAY, WEEK, week_seconds
+
+LOGGER = logging.getLogger('XTBApi.resample')
+MINUTE_MS = 60000
+WEEK_PERIOD = WEEK // 60
+MONTH_PERIOD = 43200
+
+
+def _check(base, period):
+    if period < base or (period < WEEK_PERIOD and period % base) or \
+            base > DAY // 60:
+        raise ValueError("period {} can't be built from {}".format(period,
+                                                                   base))
+
+
+def bar_starts(ctms, period, utc_offset=0):
+    """open time, in ms, of the bars of ``period`` minutes holding ctms
+
+    bars up to a day are aligned on the server local time, given by its
+    ``utc_offset`` in seconds, weeks start on monday and months on the
+    first day"""
+    ctms = np.asarray(ctms, 'i8')
+    offset = utc_offset * 1000
+    if period >= MONTH_PERIOD:
+        local = (ctms + offset).astype('M8[ms]')
+        return local.astype('M8[M]').astype('M8[ms]').astype('i8') - offset
+    if period >= WEEK_PERIOD:
+        return ctms - week_seconds((ctms + offset) // 1000) * 1000 - \
+            (ctms + offset) % 1000
+    return ctms - (ctms + offset) % (period * MINUTE_MS)
+
+
+def bar_end(start, period, utc_offset=0):
+    """close time, in ms, of the bar opened at start"""
+    if period >= MONTH_PERIOD:
+        local = np.datetime64(start + utc_offset * 1000, 'ms')
+        month = local.astype('M8[M]') + 1
+        return int(month.astype('M8[ms]').astype('i8')) - utc_offset * 1000
+    return start + period * MINUTE_MS
+
+
+def resample(candles, period, utc_offset=0):
+    """candles of ``period`` minutes from a sorted CANDLE_DTYPE array of a
+    finer period, bars with no candle, out of the trading sessions, are
+    skipped"""
+    candles = np.asarray(candles, CANDLE_DTYPE)
+    if not len(candles):
+        return np.empty(0, CANDLE_DTYPE)
+    starts = bar_starts(candles['ctm'], period, utc_offset)
+    first = np.flatnonzero(np.r_[True, starts[1:] != starts[:-1]])
+    last = np.r_[first[1:], len(candles)] - 1
+    bars = np.empty(len(first), CANDLE_DTYPE)
+    bars['ctm'] = starts[first]
+    bars['open'] = candles['open'][first]
+    bars['high'] = np.maximum.reduceat(candles['high'], first)
+    bars['low'] = np.minimum.reduceat(candles['low'], first)
+    bars['close'] = candles['close'][last]
+    bars['vol'] = np.add.reduceat(candles['vol'], first)
+    return bars
+
+
+class Resampler(object):
+    """incremental resampling of the closed ``base`` candles of a symbol
+    into ``periods``, every new candle updates each period in O(1)
+
+    ``on_bar(symbol, period, bars)`` is called with every completed bar,
+    as a one candle array so that CandleStore.append can be used. A bar
+    is completed by its last base candle or, if ``schedule`` is the
+    TradingSchedule of the symbol, by the last one before the session
+    closes, else by the first candle of the next bar::
+
+        schedule = client.trading_calendar.schedule('EURUSD')
+        offset = client.trading_calendar.sync_server_time()
+        resampler = Resampler('EURUSD', [PERIOD.ONE_HOUR, PERIOD.ONE_DAY],
+                              on_bar=store.append, utc_offset=offset,
+                              schedule=schedule)
+        resampler.update(candle)
+    """
+
+    def __init__(self, symbol, periods, base=1, on_bar=None, utc_offset=0,
+                 schedule=None):
+        self.symbol = symbol
+        self.base = getattr(base, 'value', base)
+        self.periods = [getattr(period, 'value', period)
+                        for period in periods]
+        for period in self.periods:
+            _check(self.base, period)
+        self.on_bar = on_bar
+        self.utc_offset = utc_offset
+        self.schedule = schedule
+        self.last_ctm = None
+        # period -> [start, end, open, high, low, close, vol]
+        self._bars = {}
+
+    def _emit(self, period, bar):
+        if self.on_bar is not None:
+            candle = np.array([(bar[0],) + tuple(bar[2:])], CANDLE_DTYPE)
+            self.on_bar(self.symbol, period, candle)
+
+    def _trades_until(self, start, end):
+        """True if a session may still trade between start and end, ms"""
+        if end <= start:
+            return False
+        if self.schedule is None or end - start >= WEEK * 1000:
+            return True
+        seconds = week_seconds((start // 1000) + self.utc_offset)
+        return self.schedule.overlaps(seconds,
+                                      seconds + (end - start) // 1000)
+
+    def update(self, candle):
+        """add a closed base candle, a CANDLE_DTYPE record or a
+        (ctm, open, high, low, close, vol) tuple, return the number of
+        bars completed"""
+        ctm, open_, high, low, close, vol = (
+            int(candle[0]), float(candle[1]), float(candle[2]),
+            float(candle[3]), float(candle[4]), float(candle[5]))
+        if self.last_ctm is not None and ctm <= self.last_ctm:
+            LOGGER.debug("ignored %s candle at %d", self.symbol, ctm)
+            return 0
+        self.last_ctm = ctm
+        closed_at = ctm + self.base * MINUTE_MS
+        completed = 0
+        for period in self.periods:
+            bar = self._bars.get(period)
+            if bar is not None and ctm >= bar[1]:
+                self._emit(period, bar)
+                completed += 1
+                bar = None
+            if bar is None:
+                start = int(bar_starts(ctm, period, self.utc_offset))
+                bar = [start, bar_end(start, period, self.utc_offset),
+                       open_, high, low, close, vol]
+            else:
+                if high > bar[3]:
+                    bar[3] = high
+                if low < bar[4]:
+                    bar[4] = low
+                bar[5] = close
+                bar[6] += vol
+            if not self._trades_until(closed_at, bar[1]):
+                self._emit(period, bar)
+                completed += 1
+                bar = None
+            self._bars[period] = bar
+        return completed
+
+    def feed(self, candles):
+        """update with every candle of a sorted CANDLE_DTYPE array"""
+        completed = 0
+        for candle in candles.tolist():
+            completed += self.update(candle)
+        return completed
+
+    def current(self, period):
+        """bar of period being built, None if none"""
+        bar = self._bars.get(getattr(period, 'value', period))
+        if bar is None:
+            return None
+        return np.array((bar[0],) + tuple(bar[2:]), CANDLE_DTYPE)
+
+    def flush(self):
+        """complete the bars being built, e.g. at the end of a history"""
+        for period in self.periods:
+            bar = self._bars.pop(period, None)
+            if bar is not None:
+                self._emit(period, bar)
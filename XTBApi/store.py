@@ -0,0 +1,134 @@
+# -*- coding utf-8 -*-
+
+"""
+XTBApi.store
+~~~~~~~
+
+Append-only on disk candle store, one file of CANDLE_DTYPE records per
+symbol and period, read back with memory maps. Requires numpy.
+"""
+
+import logging
+import os
+import time
+
+import numpy as np
+
+from XTBApi.candles import CANDLE_DTYPE, decode_rate_infos
+
+try:
+    import fcntl
+except ImportError:  # not on posix
+    fcntl = None
+
+LOGGER = logging.getLogger('XTBApi.store')
+EXTENSION = '.candles'
+
+
+class _FileLock(object):
+    """advisory lock so that processes sharing the store append in turn"""
+
+    def __init__(self, fileobj):
+        self.fileobj = fileobj
+
+    def __enter__(self):
+        if fcntl is not None:
+            fcntl.flock(self.fileobj, fcntl.LOCK_EX)
+
+    def __exit__(self, *args):
+        if fcntl is not None:
+            fcntl.flock(self.fileobj, fcntl.LOCK_UN)
+
+
+class CandleStore(object):
+    """candles of (symbol, period) stored in ``path``, period in minutes
+    as PERIOD values
+
+    reads return views on the memory map of the file, so processes using
+    the same path share one copy of the history"""
+
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        self._maps = {}
+
+    def _file(self, symbol, period):
+        return os.path.join(self.path, "{}_{}{}".format(symbol, period,
+                                                       EXTENSION))
+
+    def keys(self):
+        """(symbol, period) stored"""
+        keys = []
+        for name in sorted(os.listdir(self.path)):
+            if name.endswith(EXTENSION):
+                symbol, period = name[:-len(EXTENSION)].rsplit('_', 1)
+                keys.append((symbol, int(period)))
+        return keys
+
+    def _map(self, symbol, period):
+        filename = self._file(symbol, period)
+        try:
+            size = os.path.getsize(filename)
+        except OSError:
+            size = 0
+        # ignore a trailing partial record left by a crash while appending
+        count = size // CANDLE_DTYPE.itemsize
+        cached = self._maps.get((symbol, period))
+        if cached is not None and len(cached) == count:
+            return cached
+        if not count:
+            return np.empty(0, CANDLE_DTYPE)
+        candles = np.memmap(filename, CANDLE_DTYPE, 'r', shape=(count,))
+        self._maps[(symbol, period)] = candles
+        return candles
+
+    def read(self, symbol, period, start=None, end=None):
+        """candles with start <= ctm < end, ctm in ms, without copies"""
+        candles = self._map(symbol, period)
+        ctm = candles['ctm']
+        lo = 0 if start is None else np.searchsorted(ctm, start, 'left')
+        hi = len(candles) if end is None else \
+            np.searchsorted(ctm, end, 'left')
+        return candles[lo:hi]
+
+    def last_ctm(self, symbol, period):
+        """ctm of the last stored candle, None if empty"""
+        candles = self._map(symbol, period)
+        return int(candles['ctm'][-1]) if len(candles) else None
+
+    def append(self, symbol, period, candles):
+        """append candles newer than the last stored, return the number
+        of candles written"""
+        candles = np.asarray(candles, CANDLE_DTYPE)
+        with open(self._file(symbol, period), 'ab') as fileobj:
+            with _FileLock(fileobj):
+                size = fileobj.seek(0, os.SEEK_END)
+                partial = size % CANDLE_DTYPE.itemsize
+                if partial:
+                    fileobj.truncate(size - partial)
+                    fileobj.seek(0, os.SEEK_END)
+                last = self.last_ctm(symbol, period)
+                if last is not None:
+                    candles = candles[candles['ctm'] > last]
+                fileobj.write(candles.tobytes())
+        LOGGER.debug("stored %d candles of %s %s", len(candles), symbol,
+                     period)
+        return len(candles)
+
+    def sync(self, client, symbol, period, start=None):
+        """fetch and append the closed candles after the last stored one
+
+        :param start: unix timestamp to start from when nothing is stored
+        """
+        last = self.last_ctm(symbol, period)
+        if last is not None:
+            start = last // 1000 + period * 60
+        elif start is None:
+            raise ValueError("start is needed to sync an empty store")
+        now = int(time.time())
+        res = client.get_chart_range_request(symbol, period, int(start), now,
+                                             0)
+        candles = decode_rate_infos(res)
+        # the last candle is still open
+        closed = candles['ctm'] + period * 60 * 1000 <= now * 1000
+        return self.append(symbol, period, candles[closed])
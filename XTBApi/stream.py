@@ -0,0 +1,290 @@
+# -*- coding utf-8 -*-
+
+"""
+XTBApi.stream
+~~~~~~~
+
+Streaming client, server pushes ticks, candles, trades, balance, profits
+and trade statuses on the session opened by login
+"""
+
+import logging
+import queue
+import threading
+
+from XTBApi.api import WS_URL, _connection_closed, _create_connection
+from XTBApi.codec import get_codec
+from XTBApi.exceptions import *
+
+LOGGER = logging.getLogger('XTBApi.stream')
+PING_INTERVAL = 30
+RECONNECT_ATTEMPTS = 3
+EVENTS = ('tickPrices', 'candle', 'trade', 'balance', 'profit',
+          'tradeStatus', 'keepAlive', 'news')
+
+
+def _get_stream_data(command, **parameters):
+    data = {"command": command}
+    data.update(parameters)
+    return data
+
+
+class StreamClient(object):
+    """client of the streaming socket
+
+    events are delivered to the callbacks registered with ``on`` and, if
+    ``queue_size`` is given, can be consumed iterating the client::
+
+        stream = StreamClient.from_client(client, queue_size=1000)
+        stream.connect()
+        stream.subscribe_ticks('EURUSD')
+        for event, data in stream:
+            ...
+
+    :param queue_size: max events kept for the iterator, the oldest are
+        dropped when full, 0 to disable the iterator
+    :param codec: name of the json codec in XTBApi.codec
+    """
+
+    def __init__(self, stream_session_id, mode='demo', url=WS_URL,
+                 queue_size=0, ping_interval=PING_INTERVAL, codec=None):
+        self.stream_session_id = stream_session_id
+        self.codec = get_codec(codec)
+        self.mode = mode
+        self.url = url
+        self.ping_interval = ping_interval
+        self.ws = None
+        self.events = queue.Queue(queue_size) if queue_size else None
+        self._callbacks = {}
+        self._subscriptions = {}
+        self._send_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._reader = None
+        self._pinger = None
+        self._client = None
+        LOGGER.debug("StreamClient inited")
+
+    @classmethod
+    def from_client(cls, client, **kwargs):
+        """stream on the session of a logged client, moved to the new
+        session when the client swaps it while connected"""
+        if client.stream_session_id is None:
+            raise NotLogged()
+        kwargs.setdefault('codec', client.codec.name)
+        stream = cls(client.stream_session_id, client.mode, client.url,
+                     **kwargs)
+        stream._client = client
+        return stream
+
+    def __enter__(self):
+        return self.connect()
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __iter__(self):
+        if self.events is None:
+            raise ValueError("queue_size is needed to iterate events")
+        while True:
+            item = self.events.get()
+            if item is None:
+                return
+            yield item
+
+    def connect(self):
+        """open the socket and start the reader and the keep alive"""
+        self._stop.clear()
+        self._open()
+        self._reader = threading.Thread(target=self._read_loop, daemon=True)
+        self._reader.start()
+        self._pinger = threading.Thread(target=self._ping_loop, daemon=True)
+        self._pinger.start()
+        self.subscribe_keep_alive()
+        if self._client is not None:
+            self._client.on_session_swap(self.set_session)
+        return self
+
+    def close(self):
+        if self._client is not None and \
+                self.set_session in self._client._session_callbacks:
+            self._client.remove_session_callback(self.set_session)
+        self._stop.set()
+        if self.ws is not None:
+            self.ws.close()
+        if self._reader is not None and \
+                self._reader is not threading.current_thread():
+            self._reader.join(1)
+        LOGGER.debug("stream closed")
+
+    def _open(self):
+        self.ws = _create_connection(self.url.format(mode=self.mode +
+                                                     'Stream'))
+
+    def _send(self, data):
+        data = dict(data, streamSessionId=self.stream_session_id)
+        with self._send_lock:
+            try:
+                self.ws.send(self.codec.dumps(data))
+            except (_connection_closed(), OSError):
+                raise SocketError()
+
+    def set_session(self, stream_session_id):
+        """move the subscriptions to another session"""
+        self.stream_session_id = stream_session_id
+        try:
+            for data in list(self._subscriptions.values()):
+                self._send(data)
+        except SocketError:
+            # the reader reconnects and subscribes on the new session
+            LOGGER.debug("resubscription failed")
+        LOGGER.info("stream moved to a new session")
+
+    def _reconnect(self):
+        for attempt in range(RECONNECT_ATTEMPTS):
+            if self._stop.wait(attempt):
+                return False
+            try:
+                self._open()
+                for data in list(self._subscriptions.values()):
+                    self._send(data)
+                LOGGER.info("stream reconnected")
+                return True
+            except (SocketError, OSError) as e:
+                LOGGER.warning("stream reconnection failed: %s", e)
+        return False
+
+    def _read_loop(self):
+        while not self._stop.is_set():
+            try:
+                message = self.ws.recv()
+            except (_connection_closed(), OSError):
+                message = None
+            if not message:
+                if self._stop.is_set() or not self._reconnect():
+                    break
+                continue
+            try:
+                res = self.codec.loads(message)
+            except ValueError:
+                LOGGER.warning("message not decoded: %.200s", message)
+                continue
+            event = res.get('command') if isinstance(res, dict) else None
+            if event not in EVENTS:
+                LOGGER.warning("unknown message: %.200s", message)
+                continue
+            self._dispatch(event, res.get('data'))
+        self._stop.set()
+        if self.events is not None:
+            self._put(None)
+
+    def _ping_loop(self):
+        while not self._stop.wait(self.ping_interval):
+            try:
+                self._send(_get_stream_data("ping"))
+            except SocketError:
+                LOGGER.debug("ping failed")
+
+    def _put(self, item):
+        while True:
+            try:
+                self.events.put_nowait(item)
+                return
+            except queue.Full:
+                try:
+                    self.events.get_nowait()
+                except queue.Empty:
+                    pass
+
+    def _dispatch(self, event, data):
+        for callback in self._callbacks.get(event, ()):
+            try:
+                callback(data)
+            except Exception:
+                LOGGER.exception("callback of %s failed", event)
+        if self.events is not None:
+            self._put((event, data))
+
+    # - callbacks -
+    def on(self, event, callback):
+        """call callback(data) on every event of type ``event``"""
+        if event not in EVENTS:
+            raise ValueError("event must be in {}".format(EVENTS))
+        self._callbacks.setdefault(event, []).append(callback)
+
+    def remove_callback(self, event, callback):
+        self._callbacks.get(event, []).remove(callback)
+
+    # - subscriptions -
+    def _subscribe(self, key, data):
+        self._subscriptions[key] = data
+        self._send(data)
+
+    def _unsubscribe(self, key, data):
+        self._subscriptions.pop(key, None)
+        self._send(data)
+
+    def subscribe_ticks(self, symbol, min_arrival_time=0, max_level=None):
+        """getTickPrices stream command"""
+        params = {'symbol': symbol, 'minArrivalTime': min_arrival_time}
+        if max_level is not None:
+            params['maxLevel'] = max_level
+        self._subscribe(('ticks', symbol),
+                        _get_stream_data("getTickPrices", **params))
+        LOGGER.info("STREAM: subscribed ticks of %s", symbol)
+
+    def unsubscribe_ticks(self, symbol):
+        """stopTickPrices stream command"""
+        self._unsubscribe(('ticks', symbol),
+                          _get_stream_data("stopTickPrices", symbol=symbol))
+
+    def subscribe_candles(self, symbol):
+        """getCandles stream command"""
+        self._subscribe(('candles', symbol),
+                        _get_stream_data("getCandles", symbol=symbol))
+        LOGGER.info("STREAM: subscribed candles of %s", symbol)
+
+    def unsubscribe_candles(self, symbol):
+        """stopCandles stream command"""
+        self._unsubscribe(('candles', symbol),
+                          _get_stream_data("stopCandles", symbol=symbol))
+
+    def subscribe_trades(self):
+        """getTrades stream command"""
+        self._subscribe('trades', _get_stream_data("getTrades"))
+
+    def unsubscribe_trades(self):
+        """stopTrades stream command"""
+        self._unsubscribe('trades', _get_stream_data("stopTrades"))
+
+    def subscribe_balance(self):
+        """getBalance stream command"""
+        self._subscribe('balance', _get_stream_data("getBalance"))
+
+    def unsubscribe_balance(self):
+        """stopBalance stream command"""
+        self._unsubscribe('balance', _get_stream_data("stopBalance"))
+
+    def subscribe_profits(self):
+        """getProfits stream command"""
+        self._subscribe('profits', _get_stream_data("getProfits"))
+
+    def unsubscribe_profits(self):
+        """stopProfits stream command"""
+        self._unsubscribe('profits', _get_stream_data("stopProfits"))
+
+    def subscribe_trade_status(self):
+        """getTradeStatus stream command"""
+        self._subscribe('trade_status', _get_stream_data("getTradeStatus"))
+
+    def unsubscribe_trade_status(self):
+        """stopTradeStatus stream command"""
+        self._unsubscribe('trade_status',
+                          _get_stream_data("stopTradeStatus"))
+
+    def subscribe_keep_alive(self):
+        """getKeepAlive stream command"""
+        self._subscribe('keep_alive', _get_stream_data("getKeepAlive"))
+
+    def unsubscribe_keep_alive(self):
+        """stopKeepAlive stream command"""
+        self._unsubscribe('keep_alive', _get_stream_data("stopKeepAlive"))
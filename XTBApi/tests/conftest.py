@@ -0,0 +1,25 @@
+"""
+tests.conftest.py
+~~~~~~~
+
+fixtures shared by the offline tests
+"""
+
+import pytest
+
+from XTBApi import api
+from XTBApi.limiter import RateLimiter
+from XTBApi.mock import MockServer
+
+
+@pytest.fixture
+def mock_server():
+    with MockServer(n_trades=3, n_history=20) as server:
+        yield server
+
+
+@pytest.fixture
+def mock_client(mock_server):
+    client = api.Client(mock_server.url, RateLimiter(None))
+    client.login('user', 'password')
+    yield client
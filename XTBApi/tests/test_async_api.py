@@ -0,0 +1,112 @@
+"""
+tests.test_async_api.py
+~~~~~~~
+
+test the asyncio clients against the mock server
+"""
+
+import asyncio
+import logging
+import time
+from datetime import datetime, timezone
+
+import pytest
+
+pytest.importorskip('websockets')
+
+from XTBApi.async_api import AsyncClient
+from XTBApi.exceptions import CommandFailed
+from XTBApi.limiter import RateLimiter
+from XTBApi.mock import MockServer
+
+LOGGER = logging.getLogger('XTBApi.test_async_api')
+DEFAULT_CURRENCY = 'EURUSD'
+MONDAY = datetime(2024, 1, 1, tzinfo=timezone.utc).timestamp()
+
+
+def test_pipelined_requests():
+    async def run(url):
+        client = AsyncClient(url, RateLimiter(None))
+        await client.login('user', 'password')
+        start = time.time()
+        results = await asyncio.gather(
+            client.get_chart_range_request(DEFAULT_CURRENCY, 1, 0, 0, 10),
+            client.get_symbol(DEFAULT_CURRENCY),
+            client.get_symbol('GBPUSD'),
+            client.get_version())
+        elapsed = time.time() - start
+        await client.logout()
+        return results, elapsed
+
+    latency = {'getChartRangeRequest': 0.5, 'getSymbol': 0.1}
+    with MockServer(latency=latency, concurrent=True) as server:
+        results, elapsed = asyncio.run(run(server.url))
+    chart, eurusd, gbpusd, version = results
+    assert len(chart['rateInfos']) == 10
+    assert eurusd['symbol'] == DEFAULT_CURRENCY
+    assert gbpusd['symbol'] == 'GBPUSD'
+    assert version == {'version': '2.5.0'}
+    assert elapsed < 0.55
+
+
+def test_trades_and_errors():
+    async def run(server):
+        client = AsyncClient(server.url, RateLimiter(None))
+        await client.login('user', 'password')
+        await client.open_trade('buy', DEFAULT_CURRENCY, 0.1)
+        assert len(await client.update_trades()) == 3
+        await client.close_all_trades()
+        assert await client.update_trades() == {}
+        server.errors['getSymbol'] = 'BE115'
+        with pytest.raises(CommandFailed):
+            await client.get_symbol(DEFAULT_CURRENCY)
+        assert server.commands['login'] == 1
+        server.drop_connections()
+        assert await client.get_version() == {'version': '2.5.0'}
+        await client.logout()
+
+    with MockServer(n_trades=2, concurrent=True) as server:
+        asyncio.run(run(server))
+
+
+def test_sync_only_methods():
+    client = AsyncClient('ws://localhost', RateLimiter(None))
+    with pytest.raises(NotImplementedError):
+        client.refresh_session()
+    with pytest.raises(NotImplementedError):
+        client.iter_trades_history(0)
+
+
+def test_market_open_from_calendar():
+    async def run(server):
+        client = AsyncClient(server.url, RateLimiter(None))
+        await client.login('user', 'password')
+        symbols = list(server.symbols)
+        opened = await client.check_if_market_open(symbols, MONDAY + 3600)
+        assert all(opened.values()) and len(opened) == len(symbols)
+        closed = await client.check_if_market_open(symbols, MONDAY - 3600)
+        assert not any(closed.values())
+        await client.logout()
+
+    with MockServer(concurrent=True) as server:
+        asyncio.run(run(server))
+        assert server.commands['getTradingHours'] == 1
+        assert server.commands['getServerTime'] == 1
+
+
+def test_lastn_candle_history():
+    async def run(server):
+        client = AsyncClient(server.url, RateLimiter(None))
+        await client.login('user', 'password')
+        candles = await client.get_lastn_candle_history(DEFAULT_CURRENCY,
+                                                        3600, 50)
+        await client.logout()
+        return candles
+
+    with MockServer(concurrent=True) as server:
+        candles = asyncio.run(run(server))
+        assert server.commands['getChartLastRequest'] == 1
+        assert 'getChartRangeRequest' not in server.commands
+    assert len(candles) == 50
+    assert all(a['timestamp'] < b['timestamp']
+               for a, b in zip(candles, candles[1:]))
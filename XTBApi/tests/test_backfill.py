@@ -0,0 +1,86 @@
+"""
+tests.test_backfill.py
+~~~~~~~
+
+test the history backfill against the mock server
+"""
+
+import time
+
+import pytest
+
+np = pytest.importorskip('numpy')
+
+from XTBApi.api import PERIOD, BaseClient
+from XTBApi.backfill import BackfillJob, history_start
+from XTBApi.limiter import RateLimiter
+from XTBApi.pool import SessionPool
+from XTBApi.store import CandleStore
+
+SYMBOLS = ['EURUSD', 'GBPUSD']
+END = int(time.time()) // 3600 * 3600 - 3600 * 24 * 20
+START = END - 3600 * 24 * 10
+
+
+def test_history_start():
+    assert history_start(PERIOD.ONE_MINUTE.value, 0) == -31 * 86400
+    assert history_start(PERIOD.ONE_DAY.value) is None
+
+
+def test_resume_after_failure(tmp_path, mock_server, mock_client):
+    store = CandleStore(str(tmp_path / 'store'))
+    checkpoint = str(tmp_path / 'checkpoint.json')
+
+    def fail_after_two(progress):
+        if progress['delivered'] == 2:
+            mock_server.errors['getChartRangeRequest'] = 'EX001'
+
+    job = BackfillJob(SYMBOLS, [PERIOD.ONE_HOUR], START, END, store.append,
+                      checkpoint, chunk_candles=50,
+                      on_progress=fail_after_two)
+    assert len(job.chunks) == 10
+    progress = job.run(mock_client)
+    assert progress['delivered'] == 2 and progress['failed'] == 2
+    # one failure per key, the later chunks are not fetched
+    assert progress['skipped'] == 6
+    assert mock_server.commands['getChartRangeRequest'] == 4
+    del mock_server.errors['getChartRangeRequest']
+    resumed = BackfillJob(SYMBOLS, [PERIOD.ONE_HOUR], START, END,
+                          store.append, checkpoint, chunk_candles=50)
+    assert len(resumed.chunks) == 8
+    progress = resumed.run(mock_client)
+    assert progress['delivered'] == 8 and progress['failed'] == 0
+    assert progress['candles_per_sec'] > 0 and progress['eta'] == 0
+    for symbol in SYMBOLS:
+        ctms = store.read(symbol, 60)['ctm']
+        assert np.all(np.diff(ctms) > 0)
+        assert ctms[0] >= START * 1000 and ctms[-1] < END * 1000
+    assert BackfillJob(SYMBOLS, [60], START, END, store.append,
+                       checkpoint, chunk_candles=50).chunks == []
+
+
+def test_parallel_delivery_in_order(tmp_path, mock_server):
+    store = CandleStore(str(tmp_path))
+    job = BackfillJob(SYMBOLS, [PERIOD.ONE_HOUR, PERIOD.FOUR_HOURS], START,
+                      END, store.append, chunk_candles=20)
+    with SessionPool('user', 'password', size=3, client_factory=lambda:
+                     BaseClient(mock_server.url, RateLimiter(None))) as pool:
+        progress = job.run(pool)
+    assert progress['failed'] == progress['skipped'] == 0
+    assert progress['delivered'] == progress['chunks'] == len(job.chunks)
+    assert sum(len(store.read(*key)) for key in store.keys()) == \
+        progress['candles']
+
+
+def test_parallel_failure_drops_the_key(tmp_path, mock_server):
+    delivered = []
+    job = BackfillJob(['EURUSD'], [PERIOD.ONE_HOUR], START, END,
+                      lambda *args: delivered.append(args), chunk_candles=10)
+    mock_server.errors['getChartRangeRequest'] = 'EX001'
+    mock_server.latency = 0.02
+    with SessionPool('user', 'password', size=2, client_factory=lambda:
+                     BaseClient(mock_server.url, RateLimiter(None))) as pool:
+        progress = job.run(pool)
+    assert delivered == [] and progress['delivered'] == 0
+    assert progress['failed'] + progress['skipped'] == len(job.chunks)
+    assert progress['skipped'] > 0 and job._ready == {}
@@ -0,0 +1,126 @@
+"""
+tests.test_backtest.py
+~~~~~~~
+
+test the simulated client against the vectorized simulation
+"""
+
+import pytest
+
+np = pytest.importorskip('numpy')
+from XTBApi.backtest import BacktestClient, simulate
+from XTBApi.candles import CANDLE_DTYPE
+from XTBApi.history import iter_trades_history
+from XTBApi.mock import _symbol_record
+from XTBApi.ticks import TICK_DTYPE
+
+DEFAULT_CURRENCY = 'EURUSD'
+START = 1709164800000
+
+
+def _candles(n, seed=0):
+    closes = 1.1 + np.cumsum(np.random.default_rng(seed).normal(
+        0, 0.0002, n))
+    candles = np.zeros(n, CANDLE_DTYPE)
+    candles['ctm'] = START + np.arange(n) * 60000
+    candles['open'] = np.r_[closes[0], closes[:-1]]
+    candles['close'] = closes
+    candles['high'] = np.maximum(candles['open'], closes) + 0.0001
+    candles['low'] = np.minimum(candles['open'], closes) - 0.0001
+    candles['vol'] = 1.0
+    return candles
+
+
+def _signal(closes, volume=0.1):
+    mean = np.convolve(closes, np.ones(20) / 20)[:len(closes)]
+    positions = np.where(closes > mean, volume, -volume)
+    positions[:20] = 0.0
+    positions[-1] = 0.0
+    return positions
+
+
+def _follow(client, symbol, positions):
+    """open and close trades to hold positions[step]"""
+    def strategy(client):
+        target = positions[client.index]
+        held = sum(x.volume if x.mode == 'buy' else -x.volume
+                   for x in client.trade_rec.values())
+        if target != held:
+            client.close_all_trades()
+            if target:
+                client.open_trade('buy' if target > 0 else 'sell', symbol,
+                                  abs(target))
+    return strategy
+
+
+@pytest.mark.parametrize('commission', [0.0, 3.5])
+def test_event_mode_matches_vectorized(commission):
+    candles = _candles(2000)
+    spec = _symbol_record(DEFAULT_CURRENCY)
+    positions = _signal(candles['close'])
+    client = BacktestClient({DEFAULT_CURRENCY: candles},
+                            {DEFAULT_CURRENCY: spec}, commission=commission)
+    assert client.run(_follow(client, DEFAULT_CURRENCY, positions)) == 2000
+    result = client.simulate(DEFAULT_CURRENCY, positions)
+    assert client.get_margin_level()['equity'] == pytest.approx(
+        result['equity'][-1])
+    assert client.balance == pytest.approx(
+        client.get_margin_level()['balance'])
+    history = client.get_trades_history(0, 0)
+    assert sum(x['profit'] + x['commission'] for x in history) == \
+        pytest.approx(client.balance - 10000.0)
+    middle = int(client.timeline[1000])
+    assert client.get_trades_history(0, middle) + \
+        client.get_trades_history(middle + 1, 0) == history
+    trades = iter_trades_history(client, int(client.timeline[0]),
+                                 int(client.timeline[-1]))
+    assert [x.order for x in trades] == [x['order'] for x in history]
+    assert not client.step()
+
+
+def test_ticks_and_open_short():
+    ticks = np.zeros(4, TICK_DTYPE)
+    ticks['timestamp'] = [1000, 2000, 3000, 4000]
+    ticks['bid'] = [1.0, 1.1, 0.9, 1.0]
+    ticks['ask'] = ticks['bid'] + [0.1, 0.2, 0.1, 0.3]
+    spec = dict(_symbol_record(DEFAULT_CURRENCY), contractSize=1)
+    positions = np.array([-1.0, 0.0, 1.0, -1.0])
+    client = BacktestClient({DEFAULT_CURRENCY: ticks},
+                            {DEFAULT_CURRENCY: spec})
+    client.run(_follow(client, DEFAULT_CURRENCY, positions))
+    equity = client.simulate(DEFAULT_CURRENCY, positions)['equity']
+    assert equity[-1] == pytest.approx(
+        client.get_margin_level()['equity'])
+    # sold at 1.0, bought at 1.3, bought at 1.0, sold at 1.0
+    assert equity[-1] == pytest.approx(10000.0 - 0.3 - 0.3)
+    with pytest.raises(ValueError):
+        client.get_lastn_candle_history(DEFAULT_CURRENCY, 60, 1)
+
+
+def test_candle_history_and_market():
+    candles = _candles(600)
+    other = _candles(300)[::2]
+    spec = _symbol_record(DEFAULT_CURRENCY)
+    client = BacktestClient({DEFAULT_CURRENCY: candles, 'GBPUSD': other},
+                            {DEFAULT_CURRENCY: spec, 'GBPUSD': spec})
+    client.run(lambda client: None, steps=301)
+    assert client.now == (START + 301 * 60000) / 1000
+    assert client.check_if_market_open([DEFAULT_CURRENCY, 'GBPUSD']) == {
+        DEFAULT_CURRENCY: True, 'GBPUSD': False}
+    last = client.get_lastn_candle_history(DEFAULT_CURRENCY, 60, 3,
+                                           as_array=True)
+    assert last[-1]['ctm'] == candles[300]['ctm']
+    hours = client.get_lastn_candle_history(DEFAULT_CURRENCY, 3600, 3)
+    assert [x['timestamp'] for x in hours] == [
+        START / 1000 + 3600 * x for x in (3, 4, 5)]
+    assert hours[-1]['close'] == candles[300]['close']
+    assert client.bid('GBPUSD') == other[149]['close']
+    with pytest.raises(ValueError):
+        client.open_trade('buy', DEFAULT_CURRENCY, 1000)
+
+
+def test_simulate_throughput():
+    bids = np.random.default_rng(1).normal(1, 0.01, 1000000)
+    positions = np.sign(bids - 1)
+    result = simulate(bids, positions, 100000, 0.0001)
+    assert len(result['equity']) == len(bids) and result['costs'] > 0
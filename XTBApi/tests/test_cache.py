@@ -0,0 +1,89 @@
+"""
+tests.test_cache.py
+~~~~~~~
+
+test the caches
+"""
+
+import time
+
+from XTBApi.cache import TTLCache
+from XTBApi.stream import StreamClient
+
+DEFAULT_CURRENCY = 'EURUSD'
+
+
+def test_ttl_cache_expiry_and_eviction():
+    cache = TTLCache(0.05, maxsize=2)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    assert cache.get('a') == 1
+    cache.set('c', 3)
+    assert 'b' not in cache
+    assert cache.get('a') == 1
+    time.sleep(0.06)
+    assert cache.get('a') is None
+    assert cache.stats() == {'size': 1, 'hits': 2, 'misses': 1,
+                             'evictions': 1}
+
+
+def test_symbol_specs(mock_server, mock_client):
+    cache = mock_client.symbol_cache
+    assert cache.get_spec(DEFAULT_CURRENCY)['contractSize'] == 100000
+    assert 'bid' not in cache.get_spec(DEFAULT_CURRENCY)
+    assert len(cache.get_all_symbols()) == 50
+    cache.get_all_symbols()
+    cache.get_spec('GBPUSD')
+    assert mock_server.commands['getSymbol'] == 1
+    assert mock_server.commands['getAllSymbols'] == 1
+    assert cache.stats()['round_trips'] == 2
+    cache.invalidate()
+    cache.get_spec(DEFAULT_CURRENCY)
+    assert mock_server.commands['getSymbol'] == 2
+
+
+def test_prices_from_stream(mock_server, mock_client):
+    cache = mock_client.symbol_cache
+    assert cache.get_symbol(DEFAULT_CURRENCY)['bid'] > 0
+    with StreamClient.from_client(mock_client) as stream:
+        cache.attach(stream)
+        stream.subscribe_ticks(DEFAULT_CURRENCY)
+        for _ in range(100):
+            if cache.get_quote(DEFAULT_CURRENCY):
+                break
+            time.sleep(0.01)
+        symbol = cache.get_symbol(DEFAULT_CURRENCY)
+        mock_client.open_trade('sell', DEFAULT_CURRENCY, 0.1)
+    assert symbol['contractSize'] == 100000 and symbol['bid'] > 0
+    assert mock_server.commands['getSymbol'] == 1
+
+
+def test_client_symbols_served_by_cache(mock_server, mock_client):
+    assert len(mock_client.get_all_symbols()) == 50
+    assert mock_client.get_all_symbols()[0]['bid'] > 0
+    assert mock_server.commands['getAllSymbols'] == 2
+    assert 'bid' not in mock_client.get_all_symbols(static=True)[0]
+    assert mock_server.commands['getAllSymbols'] == 2
+    assert mock_client.get_all_symbols(fresh=True)[0]['bid'] > 0
+    assert mock_server.commands['getAllSymbols'] == 3
+    with StreamClient.from_client(mock_client) as stream:
+        mock_client.symbol_cache.attach(stream)
+        stream.subscribe_ticks(DEFAULT_CURRENCY)
+        while mock_client.symbol_cache.get_quote(DEFAULT_CURRENCY) is None:
+            time.sleep(0.01)
+        assert mock_client.get_symbol(DEFAULT_CURRENCY)['bid'] > 0
+        assert 'getSymbol' not in mock_server.commands
+        mock_client.get_symbol(DEFAULT_CURRENCY, fresh=True)
+        assert mock_server.commands['getSymbol'] == 1
+
+
+def test_all_symbols_from_stream_quotes(mock_server, mock_client):
+    cache = mock_client.symbol_cache
+    cache.get_all_symbols()
+    for spec in cache.get_all_symbols():
+        cache.feed_tick({'symbol': spec['symbol'], 'bid': 1.0, 'ask': 1.1,
+                         'high': 1.2, 'low': 0.9, 'spreadRaw': 0.1,
+                         'spreadTable': 1.0, 'timestamp': 0})
+    records = mock_client.get_all_symbols()
+    assert all(x['bid'] == 1.0 for x in records)
+    assert mock_server.commands['getAllSymbols'] == 1
@@ -0,0 +1,57 @@
+"""
+tests.test_calculator.py
+~~~~~~~
+
+test the local trade calculator against the mock server
+"""
+
+import pytest
+
+np = pytest.importorskip('numpy')
+from XTBApi.calculator import (CFD, CFD_LEVERAGED, PROFIT_CFD,
+                               TradeCalculator, margin, profit)
+
+SYMBOLS = ['EURUSD', 'GBPUSD', 'USDJPY']
+
+
+def _scenarios(n=200):
+    rnd = np.random.default_rng(0)
+    volumes = np.round(rnd.uniform(0.01, 5, n), 2)
+    opens = rnd.uniform(0.5, 2.0, n)
+    closes = opens + rnd.normal(0, 0.01, n)
+    modes = rnd.integers(0, 2, n)
+    return modes, volumes, opens, closes
+
+
+@pytest.mark.parametrize('symbol', SYMBOLS)
+def test_matches_server(mock_client, symbol):
+    calculator = TradeCalculator(mock_client)
+    modes, volumes, opens, closes = _scenarios()
+    results = calculator.evaluate(symbol, modes, volumes, opens, closes)
+    assert results['margin'].shape == results['net'].shape == (200,)
+    assert calculator.cross_check(symbol, modes, volumes, opens, closes,
+                                  sample=10, seed=1) == []
+    assert calculator.cross_check(symbol, 'sell', 1.0, 1.1, 1.2) == []
+
+
+def test_conversions(mock_client):
+    calculator = TradeCalculator(mock_client, rates={'EUR': 2.0})
+    eurusd = mock_client.get_symbol('EURUSD')
+    assert calculator.margin('EURUSD', [1.0]) == pytest.approx(
+        [100000 * eurusd['leverage'] / 100 * 2.0])
+    usdjpy = mock_client.get_symbol('USDJPY')
+    assert calculator.rate('JPY') == 1 / usdjpy['ask']
+    assert calculator.account_currency == 'USD'
+    with pytest.raises(ValueError):
+        calculator.rate('XXX')
+
+
+def test_cfd_modes():
+    spec = {'marginMode': CFD_LEVERAGED, 'profitMode': PROFIT_CFD,
+            'contractSize': 25, 'leverage': 5.0}
+    assert margin(spec, [1.0, 2.0], 15000.0).tolist() == [18750.0, 37500.0]
+    assert margin(dict(spec, marginMode=CFD), 1.0, 100.0, 0.5) == 1250.0
+    with pytest.raises(ValueError):
+        margin(spec, 1.0)
+    assert profit(spec, ['buy', 'sell'], 2.0, 15000.0,
+                  15010.0).tolist() == [500.0, -500.0]
@@ -0,0 +1,37 @@
+"""
+tests.test_candles.py
+~~~~~~~
+
+test the columnar candle decoding
+"""
+
+import pytest
+
+from XTBApi.api import _format_candles
+
+np = pytest.importorskip('numpy')
+from XTBApi.candles import decode_rate_infos, to_columns, to_dicts
+
+DEFAULT_CURRENCY = 'EURUSD'
+
+
+def test_decode_matches_dicts(mock_client):
+    res = mock_client.get_chart_range_request(DEFAULT_CURRENCY, 1, 0, 0, 500)
+    candles = decode_rate_infos(res)
+    assert len(candles) == 500
+    assert to_dicts(candles) == _format_candles(res)
+    columns = to_columns(candles)
+    assert np.all(columns['high'] >= columns['low'])
+    assert columns['ctm'].dtype == np.int64
+
+
+def test_decode_empty():
+    candles = decode_rate_infos({'digits': 5, 'rateInfos': []})
+    assert len(candles) == 0
+
+
+def test_lastn_as_array(mock_client):
+    candles = mock_client.get_lastn_candle_history(DEFAULT_CURRENCY, 3600,
+                                                   10, as_array=True)
+    assert len(candles) == 10
+    assert np.all(np.diff(candles['ctm']) > 0)
@@ -0,0 +1,63 @@
+"""
+tests.test_codec.py
+~~~~~~~
+
+test the json codecs
+"""
+
+import logging
+
+import pytest
+
+from XTBApi import api
+from XTBApi.benchmark import format_codec_results, run_codec_benchmark
+from XTBApi.codec import available_codecs, get_codec
+from XTBApi.limiter import RateLimiter
+
+DEFAULT_CURRENCY = 'EURUSD'
+
+
+@pytest.mark.parametrize('name', available_codecs())
+def test_round_trip(name):
+    codec = get_codec(name)
+    data = {'command': 'getSymbol', 'arguments': {'symbol': 'EURUSD'},
+            'price': 1.12345, 'list': [1, None, True]}
+    message = codec.dumps(data)
+    assert codec.loads(message) == data
+    if isinstance(message, str):
+        message = message.encode()
+    assert codec.loads(message) == data
+
+
+def test_default_codec():
+    assert get_codec().name == available_codecs()[0]
+    assert 'json' in available_codecs()
+    with pytest.raises(ValueError):
+        get_codec('pickle')
+
+
+@pytest.mark.parametrize('name', available_codecs())
+def test_client_with_codec(mock_server, name):
+    client = api.Client(mock_server.url, RateLimiter(None), codec=name)
+    client.login('user', 'password')
+    assert client.codec.name == name
+    assert client.get_symbol(DEFAULT_CURRENCY)['symbol'] == DEFAULT_CURRENCY
+    assert len(client.get_all_symbols()) == 50
+    client.logout()
+
+
+def test_response_logging_truncated(mock_client, caplog):
+    with caplog.at_level(logging.DEBUG, 'XTBApi.api'):
+        mock_client.get_all_symbols()
+    messages = [record.getMessage() for record in caplog.records
+                if record.msg.startswith('response')]
+    assert messages
+    assert all(len(message) <= len('response: ') + api.LOG_TRUNCATE
+               for message in messages)
+
+
+def test_codec_benchmark():
+    results = run_codec_benchmark(iterations=3, methods=['get_symbol'])
+    assert set(results) == set(available_codecs())
+    assert results['json']['get_symbol']['cpu_per_cmd'] > 0
+    assert 'saved' in format_codec_results(results)
@@ -0,0 +1,54 @@
+"""
+tests.test_history.py
+~~~~~~~
+
+test the windowed trades history
+"""
+
+import time
+
+from XTBApi.history import HOUR_MS, ClosedTrade, HistorySync
+
+
+def _all(mock_client):
+    return mock_client.get_trades_history(1, int(time.time() * 1000))
+
+
+def test_windows_are_deduplicated(mock_client):
+    records = sorted(_all(mock_client), key=lambda x: x['close_time'])
+    assert len(records) == 20
+    # boundaries fall on the close times, one trade an hour
+    start = records[0]['close_time'] - HOUR_MS
+    end = records[-1]['close_time']
+    trades = list(mock_client.iter_trades_history(start, end,
+                                                  window=HOUR_MS))
+    assert [x.order for x in trades] == [x['order'] for x in records]
+    assert isinstance(trades[0], ClosedTrade)
+    assert trades[0].close_time == records[0]['close_time']
+
+
+def test_adaptive_window(mock_client):
+    sent = []
+    get_trades_history = mock_client.get_trades_history
+
+    def spy(start, end):
+        sent.append(end - start)
+        return get_trades_history(start, end)
+    mock_client.get_trades_history = spy
+    start = int(time.time() * 1000) - 30 * HOUR_MS
+    batches = list(mock_client.iter_trades_history(
+        start, window=HOUR_MS, batch_size=3, batches=True))
+    assert sum(map(len, batches)) == 20
+    assert sent[:3] == [HOUR_MS, 2 * HOUR_MS, 4 * HOUR_MS]
+    assert sent[3:6] == [8 * HOUR_MS, 8 * HOUR_MS, 4 * HOUR_MS]
+
+
+def test_incremental_sync(mock_server, mock_client, tmp_path):
+    checkpoint = str(tmp_path / 'sync.json')
+    sync = HistorySync(mock_client, checkpoint)
+    assert sum(len(batch) for batch in sync.sync()) == 20
+    assert list(HistorySync(mock_client, checkpoint).sync()) == []
+    order = mock_client.open_trade('buy', 'EURUSD', 0.1)['order']
+    mock_client.close_trade(order)
+    batches = list(HistorySync(mock_client, checkpoint).sync())
+    assert [x.order for batch in batches for x in batch] == [order]
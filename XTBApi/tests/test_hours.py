@@ -0,0 +1,68 @@
+"""
+tests.test_hours.py
+~~~~~~~
+
+test the trading hours calendar
+"""
+
+from datetime import datetime, timezone
+
+from XTBApi.hours import DAY, TradingSchedule, WEEK, week_seconds
+
+MONDAY = datetime(2024, 1, 1, tzinfo=timezone.utc).timestamp()
+DEFAULT_CURRENCY = 'EURUSD'
+
+
+def _sessions(*days):
+    return [{'day': day, 'fromT': start, 'toT': end}
+            for day, start, end in days]
+
+
+def test_week_seconds():
+    assert week_seconds(MONDAY) == 0
+    assert week_seconds(MONDAY + DAY + 60) == DAY + 60
+
+
+def test_schedule_lookups():
+    schedule = TradingSchedule(_sessions((1, 3600, 7200), (1, 7200, 9000),
+                                         (3, 0, DAY)))
+    assert schedule.starts[:2] == [3600, 2 * DAY]
+    assert not schedule.is_open(0)
+    assert schedule.is_open(3600)
+    assert schedule.is_open(8000)
+    assert not schedule.is_open(9000)
+    assert schedule.next_open(0) == 3600
+    assert schedule.next_open(4000) == 0
+    assert schedule.next_close(4000) == 5000
+    assert schedule.next_open(4 * DAY) == WEEK - 4 * DAY + 3600
+
+
+def test_schedule_over_weekend():
+    schedule = TradingSchedule(_sessions((7, 80000, DAY), (1, 0, 3600)))
+    assert schedule.is_open(WEEK - 10)
+    assert schedule.next_close(WEEK - 10) == 3610
+
+
+def test_calendar(mock_server, mock_client):
+    calendar = mock_client.trading_calendar
+    symbols = list(mock_server.symbols)
+    opened = mock_client.check_if_market_open(symbols, MONDAY + 3600)
+    assert all(opened.values()) and len(opened) == len(symbols)
+    closed = mock_client.check_if_market_open(symbols, MONDAY - 3600)
+    assert not any(closed.values())
+    assert calendar.next_open(DEFAULT_CURRENCY, MONDAY - 3600) == MONDAY
+    assert calendar.next_close(DEFAULT_CURRENCY, MONDAY) == \
+        MONDAY + 5 * DAY
+    assert mock_server.commands['getTradingHours'] == 1
+    assert mock_server.commands['getServerTime'] == 1
+
+
+def test_window_start(mock_client):
+    calendar = mock_client.trading_calendar
+    friday_close = MONDAY - 2 * DAY
+    assert calendar.window_start(DEFAULT_CURRENCY, 3600, 1, MONDAY + 10) == \
+        MONDAY
+    assert calendar.window_start(DEFAULT_CURRENCY, 3600, 3, MONDAY + 10) == \
+        friday_close - 2 * 3600
+    assert calendar.window_start(DEFAULT_CURRENCY, DAY, 2, MONDAY + 10) == \
+        friday_close - DAY
@@ -0,0 +1,51 @@
+"""
+tests.test_import.py
+~~~~~~~
+
+test that importing XTBApi has no side effects
+"""
+
+import logging
+import subprocess
+import sys
+
+import XTBApi
+from XTBApi.benchmark import bench_import
+
+_CHECK_SCRIPT = """
+import logging, sys
+import XTBApi.api, XTBApi.stream, XTBApi.pool
+assert 'websocket' not in sys.modules
+assert 'logging.config' not in sys.modules
+handlers = logging.getLogger('XTBApi').handlers
+assert all(isinstance(h, logging.NullHandler) for h in handlers)
+assert not logging.getLogger().handlers
+"""
+
+
+def test_import_is_lazy():
+    subprocess.check_call([sys.executable, '-c', _CHECK_SCRIPT])
+
+
+def test_configure_logging(tmp_path):
+    logger = logging.getLogger('XTBApi')
+    handlers, level = logger.handlers[:], logger.level
+    filename = str(tmp_path / 'xtbapi.log')
+    try:
+        XTBApi.configure_logging(filename)
+        logging.getLogger('XTBApi.api').debug("logged %s", 'lazily')
+        for handler in logger.handlers:
+            handler.flush()
+        with open(filename) as fileobj:
+            assert 'logged lazily' in fileobj.read()
+    finally:
+        for handler in logger.handlers:
+            handler.close()
+        logger.handlers[:] = handlers
+        logger.setLevel(level)
+
+
+def test_bench_import():
+    res = bench_import('XTBApi', runs=1)
+    assert res['median'] > 0
+    assert res['modules'] > 0
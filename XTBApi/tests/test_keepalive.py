@@ -0,0 +1,98 @@
+"""
+tests.test_keepalive.py
+~~~~~~~
+
+test the background keep alive against the mock server
+"""
+
+import queue
+import time
+
+import pytest
+
+from XTBApi import api
+from XTBApi.keepalive import KeepAlive
+from XTBApi.limiter import RateLimiter
+from XTBApi.mock import MockServer
+from XTBApi.stream import StreamClient
+
+
+def _wait(condition, timeout=3):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+def test_pings_when_idle(mock_server, mock_client):
+    with KeepAlive(mock_client, interval=0.05) as keepalive:
+        assert _wait(lambda: mock_server.commands.get('ping', 0) >= 2)
+    assert keepalive.pings >= 2 and keepalive.failed_pings == 0
+    keepalive = KeepAlive(mock_client, interval=60)
+    mock_client.ping()
+    assert keepalive.check() is None
+
+
+def test_standby_swap_after_disconnect(mock_server, mock_client):
+    keepalive = KeepAlive(mock_client, interval=0.001)
+    old = mock_client.ws
+    mock_server.drop_connections()
+    time.sleep(0.01)
+    assert keepalive.check() == 'refresh'
+    assert mock_client.ws is not old
+    assert mock_client.session_stats['refreshes'] == 1
+    assert keepalive.stats()['failed_pings'] == 1
+    logins = mock_server.commands['login']
+    assert mock_client.get_version() == {'version': '2.5.0'}
+    assert mock_server.commands['login'] == logins
+
+
+def test_refresh_before_max_age(mock_server, mock_client):
+    keepalive = KeepAlive(mock_client, interval=60, max_age=0.05)
+    assert keepalive.check() is None
+    with pytest.raises(ValueError):
+        KeepAlive(mock_client, interval=0)
+    time.sleep(0.06)
+    assert keepalive.check() == 'refresh'
+    assert mock_client.session_age() < 0.05
+    assert mock_client.session_stats['last_refresh_time'] > 0
+
+
+def test_streams_follow_the_swap(mock_server, mock_client):
+    added = queue.Queue()
+    swaps = []
+    mock_client.on_session_swap(swaps.append)
+    with StreamClient.from_client(mock_client) as stream:
+        mock_client.trade_book.attach(stream)
+        mock_client.trade_book.on('added', added.put)
+        stream.subscribe_trades()
+        assert _wait(lambda: mock_server.commands.get('stream.getTrades'))
+        mock_client.refresh_session()
+        assert swaps == [mock_client.stream_session_id]
+        assert stream.stream_session_id == mock_client.stream_session_id
+        assert _wait(lambda: mock_server.commands['stream.getTrades'] == 2)
+        response = mock_client.open_trade('buy', 'EURUSD', 0.1)
+        assert added.get(timeout=2).order_id == response['order']
+    assert mock_client._session_callbacks == [swaps.append]
+
+
+def test_swap_after_idle_close():
+    with MockServer(disconnect_after=1) as server:
+        client = api.Client(server.url, RateLimiter(None))
+        client.login('user', 'password')
+        with KeepAlive(client, interval=0.05) as keepalive:
+            assert _wait(lambda: client.session_stats['refreshes'] >= 1)
+        assert keepalive.failed_pings >= 1
+        assert keepalive._thread is None
+
+
+def test_errors_do_not_stop_the_thread(mock_client):
+    keepalive = KeepAlive(mock_client, interval=0.05)
+    calls = []
+
+    def check():
+        calls.append(1)
+        raise RuntimeError("unexpected")
+    keepalive.check = check
+    with keepalive:
+        assert _wait(lambda: len(calls) >= 2)
@@ -0,0 +1,60 @@
+"""
+tests.test_limiter.py
+~~~~~~~
+
+test the rate limiter
+"""
+
+import time
+
+import pytest
+
+from XTBApi.api import Client
+from XTBApi.limiter import RateLimiter, TokenBucket
+from XTBApi.mock import MockServer
+
+
+def test_token_bucket_burst():
+    bucket = TokenBucket(10, burst=3)
+    assert [bucket.reserve() for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert bucket.reserve() == pytest.approx(0.1, abs=0.01)
+    assert bucket.reserve() == pytest.approx(0.2, abs=0.01)
+
+
+def test_token_bucket_refill():
+    bucket = TokenBucket(100, burst=1)
+    bucket.reserve()
+    time.sleep(0.02)
+    assert bucket.reserve() == 0.0
+
+
+def test_class_budget():
+    limiter = RateLimiter(rate=None, budgets={'trade': (10, 1)})
+    assert limiter.reserve('getSymbol') == 0.0
+    assert limiter.reserve('getSymbol') == 0.0
+    assert limiter.reserve('tradeTransaction') == 0.0
+    assert limiter.reserve('tradeTransactionStatus') > 0.0
+    stats = limiter.stats()
+    assert stats['commands'] == 4
+    assert stats['throttled_commands'] == 1
+    assert set(stats['throttled_by_class']) == {'trade'}
+
+
+def test_shared_account_limiter():
+    limiter = RateLimiter.for_account('shared-user', rate=20)
+    assert RateLimiter.for_account('shared-user') is limiter
+    assert RateLimiter.for_account('other-user') is not limiter
+    first = Client(limiter=limiter)
+    second = Client(limiter=limiter)
+    assert first.limiter is second.limiter
+
+
+def test_close_all_burst():
+    with MockServer(n_trades=5) as server:
+        client = Client(server.url, RateLimiter(20, burst=12))
+        client.login('user', 'password')
+        start = time.time()
+        client.close_all_trades()
+        assert time.time() - start < 0.2
+        assert client.update_trades() == {}
+        assert client.limiter.throttled_time < 0.1
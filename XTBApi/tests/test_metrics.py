@@ -0,0 +1,72 @@
+"""
+tests.test_metrics.py
+~~~~~~~
+
+test the command instrumentation
+"""
+
+import urllib.request
+
+import pytest
+
+from XTBApi import api
+from XTBApi.exceptions import CommandFailed
+from XTBApi.limiter import RateLimiter
+from XTBApi.metrics import Histogram, Metrics, start_http_server
+
+DEFAULT_CURRENCY = 'EURUSD'
+
+
+def test_histogram_percentiles():
+    histogram = Histogram()
+    for micros in range(1, 10001):
+        histogram.record(micros / 1e6)
+    assert histogram.count == 10000
+    assert histogram.percentile(50) == pytest.approx(0.005, rel=0.07)
+    assert histogram.percentile(99) == pytest.approx(0.0099, rel=0.07)
+    assert histogram.percentile(100) == histogram.max == 0.01
+    below, total = histogram.cumulative((0.001, 1.0))
+    assert below == pytest.approx(1000, rel=0.07) and total == 10000
+    other = Histogram()
+    other.record(2.0)
+    histogram.merge(other)
+    assert histogram.max == 2.0 and histogram.count == 10001
+
+
+def test_client_metrics(mock_server):
+    samples = []
+    metrics = Metrics()
+    metrics.add_hook(lambda command, sample: samples.append(command))
+    client = api.Client(mock_server.url, RateLimiter(20), metrics=metrics)
+    client.login('user', 'password')
+    client.ping()
+    client.get_all_symbols()
+    mock_server.errors['getSymbol'] = 'BE115'
+    with pytest.raises(CommandFailed):
+        client._send_command(api._get_data('getSymbol',
+                                           symbol=DEFAULT_CURRENCY))
+    summary = metrics.summary()
+    assert samples == ['login', 'ping', 'getAllSymbols', 'getSymbol']
+    assert summary['getSymbol']['errors'] == 1
+    symbols = summary['getAllSymbols']
+    assert symbols['count'] == 1 and symbols['errors'] == 0
+    assert symbols['bytes_in'] > symbols['bytes_out'] > 0
+    assert symbols['network']['max'] > 0 and symbols['decode']['max'] > 0
+    assert summary['ping']['throttle']['max'] > 0
+
+
+def test_prometheus_export(mock_client):
+    mock_client.ping()
+    text = mock_client.metrics.to_prometheus()
+    assert 'xtbapi_commands_total{command="ping"} 1' in text
+    assert 'xtbapi_command_network_seconds_bucket{command="ping",' \
+           'le="+Inf"} 1' in text
+    server = start_http_server(mock_client.metrics, port=0)
+    try:
+        url = "http://{}:{}/metrics".format(*server.server_address)
+        with urllib.request.urlopen(url) as response:
+            assert 'xtbapi_command_decode_seconds_count' in \
+                response.read().decode()
+    finally:
+        server.shutdown()
+        server.server_close()
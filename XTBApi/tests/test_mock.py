@@ -0,0 +1,106 @@
+"""
+tests.test_mock.py
+~~~~~~~
+
+test the clients against the offline mock server
+"""
+
+import logging
+import time
+
+import pytest
+
+from XTBApi import api
+from XTBApi.benchmark import run_benchmark
+from XTBApi.exceptions import CommandFailed
+from XTBApi.limiter import RateLimiter
+from XTBApi.mock import MockServer
+
+LOGGER = logging.getLogger('XTBApi.test_mock')
+DEFAULT_CURRENCY = 'EURUSD'
+
+
+def test_login_and_symbols(mock_client):
+    symbols = mock_client.get_all_symbols()
+    assert len(symbols) == 50
+    assert mock_client.get_symbol(DEFAULT_CURRENCY)['symbol'] == \
+        DEFAULT_CURRENCY
+
+
+def test_wrong_credentials():
+    with MockServer(credentials=('user', 'password')) as server:
+        client = api.BaseClient(server.url, RateLimiter(None))
+        with pytest.raises(CommandFailed) as exc:
+            client.login('user', 'wrong')
+        assert exc.value.err_code == 'BE005'
+
+
+def test_chart_range_request(mock_client):
+    end = int(time.time())
+    res = mock_client.get_chart_range_request(DEFAULT_CURRENCY, 60,
+                                              end - 3600 * 24 * 7, end, 0)
+    assert res['digits'] == 5
+    ctms = [candle['ctm'] for candle in res['rateInfos']]
+    assert ctms == sorted(ctms)
+    assert all(ctm % (3600 * 1000) == 0 for ctm in ctms)
+
+
+def test_trade_flow(mock_client):
+    assert len(mock_client.update_trades()) == 3
+    response = mock_client.open_trade('buy', DEFAULT_CURRENCY, 0.1)
+    assert response['order'] in mock_client.update_trades()
+    mock_client.close_trade(response['order'])
+    assert len(mock_client.update_trades()) == 3
+    mock_client.close_all_trades()
+    assert mock_client.update_trades() == {}
+
+
+def test_error_injection(mock_server, mock_client):
+    mock_server.errors['getVersion'] = 'EX001'
+    with pytest.raises(CommandFailed) as exc:
+        mock_client.get_version()
+    assert exc.value.err_code == 'EX001'
+
+
+def test_relogin_after_disconnect(mock_server, mock_client):
+    mock_server.drop_connections()
+    assert mock_client.get_version() == {'version': '2.5.0'}
+    assert mock_server.commands['login'] == 2
+
+
+def test_relogin_after_close_frame():
+    with MockServer(disconnect_after=2) as server:
+        client = api.Client(server.url, RateLimiter(None))
+        client.login('user', 'password')
+        assert client.get_version() == {'version': '2.5.0'}
+        # the server closes the socket instead of answering
+        assert client.get_version() == {'version': '2.5.0'}
+        assert server.commands['login'] == 2
+
+
+def test_benchmark():
+    results = run_benchmark(iterations=5, methods=['ping', 'get_symbol'])
+    assert set(results) == {'ping', 'get_symbol'}
+    assert results['ping']['cmds_per_sec'] > 0
+    assert results['ping']['p50'] <= results['ping']['p99']
+
+
+def test_lastn_candle_history(mock_server, mock_client):
+    candles = mock_client.get_lastn_candle_history(DEFAULT_CURRENCY, 60, 100)
+    assert len(candles) == 100
+    assert mock_server.commands['getChartLastRequest'] == 1
+    assert 'getChartRangeRequest' not in mock_server.commands
+    assert mock_client.bytes_per_candle() > 0
+
+
+def test_lastn_candle_history_fetches_older(mock_server, mock_client,
+                                            monkeypatch):
+    calendar = mock_client.trading_calendar
+    monkeypatch.setattr(calendar, 'window_start',
+                        lambda *args: time.time() - 3600 * 10)
+    candles = mock_client.get_lastn_candle_history(DEFAULT_CURRENCY, 3600,
+                                                   50)
+    timestamps = [x['timestamp'] for x in candles]
+    assert len(candles) == 50
+    assert timestamps == sorted(set(timestamps))
+    assert mock_server.commands['getChartRangeRequest'] == 1
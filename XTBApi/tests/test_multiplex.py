@@ -0,0 +1,85 @@
+"""
+tests.test_multiplex.py
+~~~~~~~
+
+test the thread safe clients against the mock server
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from XTBApi.exceptions import CommandFailed, ResponseTimeout
+from XTBApi.limiter import RateLimiter
+from XTBApi.mock import MockServer
+from XTBApi.multiplex import MultiplexedClient
+
+SYMBOLS = ['EURUSD', 'GBPUSD', 'USDJPY', 'AUDUSD', 'USDCHF', 'EURGBP']
+
+
+@pytest.fixture
+def concurrent_server():
+    with MockServer(n_trades=3, concurrent=True,
+                    latency={'getSymbol': 0.2}) as server:
+        yield server
+
+
+@pytest.fixture
+def client(concurrent_server):
+    client = MultiplexedClient(concurrent_server.url, RateLimiter(None))
+    client.login('user', 'password')
+    yield client
+    client.logout()
+
+
+def test_requests_in_flight(concurrent_server, client):
+    symbols = [x['symbol'] for x in client.get_all_symbols()][:8]
+    start = time.time()
+    with ThreadPoolExecutor(len(symbols)) as executor:
+        results = list(executor.map(client.get_symbol, symbols))
+    assert time.time() - start < 0.2 * 3
+    assert [x['symbol'] for x in results] == symbols
+    assert client.in_flight() == 0
+    assert client.metrics.summary()['getSymbol']['count'] == len(symbols)
+
+
+def test_errors_and_single_relogin(concurrent_server, client):
+    concurrent_server.errors['getVersion'] = 'BE115'
+    logins = concurrent_server.commands['login']
+    with pytest.raises(CommandFailed):
+        client.get_version()
+    # an error answered by the session does not log in again
+    assert concurrent_server.commands['login'] == logins
+    del concurrent_server.errors['getVersion']
+    concurrent_server.drop_connections()
+    with ThreadPoolExecutor(6) as executor:
+        versions = list(executor.map(lambda x: client.get_version(),
+                                     range(6)))
+    assert versions == [{'version': '2.5.0'}] * 6
+    assert concurrent_server.commands['login'] == logins + 1
+
+
+def test_refresh_with_commands_in_flight(client):
+    with ThreadPoolExecutor(4) as executor:
+        futures = [executor.submit(client.get_symbol, 'EURUSD')
+                   for _ in range(4)]
+        time.sleep(0.05)
+        client.refresh_session()
+        assert all(future.result()['symbol'] == 'EURUSD'
+                   for future in futures)
+    assert len(client.update_trades()) == 3
+
+
+def test_timeout_is_not_retried(concurrent_server):
+    client = MultiplexedClient(concurrent_server.url, RateLimiter(None),
+                               timeout=0.1)
+    client.login('user', 'password')
+    concurrent_server.latency = {'tradeTransaction': 0.3}
+    with pytest.raises(ResponseTimeout):
+        client.trade_transaction('EURUSD', 0, 0, 0.1, price=1.0)
+    time.sleep(0.3)
+    assert concurrent_server.commands['tradeTransaction'] == 1
+    assert concurrent_server.commands['login'] == 1
+    assert client.get_version() == {'version': '2.5.0'}
+    client.logout()
@@ -0,0 +1,58 @@
+"""
+tests.test_pool.py
+~~~~~~~
+
+test the session pool against the mock server
+"""
+
+import time
+
+import pytest
+
+from XTBApi.api import BaseClient
+from XTBApi.exceptions import CommandFailed
+from XTBApi.limiter import RateLimiter
+from XTBApi.mock import MockServer
+from XTBApi.pool import SessionPool
+
+
+def _factory(server):
+    return lambda: BaseClient(server.url, RateLimiter(None))
+
+
+def test_parallel_map():
+    latency = {'getChartRangeRequest': 0.1}
+    with MockServer(latency=latency) as server:
+        with SessionPool('user', 'password', size=4,
+                         client_factory=_factory(server)) as pool:
+            symbols = list(server.symbols)[:8]
+            start = time.time()
+            charts = pool.map('get_chart_range_request',
+                              [(sym, 1, 0, 0, 5) for sym in symbols])
+            elapsed = time.time() - start
+            stats = pool.stats()
+    assert [len(chart['rateInfos']) for chart in charts] == [5] * 8
+    assert elapsed < 0.5
+    assert stats['completed'] == 8
+    assert all(x['commands'] for x in stats['per_session'])
+    assert 0 < stats['utilization'] <= 1
+
+
+def test_read_only_and_errors():
+    with MockServer(errors={'getSymbol': 'BE115'}) as server:
+        with SessionPool('user', 'password', size=2,
+                         client_factory=_factory(server)) as pool:
+            with pytest.raises(ValueError):
+                pool.submit('trade_transaction', 'EURUSD', 0, 0, 1.0)
+            with pytest.raises(CommandFailed):
+                pool.submit('get_symbol', 'EURUSD').result()
+            assert pool.stats()['errors'] == 1
+
+
+def test_login_failure():
+    with MockServer(credentials=('user', 'password')) as server:
+        pool = SessionPool('user', 'wrong', size=2, login_attempts=2,
+                           retry_delay=0, client_factory=_factory(server))
+        with pytest.raises(CommandFailed):
+            pool.start()
+        assert server.commands['login'] == 4
@@ -0,0 +1,82 @@
+"""
+tests.test_resample.py
+~~~~~~~
+
+test the candle resampling
+"""
+
+import pytest
+
+np = pytest.importorskip('numpy')
+from XTBApi.api import PERIOD
+from XTBApi.candles import CANDLE_DTYPE, decode_rate_infos
+from XTBApi.hours import TradingSchedule
+from XTBApi.resample import Resampler, bar_starts, resample
+from XTBApi.store import CandleStore
+
+DEFAULT_CURRENCY = 'EURUSD'
+PERIODS = [5, 15, 60, 240, 1440, 10080, 43200]
+# thursday 2024-02-29 00:00 utc
+THURSDAY = 1709164800000
+
+
+def _history(mock_client, days=3):
+    res = mock_client.get_chart_range_request(
+        DEFAULT_CURRENCY, 1, THURSDAY // 1000, THURSDAY // 1000 + days * 86400,
+        0)
+    return decode_rate_infos(res)
+
+
+def test_bar_starts():
+    ctms = np.array([THURSDAY + 90 * 60000])
+    assert bar_starts(ctms, 60).tolist() == [THURSDAY + 3600000]
+    assert bar_starts(ctms, 1440, 3600).tolist() == [THURSDAY - 3600000]
+    assert bar_starts(ctms, 10080).tolist() == [THURSDAY - 3 * 86400000]
+    assert bar_starts(ctms, 43200).tolist() == [THURSDAY - 28 * 86400000]
+
+
+def test_resample(mock_server, mock_client):
+    mock_server.n_candles = 10000
+    candles = _history(mock_client, 6)
+    hours = resample(candles, 60)
+    assert np.all(hours['ctm'] % 3600000 == 0)
+    first = candles[candles['ctm'] < candles['ctm'][0] + 3600000]
+    assert hours[0].tolist() == (
+        int(first['ctm'][0]), first['open'][0], first['high'].max(),
+        first['low'].min(), first['close'][-1], first['vol'].sum())
+    # no bar out of the trading days
+    days = resample(candles, PERIOD.ONE_DAY.value)
+    assert len(days) == 4
+    assert resample(candles, 10080)['ctm'].tolist() == [
+        THURSDAY - 3 * 86400000, THURSDAY + 4 * 86400000]
+    assert resample(candles, 43200)['ctm'].tolist() == [
+        THURSDAY - 28 * 86400000, THURSDAY + 86400000]
+
+
+def test_incremental_matches_vectorized(mock_server, mock_client, tmp_path):
+    mock_server.n_candles = 10000
+    candles = _history(mock_client)
+    store = CandleStore(str(tmp_path))
+    schedule = TradingSchedule(
+        [{'day': day, 'fromT': 0, 'toT': 86400} for day in range(1, 6)])
+    resampler = Resampler(DEFAULT_CURRENCY, PERIODS, on_bar=store.append,
+                          schedule=schedule)
+    resampler.feed(candles[:-1])
+    # the friday bars are closed by the last candle before the weekend
+    assert resampler.current(PERIOD.ONE_DAY) is not None
+    resampler.update(candles[-1])
+    assert resampler.current(PERIOD.ONE_DAY) is None
+    assert resampler.current(PERIOD.ONE_WEEK) is None
+    assert resampler.current(PERIOD.ONE_MONTH) is not None
+    resampler.flush()
+    for period in PERIODS:
+        expected = resample(candles, period)
+        assert np.array_equal(store.read(DEFAULT_CURRENCY, period), expected)
+
+
+def test_invalid_periods():
+    with pytest.raises(ValueError):
+        Resampler(DEFAULT_CURRENCY, [7], base=5)
+    with pytest.raises(ValueError):
+        Resampler(DEFAULT_CURRENCY, [1], base=5)
+    assert len(resample(np.empty(0, CANDLE_DTYPE), 60)) == 0
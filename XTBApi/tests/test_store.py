@@ -0,0 +1,60 @@
+"""
+tests.test_store.py
+~~~~~~~
+
+test the on disk candle store
+"""
+
+import time
+
+import pytest
+
+np = pytest.importorskip('numpy')
+from XTBApi.candles import CANDLE_DTYPE
+from XTBApi.store import CandleStore
+
+DEFAULT_CURRENCY = 'EURUSD'
+
+
+def _candles(ctms):
+    candles = np.zeros(len(ctms), CANDLE_DTYPE)
+    candles['ctm'] = ctms
+    candles['close'] = np.arange(len(ctms))
+    return candles
+
+
+def test_append_and_read(tmp_path):
+    store = CandleStore(str(tmp_path))
+    assert store.last_ctm(DEFAULT_CURRENCY, 1) is None
+    assert len(store.read(DEFAULT_CURRENCY, 1)) == 0
+    assert store.append(DEFAULT_CURRENCY, 1, _candles([0, 60000])) == 2
+    assert store.append(DEFAULT_CURRENCY, 1,
+                        _candles([60000, 120000, 180000])) == 2
+    candles = store.read(DEFAULT_CURRENCY, 1, 60000, 180000)
+    assert candles['ctm'].tolist() == [60000, 120000]
+    assert isinstance(candles, np.memmap)
+    assert store.keys() == [(DEFAULT_CURRENCY, 1)]
+
+
+def test_partial_record_is_dropped(tmp_path):
+    store = CandleStore(str(tmp_path))
+    store.append(DEFAULT_CURRENCY, 5, _candles([0]))
+    with open(store._file(DEFAULT_CURRENCY, 5), 'ab') as fileobj:
+        fileobj.write(b'\0' * 7)
+    assert len(store.read(DEFAULT_CURRENCY, 5)) == 1
+    store.append(DEFAULT_CURRENCY, 5, _candles([300000]))
+    assert store.read(DEFAULT_CURRENCY, 5)['ctm'].tolist() == [0, 300000]
+
+
+def test_sync(tmp_path, mock_server, mock_client):
+    store = CandleStore(str(tmp_path))
+    with pytest.raises(ValueError):
+        store.sync(mock_client, DEFAULT_CURRENCY, 60)
+    start = int(time.time()) - 14 * 86400
+    written = store.sync(mock_client, DEFAULT_CURRENCY, 60, start)
+    assert written > 0
+    assert store.sync(mock_client, DEFAULT_CURRENCY, 60) == 0
+    ctm = store.read(DEFAULT_CURRENCY, 60)['ctm']
+    assert np.all(np.diff(ctm) > 0)
+    assert ctm[-1] + 3600 * 1000 <= time.time() * 1000
+    assert mock_server.commands['getChartRangeRequest'] == 2
@@ -0,0 +1,92 @@
+"""
+tests.test_stream.py
+~~~~~~~
+
+test the streaming client against the mock server
+"""
+
+import logging
+import queue
+import threading
+import time
+
+import pytest
+
+from XTBApi.api import BaseClient
+from XTBApi.exceptions import NotLogged
+from XTBApi.stream import StreamClient
+
+LOGGER = logging.getLogger('XTBApi.test_stream')
+DEFAULT_CURRENCY = 'EURUSD'
+
+
+def _wait_for(stream, event):
+    for name, data in stream:
+        if name == event:
+            return data
+
+
+def test_not_logged():
+    with pytest.raises(NotLogged):
+        StreamClient.from_client(BaseClient())
+
+
+def test_ticks_callback_and_iterator(mock_client):
+    ticks = queue.Queue()
+    with StreamClient.from_client(mock_client, queue_size=100) as stream:
+        stream.on('tickPrices', ticks.put)
+        stream.subscribe_ticks(DEFAULT_CURRENCY)
+        data = _wait_for(stream, 'tickPrices')
+        assert data['symbol'] == DEFAULT_CURRENCY
+        assert ticks.get(timeout=2)['bid'] > 0
+        assert _wait_for(stream, 'keepAlive')['timestamp'] > 0
+
+
+def test_trade_events(mock_client):
+    statuses = queue.Queue()
+    with StreamClient.from_client(mock_client, queue_size=100) as stream:
+        stream.on('tradeStatus', statuses.put)
+        stream.subscribe_trades()
+        stream.subscribe_trade_status()
+        stream.subscribe_balance()
+        assert 'margin' in _wait_for(stream, 'balance')
+        response = mock_client.open_trade('buy', DEFAULT_CURRENCY, 0.1)
+        trade = _wait_for(stream, 'trade')
+        assert trade['order'] == response['order']
+        assert statuses.get(timeout=2)['requestStatus'] == 3
+
+
+def test_unsubscribe(mock_server, mock_client):
+    with StreamClient.from_client(mock_client, queue_size=10) as stream:
+        stream.subscribe_candles(DEFAULT_CURRENCY)
+        assert _wait_for(stream, 'candle')['symbol'] == DEFAULT_CURRENCY
+        stream.unsubscribe_candles(DEFAULT_CURRENCY)
+        for _ in range(100):
+            if 'stream.stopCandles' in mock_server.commands:
+                break
+            time.sleep(0.01)
+    assert mock_server.commands['stream.stopCandles'] == 1
+
+
+def test_close_ends_iterator(mock_client):
+    stream = StreamClient.from_client(mock_client, queue_size=10).connect()
+    threading.Timer(0.1, stream.close).start()
+    events = list(stream)
+    assert all(name == 'keepAlive' for name, _ in events)
+
+
+def test_bad_messages_are_skipped():
+    stream = StreamClient('stream_id', queue_size=10)
+    messages = ['{"command": "tickPr', '{"status": false}',
+                '{"command": "news", "data": {"title": "x"}}', '']
+
+    class Socket(object):
+        def recv(self):
+            message = messages.pop(0)
+            if not messages:
+                stream._stop.set()
+            return message
+
+    stream.ws = Socket()
+    stream._read_loop()
+    assert list(stream) == [('news', {'title': 'x'})]
@@ -0,0 +1,71 @@
+"""
+tests.test_ticks.py
+~~~~~~~
+
+test the tick recorder
+"""
+
+import time
+
+import pytest
+
+np = pytest.importorskip('numpy')
+
+from XTBApi.stream import StreamClient
+from XTBApi.ticks import TICK_DTYPE, TickRecorder, TickRing
+
+DEFAULT_CURRENCY = 'EURUSD'
+
+
+def _tick(timestamp, bid=1.0, volume=1.0):
+    return {'symbol': DEFAULT_CURRENCY, 'level': 0, 'timestamp': timestamp,
+            'bid': bid, 'ask': bid + 0.0002, 'bidVolume': volume,
+            'askVolume': volume}
+
+
+def test_ring_wraps_and_spills():
+    spilled = []
+    ring = TickRing(4, spill=spilled.append)
+    for timestamp in range(10):
+        ring.append(timestamp, 1.0, 1.1)
+    assert len(ring) == 4
+    assert ring.to_array()['timestamp'].tolist() == [6, 7, 8, 9]
+    assert ring.window(7, 9)['timestamp'].tolist() == [7, 8]
+    assert ring.window(0)['timestamp'].tolist() == [6, 7, 8, 9]
+    assert int(ring.last()['timestamp']) == 9
+    ring.flush()
+    assert np.concatenate(spilled)['timestamp'].tolist() == list(range(10))
+    assert TICK_DTYPE.itemsize == 40
+
+
+def test_window_queries(tmp_path):
+    recorder = TickRecorder(capacity=100, spill_path=str(tmp_path))
+    for second in range(300):
+        recorder.feed_tick(_tick(second * 1000, 1.0 + second / 1000,
+                                 volume=second))
+    recorder.feed_tick(_tick(0))
+    assert recorder.dropped == 1
+    window = recorder.window(DEFAULT_CURRENCY, 10)
+    assert len(window) == 10
+    assert recorder.mid(DEFAULT_CURRENCY, 10)[-1] == pytest.approx(1.2991)
+    assert recorder.spread(DEFAULT_CURRENCY, 10) == pytest.approx(0.0002)
+    expected = sum((1.0 + s / 1000 + 0.0001) * s for s in range(290, 300)) \
+        / sum(range(290, 300))
+    assert recorder.vwap(DEFAULT_CURRENCY, 10) == pytest.approx(expected)
+    recorder.flush()
+    assert len(recorder.read_spilled(DEFAULT_CURRENCY)) == 300
+    assert recorder.memory() == 100 * 40
+
+
+def test_stream_and_polling(mock_client):
+    recorder = TickRecorder(capacity=1000)
+    assert recorder.poll(mock_client, [DEFAULT_CURRENCY, 'GBPUSD']) == 2
+    assert recorder.last('GBPUSD')['bid'] > 0
+    with StreamClient.from_client(mock_client) as stream:
+        recorder.attach(stream)
+        stream.subscribe_ticks(DEFAULT_CURRENCY)
+        deadline = time.monotonic() + 3
+        while len(recorder.ring(DEFAULT_CURRENCY)) < 3 and \
+                time.monotonic() < deadline:
+            time.sleep(0.01)
+    assert len(recorder.ring(DEFAULT_CURRENCY)) >= 3
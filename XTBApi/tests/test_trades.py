@@ -0,0 +1,208 @@
+"""
+tests.test_trades.py
+~~~~~~~
+
+test the trade book against the mock server
+"""
+
+import queue
+import time
+
+import pytest
+
+from XTBApi import api
+from XTBApi.limiter import RateLimiter
+from XTBApi.mock import MockServer
+from XTBApi.stream import StreamClient
+from XTBApi.trades import OrderTemplate, TradeBook, Transaction
+
+DEFAULT_CURRENCY = 'EURUSD'
+
+
+def _record(order, profit=0.0):
+    return {'order': order, 'cmd': 0, 'symbol': DEFAULT_CURRENCY,
+            'volume': 0.1, 'close_price': 1.1, 'profit': profit,
+            'open_time': 1000}
+
+
+def test_transaction_slots():
+    transaction = Transaction(_record(1))
+    with pytest.raises(AttributeError):
+        transaction.other = 1
+    assert not transaction.update(_record(1))
+    assert transaction.update(_record(1, 2.0))
+    assert transaction.actual_profit == 2.0
+
+
+def test_apply_diffs():
+    book = TradeBook(None)
+    events = []
+    for event in ('added', 'changed', 'removed'):
+        book.on(event, lambda x, event=event: events.append((event,
+                                                              x.order_id)))
+    book.apply([_record(1), _record(2)])
+    first = book.trades[1]
+    added, changed, removed = book.apply([_record(1, 5.0), _record(3)])
+    assert [x.order_id for x in added] == [3]
+    assert changed == [first] and book.trades[1] is first
+    assert [x.order_id for x in removed] == [2]
+    assert events == [('added', 1), ('added', 2), ('added', 3),
+                      ('changed', 1), ('removed', 2)]
+    with pytest.raises(ValueError):
+        book.on('closed', print)
+
+
+def test_pending_orders_ignored():
+    book = TradeBook(None)
+    pending = dict(_record(2), cmd=2)
+    book.feed_trade(dict(pending, state='Modified'))
+    book.feed_trade(dict(_record(1), state='Modified'))
+    assert list(book.trades) == [1]
+    book.apply([_record(1), pending])
+    assert list(book.trades) == [1]
+
+
+def test_reads_without_round_trips(mock_server, mock_client):
+    book = mock_client.trade_book
+    book.max_age = 60
+    order = next(iter(mock_client.update_trades()))
+    commands = mock_server.commands['getTrades']
+    assert mock_client.get_trade_profit(order) == 0.0
+    assert mock_server.commands['getTrades'] == commands
+    mock_client.close_trade(order)
+    assert order not in book
+    assert mock_server.commands['getTrades'] == commands
+    response = mock_client.open_trade('buy', DEFAULT_CURRENCY, 0.1)
+    assert response['order'] in book.get()
+    assert mock_server.commands['getTrades'] == commands + 1
+    mock_client.close_all_trades()
+    assert mock_client.trade_rec == {}
+    assert mock_client.update_trades() == {}
+
+
+def test_attach_stream(mock_client):
+    book = mock_client.trade_book
+    book.get()
+    added, removed = queue.Queue(), queue.Queue()
+    book.on('added', added.put)
+    book.on('removed', removed.put)
+    with StreamClient.from_client(mock_client) as stream:
+        book.attach(stream)
+        stream.subscribe_trades()
+        response = mock_client.open_trade('buy', DEFAULT_CURRENCY, 0.1)
+        assert added.get(timeout=2).order_id == response['order']
+        mock_client.close_trade(response['order'])
+        assert removed.get(timeout=2).order_id == response['order']
+
+
+def test_close_trades_polling(mock_server, mock_client):
+    orders = list(mock_client.trade_book.get())
+    other = api.BaseClient(mock_server.url, RateLimiter(None))
+    other.login('user', 'password')
+    trade = mock_client.trade_rec[orders[0]]
+    other.trade_transaction(trade.symbol, 0, 2, trade.volume,
+                            order=orders[0], price=trade.price)
+    results = mock_client.close_trades()
+    assert results[orders[0]]['error'].err_code == 'BE51'
+    assert all(results[order]['status'] == 3 for order in orders[1:])
+    assert all(res['sent'] <= res['confirmed'] for res in results.values())
+    assert mock_client.trade_rec == {}
+    assert mock_server.commands['tradeTransactionStatus'] == 2
+    # BE51 is reported without logging in and closing again
+    assert mock_server.commands['login'] == 2
+    assert mock_server.commands['tradeTransaction'] == 4
+
+
+def test_bulk_with_unknown_order(mock_client):
+    orders = list(mock_client.trade_book.get())
+    results = mock_client.modify_trades({-1: {'sl': 1.0},
+                                         orders[0]: {'sl': 1.0}})
+    assert isinstance(results[-1]['error'], KeyError)
+    assert results[orders[0]]['status'] == 3
+    results = mock_client.close_trades([orders[0], -1] + orders[1:])
+    assert isinstance(results[-1]['error'], KeyError)
+    assert all(results[order]['status'] == 3 for order in orders)
+    assert mock_client.trade_rec == {}
+
+
+def test_bulk_with_status_stream(mock_server, mock_client):
+    with StreamClient.from_client(mock_client) as stream:
+        mock_client.status_tracker.attach(stream)
+        stream.subscribe_trade_status()
+        changes = {order: {'sl': 1.0} for order in
+                   mock_client.trade_book.get()}
+        results = mock_client.modify_trades(changes)
+        assert [res['status'] for res in results.values()] == [3, 3, 3]
+        assert all(trade['sl'] == 1.0 for trade in mock_client.get_trades())
+        results = mock_client.close_all_trades()
+        assert len(results) == 3
+    assert 'tradeTransactionStatus' not in mock_server.commands
+    assert mock_client.update_trades() == {}
+
+
+def test_modify_keeps_the_other_level(mock_client):
+    orders = list(mock_client.trade_book.get())
+    mock_client.modify_trades({order: {'tp': 2.0} for order in orders})
+    results = mock_client.modify_trades({order: {'sl': 1.0}
+                                         for order in orders})
+    assert [res['status'] for res in results.values()] == [3, 3, 3]
+    for trade in mock_client.get_trades():
+        assert (trade['sl'], trade['tp']) == (1.0, 2.0)
+    assert all(mock_client.trade_book.get_trade(order).tp == 2.0
+               for order in orders)
+
+
+def test_order_template():
+    template = OrderTemplate({'symbol': DEFAULT_CURRENCY, 'lotMin': 0.01,
+                              'lotMax': 100.0, 'lotStep': 0.01,
+                              'precision': 5})
+    data = template.build(0, 0.12, 1.123456)
+    info = data['arguments']['tradeTransInfo']
+    assert info['volume'] == 0.12 and info['price'] == 1.12346
+    assert template.check_volume(0.07) == 0.07  # 0.07 / 0.01 is not exactly 7
+    with pytest.raises(ValueError):
+        template.build(0, 0.123, 1.1)
+    with pytest.raises(ValueError):
+        template.build(0, 500, 1.1)
+    info = template.build(0, 0.1, 1.1, stop_loss=1, tp=1.2,
+                          customComment='x')['arguments']['tradeTransInfo']
+    assert (info['sl'], info['tp'], info['customComment']) == (1.0, 1.2, 'x')
+    assert 'stop_loss' not in info
+    with pytest.raises(ValueError):
+        template.build(0, 0.1, 1.1, stoploss=1.0)
+
+
+def test_fast_open_trade(mock_server, mock_client):
+    order = mock_client.fast_open_trade('buy', DEFAULT_CURRENCY, 0.1)
+    assert order['status'] == 3
+    assert order['order'] in mock_client.trade_book.get()
+    with StreamClient.from_client(mock_client) as stream:
+        mock_client.symbol_cache.attach(stream)
+        mock_client.status_tracker.attach(stream)
+        stream.subscribe_ticks(DEFAULT_CURRENCY)
+        stream.subscribe_trade_status()
+        while mock_client.symbol_cache.get_quote(DEFAULT_CURRENCY) is None:
+            time.sleep(0.01)
+        commands = dict(mock_server.commands)
+        order = mock_client.fast_open_trade('sell', DEFAULT_CURRENCY, 0.1,
+                                            wait=False)
+        assert order['status'] is None
+        mock_client.confirm_order(order)
+    assert order['status'] == 3
+    assert mock_server.commands['tradeTransaction'] == \
+        commands['tradeTransaction'] + 1
+    assert mock_server.commands['tradeTransactionStatus'] == \
+        commands['tradeTransactionStatus']
+    assert mock_server.commands['getSymbol'] == commands['getSymbol']
+    latency = mock_client.order_latencies[-1]
+    assert latency['total'] >= latency['send'] > 0
+
+
+def test_bulk_uses_one_snapshot():
+    with MockServer(n_trades=30) as server:
+        client = api.Client(server.url, RateLimiter(10))
+        client.login('user', 'password')
+        results = client.close_trades()
+        assert len(results) == 30
+        assert all(res['status'] == 3 for res in results.values())
+        assert server.commands['getTrades'] == 1
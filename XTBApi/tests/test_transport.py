@@ -0,0 +1,84 @@
+"""
+tests.test_transport.py
+~~~~~~~
+
+test the recording and replay of sessions
+"""
+
+import time
+
+import pytest
+
+from XTBApi import api
+from XTBApi.benchmark import run_replay_benchmark
+from XTBApi.exceptions import CommandFailed, SocketError
+from XTBApi.limiter import RateLimiter
+from XTBApi.transport import (OPEN, RECEIVED, SENT, RecordingTransport,
+                              ReplayTransport, read_frames)
+
+DEFAULT_CURRENCY = 'EURUSD'
+
+
+def _record(mock_server, path):
+    recorder = RecordingTransport(path)
+    client = api.BaseClient(mock_server.url, RateLimiter(None),
+                            transport=recorder)
+    client.login('user', 'secret-password')
+    symbols = client.get_all_symbols()
+    mock_server.errors['getSymbol'] = 'BE115'
+    with pytest.raises(CommandFailed):
+        client._send_command(api._get_data('getSymbol',
+                                           symbol=DEFAULT_CURRENCY))
+    client.logout()
+    recorder.close()
+    return symbols
+
+
+def test_record(mock_server, tmp_path):
+    path = str(tmp_path / 'session.rec')
+    _record(mock_server, path)
+    frames = read_frames(path)
+    assert [frame[0] for frame in frames] == [OPEN] + [SENT, RECEIVED] * 4
+    assert frames[0][3] == mock_server.url.format(mode='demo')
+    assert all(a[2] <= b[2] for a, b in zip(frames, frames[1:]))
+    # a partial frame left by a crash is dropped
+    with open(path, 'ab') as fileobj:
+        fileobj.write(b'>\0\0')
+    assert len(read_frames(path)) == len(frames)
+
+
+def test_record_redacts_password(mock_server, tmp_path):
+    path = str(tmp_path / 'session.rec')
+    _record(mock_server, path)
+    with open(path, 'rb') as fileobj:
+        assert b'secret-password' not in fileobj.read()
+    login = read_frames(path)[1][3]
+    assert '"password": "***"' in login and '"user"' in login
+
+
+def test_replay(mock_server, tmp_path):
+    path = str(tmp_path / 'session.rec')
+    symbols = _record(mock_server, path)
+    mock_server.stop()
+    client = api.BaseClient(mock_server.url, RateLimiter(None),
+                            transport=ReplayTransport(path))
+    client.login('user', 'password')
+    assert client.get_all_symbols() == symbols
+    with pytest.raises(ValueError):
+        client._send_command(api._get_data('getVersion'))
+    client.logout()
+    with pytest.raises(SocketError):
+        client._send_command(api._get_data('ping'))
+
+
+def test_replay_speed(mock_server, tmp_path):
+    mock_server.latency = 0.05
+    path = str(tmp_path / 'session.rec')
+    _record(mock_server, path)
+    mock_server.stop()
+    fast = run_replay_benchmark(path)
+    assert fast['commands'] == 4 and fast['errors'] == 1
+    assert fast['metrics']['getAllSymbols']['bytes_in'] > 0
+    start = time.perf_counter()
+    run_replay_benchmark(path, speed=1.0)
+    assert time.perf_counter() - start > 0.15 > fast['elapsed']
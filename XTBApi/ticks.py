@@ -0,0 +1,224 @@
+# -*- coding utf-8 -*-
+
+"""
+XTBApi.ticks
+~~~~~~~
+
+Tick capture in fixed size ring buffers per symbol and level, fed by the
+tick stream or by polling getTickPrices, with window queries computed on
+the arrays. Requires numpy.
+"""
+
+import logging
+import os
+import threading
+
+import numpy as np
+
+LOGGER = logging.getLogger('XTBApi.ticks')
+TICK_DTYPE = np.dtype([('timestamp', 'i8'), ('bid', 'f8'), ('ask', 'f8'),
+                       ('bid_volume', 'f8'), ('ask_volume', 'f8')])
+RING_CAPACITY = 100000
+EXTENSION = '.ticks'
+
+
+class TickRing(object):
+    """the last ``capacity`` ticks of a symbol and level, timestamps in ms
+
+    if ``spill`` is given it is called with the ticks about to be
+    overwritten, in order"""
+
+    def __init__(self, capacity=RING_CAPACITY, spill=None):
+        self.capacity = capacity
+        self.data = np.zeros(capacity, TICK_DTYPE)
+        self.count = 0  # ticks ever appended
+        self.spilled = 0
+        self.spill = spill
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return min(self.count, self.capacity)
+
+    def append(self, timestamp, bid, ask, bid_volume=0.0, ask_volume=0.0):
+        with self._lock:
+            if self.spill is not None and \
+                    self.count - self.spilled == self.capacity:
+                self._spill()
+            self.data[self.count % self.capacity] = (
+                timestamp, bid, ask, bid_volume, ask_volume)
+            self.count += 1
+
+    def _spill(self):
+        pending = self._slice(self.spilled, self.count)
+        if len(pending):
+            self.spill(pending)
+        self.spilled = self.count
+
+    def flush(self):
+        """spill the ticks not spilled yet"""
+        if self.spill is not None:
+            with self._lock:
+                self._spill()
+
+    def _slice(self, start, stop):
+        """copy of the ticks appended from start to stop, in order"""
+        start = max(start, self.count - self.capacity)
+        if start >= stop:
+            return np.empty(0, TICK_DTYPE)
+        first, last = start % self.capacity, (stop - 1) % self.capacity + 1
+        if first < last:
+            return self.data[first:last].copy()
+        return np.concatenate((self.data[first:], self.data[:last]))
+
+    def last(self):
+        """last tick as a numpy record, None if empty"""
+        if not self.count:
+            return None
+        return self.data[(self.count - 1) % self.capacity].copy()
+
+    def to_array(self):
+        """every tick held, in order"""
+        with self._lock:
+            return self._slice(0, self.count)
+
+    def _search(self, timestamp):
+        """position of the first tick at or after timestamp"""
+        timestamps = self.data['timestamp']
+        left, right = max(0, self.count - self.capacity), self.count
+        while left < right:
+            middle = (left + right) // 2
+            if timestamps[middle % self.capacity] < timestamp:
+                left = middle + 1
+            else:
+                right = middle
+        return left
+
+    def window(self, start, end=None):
+        """ticks with start <= timestamp < end, in ms"""
+        with self._lock:
+            stop = self.count if end is None else self._search(end)
+            return self._slice(self._search(start), stop)
+
+
+def mid(ticks):
+    return (ticks['bid'] + ticks['ask']) / 2
+
+
+def spread(ticks):
+    return ticks['ask'] - ticks['bid']
+
+
+def vwap(ticks):
+    """mid price weighted by the quoted volumes, None if no volume"""
+    volume = ticks['bid_volume'] + ticks['ask_volume']
+    total = volume.sum()
+    return float((mid(ticks) * volume).sum() / total) if total else None
+
+
+class TickRecorder(object):
+    """ticks of many symbols, one TickRing per (symbol, level)
+
+    :param capacity: ticks kept in memory per ring, 40 bytes each
+    :param spill_path: directory where the ticks leaving the rings are
+        appended, one file of TICK_DTYPE records per ring
+    """
+
+    def __init__(self, capacity=RING_CAPACITY, spill_path=None):
+        self.capacity = capacity
+        self.spill_path = spill_path
+        self.rings = {}
+        self.dropped = 0  # ticks older than the last one of their ring
+        self._lock = threading.Lock()
+        if spill_path is not None:
+            os.makedirs(spill_path, exist_ok=True)
+
+    def _spill_file(self, symbol, level):
+        return os.path.join(self.spill_path, "{}_{}{}".format(
+            symbol, level, EXTENSION))
+
+    def ring(self, symbol, level=0):
+        ring = self.rings.get((symbol, level))
+        if ring is None:
+            with self._lock:
+                ring = self.rings.get((symbol, level))
+                if ring is None:
+                    spill = None
+                    if self.spill_path is not None:
+                        filename = self._spill_file(symbol, level)
+
+                        def spill(ticks):
+                            with open(filename, 'ab') as fileobj:
+                                fileobj.write(ticks.tobytes())
+                    ring = TickRing(self.capacity, spill)
+                    self.rings[(symbol, level)] = ring
+        return ring
+
+    def feed_tick(self, data):
+        """record a tickPrices stream event or a getTickPrices quotation"""
+        ring = self.ring(data['symbol'], data.get('level', 0))
+        last = ring.last()
+        if last is not None and data['timestamp'] <= last['timestamp']:
+            self.dropped += 1
+            return
+        ring.append(data['timestamp'], data['bid'], data['ask'],
+                    data.get('bidVolume') or 0.0,
+                    data.get('askVolume') or 0.0)
+
+    def attach(self, stream):
+        """record the tickPrices events of stream"""
+        stream.on('tickPrices', self.feed_tick)
+
+    def poll(self, client, symbols, level=0):
+        """record the ticks of getTickPrices newer than the recorded ones,
+        return the number of quotations received"""
+        lasts = [self.ring(symbol, level).last() for symbol in symbols]
+        since = min(0 if last is None else int(last['timestamp'])
+                    for last in lasts)
+        quotations = client.get_tick_prices(symbols, since,
+                                            level)['quotations']
+        for quotation in quotations:
+            self.feed_tick(quotation)
+        return len(quotations)
+
+    def flush(self):
+        """spill every ring"""
+        for ring in list(self.rings.values()):
+            ring.flush()
+
+    def read_spilled(self, symbol, level=0):
+        """ticks spilled to disk, memory mapped"""
+        filename = self._spill_file(symbol, level)
+        count = os.path.getsize(filename) // TICK_DTYPE.itemsize \
+            if os.path.exists(filename) else 0
+        if not count:
+            return np.empty(0, TICK_DTYPE)
+        return np.memmap(filename, TICK_DTYPE, 'r', shape=(count,))
+
+    # - queries -
+    def last(self, symbol, level=0):
+        """last tick of symbol, None if none"""
+        ring = self.rings.get((symbol, level))
+        return None if ring is None else ring.last()
+
+    def window(self, symbol, seconds, level=0, end=None):
+        """ticks of the last ``seconds`` before end, a timestamp in ms
+        that defaults to the last tick, so that the server clock is used"""
+        ring = self.rings.get((symbol, level))
+        if ring is None or not ring.count:
+            return np.empty(0, TICK_DTYPE)
+        if end is None:
+            end = int(ring.last()['timestamp']) + 1
+        return ring.window(end - int(seconds * 1000), end)
+
+    def mid(self, symbol, seconds, level=0):
+        return mid(self.window(symbol, seconds, level))
+
+    def spread(self, symbol, seconds, level=0):
+        return spread(self.window(symbol, seconds, level))
+
+    def vwap(self, symbol, seconds, level=0):
+        return vwap(self.window(symbol, seconds, level))
+
+    def memory(self):
+        """bytes used by the ring arrays"""
+        return sum(ring.data.nbytes for ring in self.rings.values())
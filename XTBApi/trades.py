@@ -0,0 +1,283 @@
+# -*- coding utf-8 -*-
+
+"""
+XTBApi.trades
+~~~~~~~
+
+Open positions of an account, kept up to date with diffs of getTrades and
+of the trade stream instead of being rebuilt on every call
+"""
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+LOGGER = logging.getLogger('XTBApi.trades')
+TRADES_MAX_AGE = 1.0
+STATUS_TIMEOUT = 5.0
+STEP_TOLERANCE = 1e-6  # in lot steps, float error of volume / lotStep
+EVENTS = ('added', 'changed', 'removed')
+# requestStatus of tradeTransactionStatus
+PENDING = 1
+ACCEPTED = 3
+# cmd of market positions, the others are pending orders
+MARKET_CMDS = (0, 1)
+# arguments of trade_transaction to their tradeTransInfo field
+TRANS_INFO_FIELDS = {'stop_loss': 'sl', 'take_profit': 'tp', 'sl': 'sl',
+                     'tp': 'tp', 'offset': 'offset',
+                     'expiration': 'expiration', 'order': 'order',
+                     'customComment': 'customComment'}
+
+
+class Transaction(object):
+    """open position of a getTrades record"""
+    __slots__ = ('_trans_dict', 'mode', 'order_id', 'symbol', 'volume',
+                 'price', 'actual_profit', 'timestamp', 'sl', 'tp')
+
+    def __init__(self, trans_dict):
+        self.order_id = trans_dict['order']
+        self.update(trans_dict)
+        LOGGER.debug("Transaction %s inited", self.order_id)
+
+    def __repr__(self):
+        return "Transaction({}, {} {} {})".format(
+            self.order_id, self.mode, self.volume, self.symbol)
+
+    def update(self, trans_dict):
+        """apply a newer record of the same order, False if unchanged"""
+        if getattr(self, '_trans_dict', None) == trans_dict:
+            return False
+        self._trans_dict = trans_dict
+        self.mode = {0: 'buy', 1: 'sell'}[trans_dict['cmd']]
+        self.symbol = trans_dict['symbol']
+        self.volume = trans_dict['volume']
+        self.price = trans_dict['close_price']
+        self.actual_profit = trans_dict['profit']
+        self.sl = trans_dict.get('sl', 0.0)
+        self.tp = trans_dict.get('tp', 0.0)
+        self.timestamp = trans_dict['open_time'] / 1000
+        return True
+
+
+class TradeBook(object):
+    """open positions of a client keyed by order
+
+    ``trades`` is updated in place: records of getTrades are compared
+    with the known ones and only the added, changed and removed orders
+    are applied and sent to the callbacks registered with ``on``. Reads
+    ask the server only if the book is older than ``max_age`` seconds"""
+
+    def __init__(self, client, max_age=TRADES_MAX_AGE):
+        self.client = client
+        self.max_age = max_age
+        self.trades = {}
+        self.round_trips = 0
+        self._updated = None
+        self._callbacks = {}
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self.trades)
+
+    def __contains__(self, order_id):
+        return order_id in self.trades
+
+    def __iter__(self):
+        return iter(list(self.trades))
+
+    def on(self, event, callback):
+        """call callback(transaction) on added, changed or removed"""
+        if event not in EVENTS:
+            raise ValueError("event must be in {}".format(EVENTS))
+        self._callbacks.setdefault(event, []).append(callback)
+
+    def _emit(self, event, transaction):
+        for callback in self._callbacks.get(event, ()):
+            try:
+                callback(transaction)
+            except Exception:
+                LOGGER.exception("callback of %s failed", event)
+
+    def apply(self, records):
+        """replace the book with the records of getTrades, return the
+        (added, changed, removed) transactions, pending orders are left
+        out"""
+        added, changed = [], []
+        with self._lock:
+            seen = set()
+            for record in records:
+                if record['cmd'] not in MARKET_CMDS:
+                    continue
+                order_id = record['order']
+                seen.add(order_id)
+                transaction = self.trades.get(order_id)
+                if transaction is None:
+                    transaction = Transaction(record)
+                    self.trades[order_id] = transaction
+                    added.append(transaction)
+                elif transaction.update(record):
+                    changed.append(transaction)
+            removed = [self.trades.pop(order_id) for order_id in
+                       [x for x in self.trades if x not in seen]]
+            self._updated = time.monotonic()
+        for event, transactions in zip(EVENTS, (added, changed, removed)):
+            for transaction in transactions:
+                self._emit(event, transaction)
+        LOGGER.debug("%d trades: %d added, %d changed, %d removed",
+                     len(self.trades), len(added), len(changed), len(removed))
+        return added, changed, removed
+
+    def refresh(self):
+        """apply the trades of the server"""
+        self.round_trips += 1
+        return self.apply(self.client.get_trades())
+
+    def is_fresh(self, max_age=None):
+        max_age = self.max_age if max_age is None else max_age
+        return self._updated is not None and \
+            time.monotonic() - self._updated <= max_age
+
+    def get(self, max_age=None):
+        """open trades, refreshed only if older than max_age"""
+        if not self.is_fresh(max_age):
+            self.refresh()
+        return self.trades
+
+    def get_trade(self, order_id, max_age=None):
+        """Transaction of order_id, refreshed if stale or unknown"""
+        stale = not self.is_fresh(max_age)
+        if stale:
+            self.refresh()
+        transaction = self.trades.get(order_id)
+        if transaction is None and not stale:
+            self.refresh()
+            transaction = self.trades.get(order_id)
+        if transaction is None:
+            raise KeyError(order_id)
+        return transaction
+
+    def remove(self, order_id):
+        """drop a closed order without asking the server"""
+        with self._lock:
+            transaction = self.trades.pop(order_id, None)
+        if transaction is not None:
+            self._emit('removed', transaction)
+        return transaction
+
+    def invalidate(self):
+        """refresh on the next read"""
+        self._updated = None
+
+    def feed_trade(self, data):
+        """apply a trade stream event, pending orders are ignored"""
+        if data['cmd'] not in MARKET_CMDS:
+            return
+        order_id = data['order']
+        if data.get('closed') or data.get('state') == 'Deleted':
+            self.remove(order_id)
+            return
+        data = {key: value for key, value in data.items() if key != 'state'}
+        with self._lock:
+            transaction = self.trades.get(order_id)
+            if transaction is None:
+                self.trades[order_id] = transaction = Transaction(data)
+                event = 'added'
+            elif transaction.update(data):
+                event = 'changed'
+            else:
+                return
+        self._emit(event, transaction)
+
+    def feed_profit(self, data):
+        """apply a profit stream event"""
+        transaction = self.trades.get(data['order'])
+        if transaction is not None and \
+                transaction.actual_profit != data['profit']:
+            transaction.actual_profit = data['profit']
+            self._emit('changed', transaction)
+
+    def attach(self, stream):
+        """keep the book updated from the trade and profit events of
+        stream, subscribe them to be notified"""
+        stream.on('trade', self.feed_trade)
+        stream.on('profit', self.feed_profit)
+
+
+class StatusTracker(object):
+    """requestStatus of transactions pushed by the tradeStatus stream,
+    the last ``maxsize`` are kept until waited"""
+
+    def __init__(self, maxsize=1000):
+        self.maxsize = maxsize
+        self.attached = False
+        self._statuses = OrderedDict()
+        self._cond = threading.Condition()
+
+    def feed_status(self, data):
+        """apply a tradeStatus stream event"""
+        with self._cond:
+            self._statuses[data['order']] = data
+            while len(self._statuses) > self.maxsize:
+                self._statuses.popitem(last=False)
+            self._cond.notify_all()
+
+    def attach(self, stream):
+        """follow the tradeStatus events of stream, subscribe them with
+        subscribe_trade_status"""
+        stream.on('tradeStatus', self.feed_status)
+        self.attached = True
+
+    def _final(self, order):
+        data = self._statuses.get(order)
+        return data is not None and data['requestStatus'] != PENDING
+
+    def wait(self, orders, timeout=STATUS_TIMEOUT):
+        """final statuses of orders received within timeout, by order"""
+        with self._cond:
+            self._cond.wait_for(lambda: all(map(self._final, orders)),
+                                timeout)
+            return {order: self._statuses.pop(order) for order in orders
+                    if self._final(order)}
+
+
+class OrderTemplate(object):
+    """pre-built tradeTransaction of market orders of a symbol, volumes
+    are checked against the lot limits of its spec"""
+    __slots__ = ('symbol', 'lot_min', 'lot_max', 'lot_step', 'precision')
+
+    def __init__(self, spec):
+        self.symbol = spec['symbol']
+        self.lot_min = spec['lotMin']
+        self.lot_max = spec['lotMax']
+        self.lot_step = spec['lotStep']
+        self.precision = spec['precision']
+
+    def check_volume(self, volume):
+        """volume checked against the limits and the lot step of the
+        symbol, ValueError if it is not a multiple of the lot step"""
+        steps = float(volume) / self.lot_step
+        if abs(steps - round(steps)) > STEP_TOLERANCE:
+            raise ValueError("volume of {} must be a multiple of {}".format(
+                self.symbol, self.lot_step))
+        volume = round(round(steps) * self.lot_step, 8)
+        if not self.lot_min <= volume <= self.lot_max:
+            raise ValueError("volume of {} must be in [{}, {}]".format(
+                self.symbol, self.lot_min, self.lot_max))
+        return volume
+
+    def build(self, mode, volume, price, **kwargs):
+        """tradeTransaction command opening volume at price, mode as
+        MODES values, kwargs are the arguments of trade_transaction"""
+        info = {'cmd': mode, 'symbol': self.symbol, 'type': 0,  # OPEN
+                'volume': self.check_volume(volume),
+                'price': round(price, self.precision), 'sl': 0.0, 'tp': 0.0}
+        for key, value in kwargs.items():
+            field = TRANS_INFO_FIELDS.get(key)
+            if field is None:
+                raise ValueError("{} is not an argument of a transaction, "
+                                 "must be in {}".format(
+                                     key, sorted(TRANS_INFO_FIELDS)))
+            info[field] = float(value) if field in ('sl', 'tp') else value
+        return {'command': 'tradeTransaction',
+                'arguments': {'tradeTransInfo': info}}
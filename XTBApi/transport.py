@@ -0,0 +1,221 @@
+# -*- coding utf-8 -*-
+
+"""
+XTBApi.transport
+~~~~~~~
+
+Transports of BaseClient, the callables opening its sockets. Frames can
+be recorded with their timestamps to an append-only file and served back
+by a replay transport, at the recorded speed or as fast as possible, to
+test the client stack offline on real payloads.
+"""
+
+import json
+import logging
+import struct
+import threading
+import time
+
+from XTBApi.api import _connection_closed, _create_connection
+
+LOGGER = logging.getLogger('XTBApi.transport')
+MAGIC = b'XTBREC1\n'
+# kind, connection, unix timestamp, payload size
+_HEADER = struct.Struct('<cIdI')
+OPEN = b'O'  # payload is the url
+SENT = b'>'
+RECEIVED = b'<'
+REDACTED = '***'
+
+
+def read_frames(path):
+    """(kind, connection, timestamp, payload) of a recording, payloads of
+    frames as str and a trailing partial frame ignored"""
+    frames = []
+    with open(path, 'rb') as fileobj:
+        if fileobj.read(len(MAGIC)) != MAGIC:
+            raise ValueError("{} is not a frame recording".format(path))
+        while True:
+            header = fileobj.read(_HEADER.size)
+            if len(header) < _HEADER.size:
+                break
+            kind, connection, timestamp, size = _HEADER.unpack(header)
+            payload = fileobj.read(size)
+            if len(payload) < size:
+                break
+            frames.append((kind, connection, timestamp,
+                           payload.decode('utf-8')))
+    return frames
+
+
+class RecordingTransport(object):
+    """transport writing every frame of the sockets it opens to ``path``
+
+    ``connect(url)`` opens the real sockets, websocket-client by default::
+
+        recorder = RecordingTransport('session.rec')
+        client = Client(transport=recorder)
+    """
+
+    def __init__(self, path, connect=None):
+        self.path = path
+        self.connect = connect or _create_connection
+        self.connections = 0
+        self._lock = threading.Lock()
+        self._file = open(path, 'ab')
+        if self._file.tell() == 0:
+            self._file.write(MAGIC)
+
+    def __call__(self, url):
+        ws = self.connect(url)
+        with self._lock:
+            connection = self.connections
+            self.connections += 1
+        self.write(OPEN, connection, url)
+        return _RecordingSocket(self, ws, connection)
+
+    def write(self, kind, connection, payload):
+        if isinstance(payload, str):
+            payload = payload.encode('utf-8')
+        header = _HEADER.pack(kind, connection, time.time(), len(payload))
+        with self._lock:
+            self._file.write(header + payload)
+            if kind != SENT:
+                self._file.flush()
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+class _RecordingSocket(object):
+    def __init__(self, recorder, ws, connection):
+        self.recorder = recorder
+        self.ws = ws
+        self.connection = connection
+
+    def send(self, payload):
+        recorded = payload
+        if _command(payload) == 'login':
+            recorded = _redact_login(payload)
+        self.recorder.write(SENT, self.connection, recorded)
+        return self.ws.send(payload)
+
+    def recv(self):
+        payload = self.ws.recv()
+        self.recorder.write(RECEIVED, self.connection, payload)
+        return payload
+
+    def close(self):
+        self.ws.close()
+
+    def __getattr__(self, name):
+        return getattr(self.ws, name)
+
+
+class ReplayTransport(object):
+    """transport serving the frames of a recording, every socket opened
+    replays the next recorded connection
+
+    :param speed: None to answer at once, else the recorded latency of
+        every response is divided by speed, 1.0 for the recorded speed
+    :param check: raise ValueError if a command sent is not the recorded
+        one, only the command names are compared so that logins match
+        whatever the credentials redacted in the recording
+    """
+
+    def __init__(self, path, speed=None, check=True):
+        self.path = path
+        self.speed = speed
+        self.check = check
+        self.connections = []
+        self.urls = []
+        by_connection = {}
+        for kind, connection, timestamp, payload in read_frames(path):
+            if kind == OPEN:
+                by_connection[connection] = []
+                self.connections.append(by_connection[connection])
+                self.urls.append(payload)
+            elif connection in by_connection:
+                by_connection[connection].append((kind, timestamp, payload))
+        self.opened = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, url):
+        with self._lock:
+            if self.opened >= len(self.connections):
+                raise ConnectionRefusedError(
+                    "no more connections in {}".format(self.path))
+            frames = self.connections[self.opened]
+            self.opened += 1
+        return _ReplaySocket(self, frames)
+
+    def requests(self, connection=None):
+        """payloads sent in a connection, or in all of them"""
+        connections = self.connections if connection is None else \
+            [self.connections[connection]]
+        return [payload for frames in connections
+                for kind, timestamp, payload in frames if kind == SENT]
+
+
+class _ReplaySocket(object):
+    def __init__(self, transport, frames):
+        self.transport = transport
+        self.frames = frames
+        self.position = 0
+        self.closed = False
+        self._sent = None  # (recorded timestamp, time.monotonic) of send
+
+    def _next(self, kind):
+        while self.position < len(self.frames):
+            frame = self.frames[self.position]
+            self.position += 1
+            if frame[0] == kind:
+                return frame
+        self.closed = True
+        raise _connection_closed()("recording exhausted")
+
+    def send(self, payload):
+        if self.closed:
+            raise _connection_closed()("socket closed")
+        kind, timestamp, recorded = self._next(SENT)
+        if self.transport.check and _command(payload) != _command(recorded):
+            raise ValueError("sent {} instead of the recorded {}".format(
+                _command(payload), _command(recorded)))
+        self._sent = (timestamp, time.monotonic())
+        return len(payload)
+
+    def recv(self):
+        if self.closed:
+            raise _connection_closed()("socket closed")
+        kind, timestamp, payload = self._next(RECEIVED)
+        speed = self.transport.speed
+        if speed and self._sent is not None:
+            delay = (timestamp - self._sent[0]) / speed - \
+                (time.monotonic() - self._sent[1])
+            if delay > 0:
+                time.sleep(delay)
+        return payload
+
+    def close(self):
+        self.closed = True
+
+
+def _command(payload):
+    """command name of a request, without decoding it whole"""
+    if isinstance(payload, bytes):
+        payload = payload.decode('utf-8')
+    start = payload.find('"command"')
+    if start < 0:
+        return None
+    start = payload.find('"', payload.find(':', start)) + 1
+    return payload[start:payload.find('"', start)]
+
+
+def _redact_login(payload):
+    """login request without its password, recordings are shared"""
+    if isinstance(payload, bytes):
+        payload = payload.decode('utf-8')
+    data = json.loads(payload)
+    data.get('arguments', {})['password'] = REDACTED
+    return json.dumps(data)
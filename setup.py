@@ -27,7 +27,10 @@ REQUIRED = [
 
 # What packages are optional?
 EXTRAS = {
-    'test': ['pytest']
+    'test': ['pytest'],
+    'async': ['websockets>=14'],
+    'numpy': ['numpy'],
+    'fast': ['orjson'],
     # 'fancy feature': ['django'],
 }
 
@@ -100,9 +103,6 @@ setup(
     python_requires=REQUIRES_PYTHON,
     url=URL,
     packages=find_packages(exclude=('tests',)),
-    package_data={
-        "": ["logs/.gitkeep"],
-    },
     # If your package is a single module, use this instead of 'packages':
     # py_modules=['mypackage'],
 